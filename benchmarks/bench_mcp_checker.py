@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+MCP Checker Benchmark
+
+This script measures how fast mcp_checker.py probes and renders a set of
+synthetic MCP servers. It generates a settings file with K copies of
+stub_mcp_server.py, then runs ``extract_all_metadata``, ``format_markdown`` and
+``format_json`` at each requested concurrency level. Every run happens in a
+fresh worker process so that peak RSS is measured per run. Everything runs
+locally; the only requirement besides the standard library is the mcp package
+used by the checker itself.
+
+Usage:
+    python bench_mcp_checker.py [--servers K] [--tools N] [--resources M] [--depth D]
+                                [--latency SECONDS] [--page-size P] [--concurrency LEVELS]
+                                [--repeat R] [--output FILE] [--baseline FILE] [--checker PATH]
+
+Arguments:
+    --servers       Number of synthetic servers in the generated settings file (default: 8)
+    --tools         Tools exposed by each server (default: 50)
+    --resources     Resources exposed by each server (default: 10)
+    --depth         Nesting depth of each tool's input schema (default: 3)
+    --latency       Seconds each server waits before answering a request (default: 0.05)
+    --page-size     Items per list page, 0 for a single page (default: 0)
+    --concurrency   Comma-separated concurrency levels to measure (default: 1,2,4,8)
+    --repeat        Runs per concurrency level; the median is reported (default: 3)
+    --output        JSON file to write the results to (default: mcp_checker_benchmark.json)
+    --baseline      Results of an earlier run to compare against
+    --checker       Path to mcp_checker.py (default: the copy in the template)
+
+Examples:
+    # Run the default benchmark with UV
+    uv run --with mcp benchmarks/bench_mcp_checker.py
+    
+    # Many large servers, compared against the results of the previous version
+    uv run --with mcp benchmarks/bench_mcp_checker.py --servers 32 --tools 200 --baseline old.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import importlib.util
+from pathlib import Path
+
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+
+# The checker as shipped in generated projects
+DEFAULT_CHECKER = BENCHMARK_DIR.parent / "{{cookiecutter.project_slug}}" / "roo_config" / "mcp_checker.py"
+STUB_SERVER = BENCHMARK_DIR / "stub_mcp_server.py"
+
+# Format of the results file; bump when its layout changes
+RESULTS_VERSION = 1
+
+# Phases measured in every run, in the order they run
+PHASES = ("extract_all_metadata", "format_markdown", "format_json")
+
+
+def write_settings(path, args):
+    """Write an MCP settings file with ``args.servers`` synthetic servers."""
+    servers = {}
+    for i in range(args.servers):
+        name = f"stub-{i}"
+        servers[name] = {
+            "command": sys.executable,
+            "args": [
+                str(STUB_SERVER), "--name", name,
+                "--tools", str(args.tools), "--resources", str(args.resources),
+                "--depth", str(args.depth), "--latency", str(args.latency),
+                "--page-size", str(args.page_size)
+            ]
+        }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"mcpServers": servers}, f, indent=2)
+
+
+def load_checker(checker_path):
+    """Import mcp_checker.py from ``checker_path`` as a module."""
+    spec = importlib.util.spec_from_file_location("mcp_checker", checker_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_kb():
+    """Return the peak resident set size of this process in KiB."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_worker(checker_path, settings_path, concurrency):
+    """Measure one run in the current process and return its results.
+    
+    The cache and the time budget are disabled so that every run probes every
+    server and is not cut short.
+    """
+    checker = load_checker(checker_path)
+    extractor = checker.MCPMetadataExtractor(settings_path, concurrency=concurrency, budget=None)
+    
+    started = time.perf_counter()
+    metadata = asyncio.run(extractor.extract_all_metadata())
+    extract_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    markdown = extractor.format_markdown(metadata)
+    markdown_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    json_output = extractor.format_json(metadata)
+    json_seconds = time.perf_counter() - started
+    
+    return {
+        "concurrency": concurrency,
+        "seconds": {
+            "extract_all_metadata": extract_seconds,
+            "format_markdown": markdown_seconds,
+            "format_json": json_seconds
+        },
+        "servers": len(metadata),
+        "connected": sum(1 for server in metadata.values() if server.get("status") == "connected"),
+        "tools": sum(len(server.get("tools", [])) for server in metadata.values()),
+        "markdown_bytes": len(markdown.encode('utf-8')),
+        "json_bytes": len(json_output.encode('utf-8')),
+        "peak_rss_kb": peak_rss_kb()
+    }
+
+
+def run_isolated(checker_path, settings_path, concurrency):
+    """Run ``run_worker`` in a fresh interpreter and return its results."""
+    result = subprocess.run(
+        [sys.executable, __file__, "--worker", "--checker", str(checker_path),
+         "--settings", str(settings_path), "--concurrency", str(concurrency)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Worker failed at concurrency {concurrency}:\n{result.stderr}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def summarize(runs):
+    """Compute per-concurrency medians and throughput from individual runs."""
+    summary = {}
+    for concurrency in sorted({run["concurrency"] for run in runs}):
+        level = [run for run in runs if run["concurrency"] == concurrency]
+        seconds = {phase: statistics.median(run["seconds"][phase] for run in level) for phase in PHASES}
+        servers = level[0]["servers"]
+        tools = level[0]["tools"]
+        summary[str(concurrency)] = {
+            "seconds": seconds,
+            "wall_seconds": sum(seconds.values()),
+            "servers_per_second": servers / seconds["extract_all_metadata"],
+            "tools_per_second": tools / seconds["extract_all_metadata"],
+            "markdown_mb_per_second": level[0]["markdown_bytes"] / 1e6 / max(seconds["format_markdown"], 1e-9),
+            "json_mb_per_second": level[0]["json_bytes"] / 1e6 / max(seconds["format_json"], 1e-9),
+            "peak_rss_kb": max(run["peak_rss_kb"] for run in level)
+        }
+    return summary
+
+
+def format_summary(summary, baseline=None):
+    """Format the summary as a plain-text table, with changes against ``baseline`` if given."""
+    header = ["concurrency", "extract s", "markdown s", "json s", "wall s", "tools/s", "peak RSS MiB"]
+    if baseline:
+        header.append("wall vs baseline")
+    rows = []
+    for concurrency, level in summary.items():
+        row = [
+            concurrency,
+            f"{level['seconds']['extract_all_metadata']:.3f}",
+            f"{level['seconds']['format_markdown']:.3f}",
+            f"{level['seconds']['format_json']:.3f}",
+            f"{level['wall_seconds']:.3f}",
+            f"{level['tools_per_second']:.0f}",
+            f"{level['peak_rss_kb'] / 1024:.1f}"
+        ]
+        if baseline:
+            previous = baseline.get(concurrency)
+            if previous:
+                change = (level["wall_seconds"] / previous["wall_seconds"] - 1) * 100
+                row.append(f"{change:+.1f}%")
+            else:
+                row.append("-")
+        rows.append(row)
+    
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in [header] + rows)
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description='Benchmark mcp_checker.py against synthetic MCP servers.')
+    parser.add_argument('--servers', type=int, default=8, help='Number of synthetic servers')
+    parser.add_argument('--tools', type=int, default=50, help='Tools exposed by each server')
+    parser.add_argument('--resources', type=int, default=10, help='Resources exposed by each server')
+    parser.add_argument('--depth', type=int, default=3, help="Nesting depth of each tool's input schema")
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds each server waits before answering')
+    parser.add_argument('--page-size', type=int, default=0, help='Items per list page, 0 for a single page')
+    parser.add_argument('--concurrency', default="1,2,4,8", help='Comma-separated concurrency levels')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per concurrency level')
+    parser.add_argument('--output', default="mcp_checker_benchmark.json", help='JSON file for the results')
+    parser.add_argument('--baseline', help='Results of an earlier run to compare against')
+    parser.add_argument('--checker', default=str(DEFAULT_CHECKER), help='Path to mcp_checker.py')
+    # Internal: measure a single run in this process
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--settings', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker:
+        print(json.dumps(run_worker(args.checker, args.settings, int(args.concurrency))))
+        return
+    
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    if importlib.util.find_spec("mcp") is None:
+        print("Error: the mcp package is required (run with: uv run --with mcp ...)")
+        sys.exit(1)
+    
+    runs = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        settings_path = os.path.join(temp_dir, "mcp_settings.json")
+        write_settings(settings_path, args)
+        print(f"Benchmarking {args.checker}")
+        print(f"{args.servers} servers x {args.tools} tools, {args.resources} resources, "
+              f"schema depth {args.depth}, {args.latency}s latency")
+        for concurrency in levels:
+            for i in range(args.repeat):
+                run = run_isolated(args.checker, settings_path, concurrency)
+                if run["connected"] != args.servers:
+                    print(f"Warning: only {run['connected']} of {args.servers} servers connected "
+                          f"at concurrency {concurrency}")
+                runs.append(run)
+                print(f"  concurrency {concurrency}, run {i + 1}/{args.repeat}: "
+                      f"{run['seconds']['extract_all_metadata']:.3f}s")
+    
+    summary = summarize(runs)
+    results = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "parameters": {
+            "servers": args.servers,
+            "tools": args.tools,
+            "resources": args.resources,
+            "depth": args.depth,
+            "latency": args.latency,
+            "page_size": args.page_size,
+            "concurrency": levels,
+            "repeat": args.repeat
+        },
+        "runs": runs,
+        "summary": summary
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get("parameters") != results["parameters"]:
+            print("Warning: the baseline was measured with different parameters")
+        baseline = previous.get("summary", {})
+    
+    print()
+    print(format_summary(summary, baseline))
+    print()
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
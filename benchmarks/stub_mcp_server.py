@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Synthetic MCP Server
+
+A self-contained MCP server speaking newline-delimited JSON-RPC over stdio, used
+to benchmark mcp_checker.py without network access or third-party servers. It
+only depends on the standard library.
+
+Usage:
+    python stub_mcp_server.py [--name NAME] [--tools N] [--resources M] [--depth D]
+                              [--latency SECONDS] [--page-size P]
+
+Arguments:
+    --name          Server name reported by initialize (default: stub)
+    --tools         Number of tools exposed (default: 20)
+    --resources     Number of resources exposed (default: 5)
+    --depth         Nesting depth of each tool's input schema (default: 2)
+    --latency       Seconds to wait before answering each request (default: 0)
+    --page-size     Items per list page; 0 returns everything in one page (default: 0)
+"""
+
+import sys
+import json
+import time
+import argparse
+
+
+# Protocol version answered when the client does not propose one
+DEFAULT_PROTOCOL_VERSION = "2024-11-05"
+
+
+def build_schema(depth, index):
+    """Build an object schema nested ``depth`` levels deep.
+    
+    Every level has a string, an integer and an enum property next to the
+    nested object, so the schema size grows linearly with the depth.
+    """
+    schema = {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string", "description": f"Name of item {index}"},
+            "count": {"type": "integer", "minimum": 0, "description": "How many items to process"},
+            "mode": {"type": "string", "enum": ["fast", "safe", "full"], "default": "safe"}
+        },
+        "required": ["name"]
+    }
+    if depth > 1:
+        schema["properties"]["options"] = build_schema(depth - 1, index)
+    return schema
+
+
+class StubServer:
+    """
+    Answers the MCP requests used by mcp_checker.py from generated data.
+    
+    Attributes:
+        name (str): Server name reported by initialize
+        tools (list): The tools exposed by the server
+        resources (list): The resources exposed by the server
+        latency (float): Seconds to wait before answering each request
+        page_size (int): Items per list page, 0 for a single page
+    """
+    
+    def __init__(self, name, tools, resources, depth, latency, page_size):
+        self.name = name
+        self.tools = [
+            {
+                "name": f"{name}_tool_{i}",
+                "description": f"Synthetic tool {i} of {name}, used for benchmarking the MCP checker.",
+                "inputSchema": build_schema(depth, i)
+            }
+            for i in range(tools)
+        ]
+        self.resources = [
+            {
+                "uri": f"stub://{name}/resource/{i}",
+                "name": f"resource_{i}",
+                "description": f"Synthetic resource {i} of {name}"
+            }
+            for i in range(resources)
+        ]
+        self.latency = latency
+        self.page_size = page_size
+    
+    def _page(self, items, key, params):
+        """Return one page of ``items`` starting at the request's cursor."""
+        start = int((params or {}).get("cursor") or 0)
+        size = self.page_size or len(items)
+        result = {key: items[start:start + size]}
+        if start + size < len(items):
+            result["nextCursor"] = str(start + size)
+        return result
+    
+    def handle(self, request):
+        """Return the JSON-RPC response to ``request``, or None for notifications."""
+        if "id" not in request:
+            return None
+        
+        method = request.get("method")
+        params = request.get("params") or {}
+        if method == "initialize":
+            result = {
+                "protocolVersion": params.get("protocolVersion", DEFAULT_PROTOCOL_VERSION),
+                "capabilities": {"tools": {}, "resources": {}},
+                "serverInfo": {"name": self.name, "version": "1.0.0"}
+            }
+        elif method == "tools/list":
+            result = self._page(self.tools, "tools", params)
+        elif method == "resources/list":
+            result = self._page(self.resources, "resources", params)
+        elif method == "ping":
+            result = {}
+        else:
+            return {"jsonrpc": "2.0", "id": request["id"],
+                    "error": {"code": -32601, "message": f"Method not found: {method}"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+    
+    def serve(self, stdin, stdout):
+        """Answer requests from ``stdin`` until it is closed."""
+        for line in stdin:
+            if not line.strip():
+                continue
+            response = self.handle(json.loads(line))
+            if response is None:
+                continue
+            if self.latency:
+                time.sleep(self.latency)
+            stdout.write(json.dumps(response) + "\n")
+            stdout.flush()
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description='Synthetic MCP server for benchmarks')
+    parser.add_argument('--name', default='stub', help='Server name reported by initialize')
+    parser.add_argument('--tools', type=int, default=20, help='Number of tools exposed')
+    parser.add_argument('--resources', type=int, default=5, help='Number of resources exposed')
+    parser.add_argument('--depth', type=int, default=2, help='Nesting depth of each input schema')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each response')
+    parser.add_argument('--page-size', type=int, default=0, help='Items per list page, 0 for a single page')
+    args = parser.parse_args()
+    
+    server = StubServer(args.name, args.tools, args.resources, args.depth, args.latency, args.page_size)
+    try:
+        server.serve(sys.stdin, sys.stdout)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
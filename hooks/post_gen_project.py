@@ -1,16 +1,24 @@
 #!/usr/bin/env python
 import os
+import re
 import platform
 import subprocess
 import shutil
 import sys
 import logging
 import glob
+import importlib.util
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+# Setup script of the generated project, run in this process when it can be imported
+INSERT_VARIABLES_SCRIPT = os.path.join('roo_config', 'insert_variables.py')
+
+# Templates with "#@include NAME" lines can only be composed by insert_variables.py
+INCLUDE_LINE = re.compile(r'^[ \t]*#@include[ \t]', re.MULTILINE)
+
 def run_command(cmd, error_msg=None):
     """Run a command and handle errors.
     
@@ -35,10 +43,15 @@ def run_command(cmd, error_msg=None):
             logger.error(f"Exception: {str(e)}")
         return False, str(e)
 
-def check_uv_installed():
+def check_uv_installed(probe=None):
     """
     Check if UV/UVX is installed on the system and return details.
     
+    Args:
+        probe (dict, optional): Toolchain probe from insert_variables.probe_toolchain().
+            When given, UV and UVX are looked up on PATH instead of being run, so
+            the version is not reported.
+    
     Returns:
         dict: Dictionary containing information about UV availability:
             - uv_available: Whether the 'uv' command is available
@@ -46,6 +59,16 @@ def check_uv_installed():
             - version: The version of UV if available
             - any_available: Whether either 'uv' or 'uvx' is available
     """
+    if probe is not None:
+        uv_available = bool(probe.get('uv'))
+        uvx_available = shutil.which('uvx') is not None
+        return {
+            'uv_available': uv_available,
+            'uvx_available': uvx_available,
+            'version': None,
+            'any_available': uv_available or uvx_available
+        }
+    
     uv_available = False
     uvx_available = False
     version = None
@@ -78,45 +101,53 @@ def check_uv_installed():
         'any_available': uv_available or uvx_available
     }
 
-def run_with_uv(cmd, error_msg=None, fallback=True):
+def load_insert_variables(script_path=INSERT_VARIABLES_SCRIPT):
     """
-    Run a command with UV if available, with fallback to direct execution.
+    Import the project's insert_variables.py as a module.
     
     Args:
-        cmd (list): Command to run as a list of arguments
-        error_msg (str, optional): Custom error message to display on failure
-        fallback (bool): Whether to fall back to direct execution if UV fails
-        
+        script_path (str): Path to insert_variables.py
+    
     Returns:
-        tuple: (success, output) where success is a boolean and output is the command output
+        module: The imported module, or None if it is missing or cannot be imported
+    """
+    if not os.path.exists(script_path):
+        return None
+    try:
+        spec = importlib.util.spec_from_file_location("insert_variables", os.path.abspath(script_path))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    except Exception as e:
+        logger.warning(f"Could not import {script_path}: {e}")
+        return None
+
+def run_insert_variables(module, script_path=INSERT_VARIABLES_SCRIPT):
     """
-    uv_info = check_uv_installed()
+    Run insert_variables.py, in this process when possible.
+    
+    The script only needs the standard library, so it is called through its
+    ``main(argv)`` API instead of being started with ``uv run``. If it cannot be
+    imported or raises unexpectedly, it is run once more with this interpreter.
+    
+    Args:
+        module: The module returned by load_insert_variables(), or None
+        script_path (str): Path to insert_variables.py, used for the fallback
     
-    if uv_info['uv_available']:
-        logger.info(f"Running with UV: {' '.join(cmd)}")
+    Returns:
+        tuple: (success, output) where success is a boolean and output is the error details
+    """
+    if module is not None:
         try:
-            uv_cmd = ['uv', 'run'] + cmd
-            result = subprocess.run(uv_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            return True, result.stdout.decode('utf-8').strip()
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to run with UV: {e.stderr.decode('utf-8')}")
-            if not fallback:
-                if error_msg:
-                    logger.error(f"Error: {error_msg}")
-                return False, e.stderr.decode('utf-8').strip()
+            status = module.main([])
+            if status == 0:
+                return True, ""
+            return False, f"insert_variables.py exited with status {status}"
         except Exception as e:
-            logger.warning(f"Exception running with UV: {str(e)}")
-            if not fallback:
-                if error_msg:
-                    logger.error(f"Error: {error_msg}")
-                return False, str(e)
-    
-    # Fall back to direct execution
-    if fallback:
-        logger.info(f"Falling back to direct execution: {' '.join(cmd)}")
-        return run_command(cmd, error_msg)
+            logger.warning(f"Running insert_variables.py in-process failed: {e}")
     
-    return False, "UV execution failed and fallback disabled"
+    logger.info(f"Running {script_path} with {sys.executable}")
+    return run_command([sys.executable, script_path], "Failed to execute insert_variables.py")
 
 def create_uv_config():
     """Create UVX configuration files."""
@@ -308,9 +339,12 @@ mcp:
     if not default_modes:
         default_modes = ["code", "ask"]  # Minimal default set
     
-    # Create a system prompt file for each default mode
+    # Create a system prompt file for each default mode that has none yet
     for mode in default_modes:
         file_path = os.path.join('.roo', f'system-prompt-{mode}')
+        if os.path.exists(file_path):
+            logger.debug(f"Keeping existing system prompt file: {file_path}")
+            continue
         try:
             with open(file_path, 'w') as f:
                 f.write(template)
@@ -320,8 +354,25 @@ mcp:
     
     return True
 
-def copy_system_prompt_files():
-    """Copy system prompt files from template to project."""
+def list_system_prompts():
+    """Return the names of the system prompt files in .roo."""
+    if not os.path.isdir('.roo'):
+        return []
+    return sorted(name for name in os.listdir('.roo') if name.startswith('system-prompt-'))
+
+def copy_system_prompt_files(insert_variables=None):
+    """Copy system prompt files from template to project.
+    
+    This is only a fallback for when insert_variables.py could not render the
+    prompts. Files that already exist in .roo were rendered by it and are kept,
+    so every prompt is written at most once.
+    
+    Args:
+        insert_variables: The module returned by load_insert_variables(), if any.
+            When given, shared fragments from roo_config/fragments are included
+            into the copies. Without it, templates that include fragments cannot
+            be composed; they are reported as errors and not copied.
+    """
     logger.info("Attempting to copy system prompt files...")
     
     # Create .roo directory if it doesn't exist
@@ -341,21 +392,37 @@ def copy_system_prompt_files():
         files = os.listdir(template_roo_dir)
         logger.info(f"Files found: {files}")
         
-        # Copy all files from template .roo directory to project .roo directory
+        # Copy the files that are missing from the project .roo directory
+        fragments_dir = os.path.join('roo_config', 'fragments')
+        fragments = {}
         for filename in files:
             src_file = os.path.join(template_roo_dir, filename)
             dst_file = os.path.join('.roo', filename)
             
+            if os.path.exists(dst_file):
+                logger.debug(f"Keeping existing system prompt file: {filename}")
+                continue
             if os.path.isfile(src_file):
                 try:
-                    shutil.copy2(src_file, dst_file)
+                    with open(src_file, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                    if insert_variables is not None:
+                        content = insert_variables.compose_template(content, fragments_dir, fragments)
+                        insert_variables.write_text_atomic(dst_file, content, src_file)
+                    elif INCLUDE_LINE.search(content):
+                        logger.error(f"Cannot copy {filename}: it includes shared fragments and "
+                                     f"{INSERT_VARIABLES_SCRIPT} could not be loaded to compose it. "
+                                     f"Fix that script and run it to create the prompt.")
+                        continue
+                    else:
+                        shutil.copy2(src_file, dst_file)
                     logger.info(f"Copied system prompt file: {filename}")
                 except Exception as e:
                     logger.error(f"Error copying {src_file} to {dst_file}: {e}")
         
         # Verify files were copied
-        copied_files = os.listdir('.roo')
-        logger.info(f"Files in .roo after copying: {copied_files}")
+        copied_files = list_system_prompts()
+        logger.info(f"System prompt files in .roo after copying: {copied_files}")
         
         if copied_files:
             return True
@@ -371,16 +438,8 @@ def copy_system_prompt_files():
 def main():
     logger.info("Running post-generation hook...")
     
-    # First, try to copy system prompt files from the template
-    copy_success = copy_system_prompt_files()
-    if not copy_success:
-        logger.warning("Failed to copy or create system prompt files.")
-    
-    # Check for UV
-    uv_info = check_uv_installed()
-    use_uv = uv_info['any_available']
-    
-    # Create .roo directory if it doesn't exist (should already be created by copy_system_prompt_files)
+    # System prompts are materialized once, by insert_variables.py rendering
+    # roo_config/.roo straight into .roo; the hook only fills in what is missing
     try:
         if not os.path.exists('.roo'):
             os.makedirs('.roo')
@@ -407,55 +466,42 @@ def main():
         except Exception as e:
             logger.error(f"Error copying .roomodes file: {e}")
 
-    # Run the appropriate insert-variables script with UV if available
-    if platform.system() == 'Windows':
-        # Try the cross-platform script first
-        # Use only the cross-platform Python script
-        if os.path.exists('roo_config/insert_variables.py'):
-            logger.info("Running insert_variables.py...")
-            if use_uv:
-                success, output = run_with_uv(['python', 'roo_config/insert_variables.py'], 
-                                           "Failed to execute insert_variables.py with UV",
-                                           fallback=True)
-            else:
-                success, output = run_command(['python', 'roo_config/insert_variables.py'], 
-                                           "Failed to execute insert_variables.py")
-            
-            if not success:
-                logger.error("Failed to execute insert_variables.py. Environment variables may not be set correctly.")
-                logger.error(f"Error details: {output}")
-            else:
-                logger.info("insert_variables.py completed successfully.")
-        else:
-            logger.error("insert_variables.py not found. Environment variables will not be set.")
-            logger.info("Please ensure the cross-platform script exists at 'roo_config/insert_variables.py'.")
-    else:
-        # Use only the cross-platform Python script for non-Windows platforms
-        if os.path.exists('roo_config/insert_variables.py'):
-            logger.info("Running insert_variables.py...")
+    # Import the setup script once; its cached toolchain probe also answers the UV check
+    insert_variables = load_insert_variables()
+    probe = None
+    if insert_variables is not None:
+        try:
+            probe = insert_variables.probe_toolchain()
+        except Exception as e:
+            logger.debug(f"Toolchain probe failed: {e}")
+    uv_info = check_uv_installed(probe)
+    
+    # Run the cross-platform insert-variables script
+    if os.path.exists(INSERT_VARIABLES_SCRIPT):
+        logger.info("Running insert_variables.py...")
+        if platform.system() != 'Windows':
             # Set execute permissions on the script
             try:
-                os.chmod('roo_config/insert_variables.py', 0o755)
+                os.chmod(INSERT_VARIABLES_SCRIPT, 0o755)
             except Exception as e:
                 logger.warning(f"Could not set execute permissions on insert_variables.py: {e}")
                 logger.warning("Attempting to run the script anyway...")
-            
-            if use_uv:
-                success, output = run_with_uv(['python3', 'roo_config/insert_variables.py'], 
-                                           "Failed to execute insert_variables.py with UV",
-                                           fallback=True)
-            else:
-                success, output = run_command(['python3', 'roo_config/insert_variables.py'], 
-                                           "Failed to execute insert_variables.py")
-            
-            if not success:
-                logger.error("Failed to execute insert_variables.py. Environment variables may not be set correctly.")
-                logger.error(f"Error details: {output}")
-            else:
-                logger.info("insert_variables.py completed successfully.")
+        
+        success, output = run_insert_variables(insert_variables)
+        if not success:
+            logger.error("Failed to execute insert_variables.py. Environment variables may not be set correctly.")
+            logger.error(f"Error details: {output}")
         else:
-            logger.error("insert_variables.py not found. Environment variables will not be set.")
-            logger.info("Please ensure the cross-platform script exists at 'roo_config/insert_variables.py'.")
+            logger.info("insert_variables.py completed successfully.")
+    else:
+        success = False
+        logger.error("insert_variables.py not found. Environment variables will not be set.")
+        logger.info("Please ensure the cross-platform script exists at 'roo_config/insert_variables.py'.")
+    
+    # Copy the unrendered templates only for prompts insert_variables.py did not write
+    if not success:
+        if not copy_system_prompt_files(insert_variables):
+            logger.warning("Failed to copy or create system prompt files.")
 
     # Create memory-bank directory and templates if selected
     include_memory_bank = '{{ cookiecutter.include_memory_bank_templates }}' == 'yes'
@@ -500,7 +546,10 @@ to persist across sessions. These files will be loaded into the AI's context whe
     # Always set up UV configuration (not just when selected)
     logger.info("\n=== UVX Integration ===")
     if uv_info['any_available']:
-        logger.info(f"UV detected on your system! Version: {uv_info['version']}")
+        if uv_info['version']:
+            logger.info(f"UV detected on your system! Version: {uv_info['version']}")
+        else:
+            logger.info("UV detected on your system!")
         if create_uv_config():
             logger.info("\nUVX configuration has been set up for this project.")
             logger.info("To initialize your UVX environment, run:")
@@ -522,9 +571,8 @@ to persist across sessions. These files will be loaded into the AI's context whe
 
     # Final check to ensure .roo directory has system prompt files
     if os.path.exists('.roo'):
-        files = os.listdir('.roo')
-        if not files:
-            logger.warning(".roo directory is empty. Creating default system prompt files...")
+        if not list_system_prompts():
+            logger.warning(".roo directory has no system prompt files. Creating default system prompt files...")
             create_default_system_prompts()
     
     logger.info("\nPost-generation hook completed successfully!")
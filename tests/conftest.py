@@ -0,0 +1,100 @@
+"""
+Shared fixtures for the tests of the scripts shipped in generated projects.
+
+The scripts live in the template directory, whose name is a cookiecutter
+placeholder, so they are loaded by path rather than imported as a package.
+"""
+
+import sys
+import json
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+
+TESTS_DIR = Path(__file__).resolve().parent
+REPO_DIR = TESTS_DIR.parent
+
+# The roo_config scripts as shipped in generated projects
+ROO_CONFIG_DIR = REPO_DIR / "{{cookiecutter.project_slug}}" / "roo_config"
+HOOKS_DIR = REPO_DIR / "hooks"
+STUB_SERVER = REPO_DIR / "benchmarks" / "stub_mcp_server.py"
+
+
+def load_script(path: Path):
+    """
+    Load a script from the template as a module.
+    
+    Args:
+        path (Path): Path to the script
+    
+    Returns:
+        module: The executed module, registered in ``sys.modules`` under the script's name
+    """
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered before execution so that functions handed to worker processes can be pickled
+    sys.modules[path.stem] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def roo_config_dir():
+    return ROO_CONFIG_DIR
+
+
+@pytest.fixture(scope="session")
+def post_gen_project():
+    return load_script(HOOKS_DIR / "post_gen_project.py")
+
+
+@pytest.fixture(scope="session")
+def mcp_checker():
+    return load_script(ROO_CONFIG_DIR / "mcp_checker.py")
+
+
+@pytest.fixture(scope="session")
+def insert_variables():
+    return load_script(ROO_CONFIG_DIR / "insert_variables.py")
+
+
+@pytest.fixture(scope="session")
+def memory_index():
+    return load_script(ROO_CONFIG_DIR / "memory_index.py")
+
+
+@pytest.fixture(scope="session")
+def memory_compact():
+    return load_script(ROO_CONFIG_DIR / "memory_compact.py")
+
+
+@pytest.fixture(scope="session")
+def prompt_report():
+    return load_script(ROO_CONFIG_DIR / "prompt_report.py")
+
+
+@pytest.fixture(scope="session")
+def workspace_context():
+    return load_script(ROO_CONFIG_DIR / "workspace_context.py")
+
+
+@pytest.fixture
+def stub_settings(tmp_path):
+    """
+    Return a function that writes an MCP settings file of stub servers.
+    
+    The function takes the stub server arguments shared by every server and the
+    number of servers, and returns the path of the settings file.
+    """
+    def write(args=(), count=1):
+        settings = {"mcpServers": {
+            f"stub{index}": {"command": sys.executable, "args": [str(STUB_SERVER), *map(str, args)]}
+            for index in range(count)
+        }}
+        path = tmp_path / "mcp_settings.json"
+        path.write_text(json.dumps(settings), encoding="utf-8")
+        return str(path)
+    
+    return write
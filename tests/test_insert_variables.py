@@ -0,0 +1,368 @@
+"""Tests for roo_config/insert_variables.py."""
+
+import sys
+import json
+
+import pytest
+
+
+PROMPT = """tools:
+  - name: read_file
+
+mcp:
+  overview:
+    - "The Model Context Protocol (MCP) enables communication with external servers"
+  connected_servers:
+    - "none yet"
+
+modes:
+  - slug: code
+"""
+
+
+def test_diff_mcp_servers(insert_variables):
+    old = {"a": {"command": "x"}, "b": {"command": "y"}, "c": {"command": "z"}}
+    new = {"a": {"command": "x"}, "b": {"command": "y2"}, "d": {"command": "w"}}
+
+    assert insert_variables.diff_mcp_servers(old, new) == (["d"], ["b"], ["c"])
+    assert insert_variables.diff_mcp_servers(old, old) == ([], [], [])
+
+
+def test_merge_mcp_servers_prefers_earlier_files(insert_variables):
+    merged = insert_variables.merge_mcp_servers([
+        {"a": {"command": "current"}},
+        {"a": {"command": "legacy"}, "b": {"command": "legacy"}},
+    ])
+
+    assert merged == {"a": {"command": "current"}, "b": {"command": "legacy"}}
+
+
+def test_update_mcp_section_reports_whether_file_changed(insert_variables, tmp_path):
+    prompt_path = tmp_path / "system-prompt-code"
+    prompt_path.write_text(PROMPT, encoding="utf-8")
+    metadata = "## server (`run`)\n\n- tool: Does a thing"
+
+    assert insert_variables.update_mcp_section(prompt_path, metadata) is True
+    rendered = prompt_path.read_text(encoding="utf-8")
+    assert "    ## server (`run`)\n" in rendered
+    assert "none yet" not in rendered
+    assert rendered.endswith("modes:\n  - slug: code\n")
+
+    # A second refresh with the same metadata leaves the file alone
+    assert insert_variables.update_mcp_section(prompt_path, metadata) is False
+    assert prompt_path.read_text(encoding="utf-8") == rendered
+    assert insert_variables.update_connected_servers(tmp_path, metadata) == 0
+
+
+def test_watch_merges_servers_of_every_settings_file(insert_variables, tmp_path, monkeypatch):
+    current_path = tmp_path / "mcp_settings.json"
+    legacy_path = tmp_path / "cline_mcp_settings.json"
+    current_path.write_text(json.dumps({"mcpServers": {"a": {"command": "a"}}}), encoding="utf-8")
+    legacy_path.write_text(json.dumps({"mcpServers": {"b": {"command": "b"}}}), encoding="utf-8")
+    probed = []
+
+    def fake_extract(script_path, options):
+        with open(options["settings"], encoding="utf-8") as f:
+            probed.append((json.load(f)["mcpServers"], options["refresh"]))
+        return "metadata"
+
+    def fake_watch(paths, on_change, poll_interval):
+        legacy_path.write_text(json.dumps({"mcpServers": {"b": {"command": "b2"}, "c": {"command": "c"}}}),
+                               encoding="utf-8")
+        on_change(legacy_path)
+
+    monkeypatch.setattr(insert_variables, "extract_mcp_metadata", fake_extract)
+    monkeypatch.setattr(insert_variables, "watch_files", fake_watch)
+    insert_variables.watch_mcp_settings([current_path, legacy_path], tmp_path, None)
+
+    assert probed == [({"a": {"command": "a"}, "b": {"command": "b2"}, "c": {"command": "c"}}, ["c", "b"])]
+
+
+def render_once(insert_variables, roo_dir, template_path, inputs, force=False):
+    manifest = insert_variables.RenderManifest(roo_dir)
+    output_path = roo_dir / "system-prompt-code"
+    job = {"template_path": template_path, "output_path": output_path, "inputs": inputs,
+           "previous": manifest.previous(output_path)}
+    result = insert_variables.render_job(job, {"OS_PLACEHOLDER": "Linux"}, "", force=force)
+    manifest.update(output_path, result["entry"])
+    manifest.save()
+    return result["status"]
+
+
+def test_render_manifest_skips_unchanged_prompts(insert_variables, tmp_path):
+    template_path = tmp_path / "template"
+    template_path.write_text("system: OS_PLACEHOLDER\n", encoding="utf-8")
+    roo_dir = tmp_path / ".roo"
+    roo_dir.mkdir()
+    output_path = roo_dir / "system-prompt-code"
+    inputs = {"system_info": "digest"}
+
+    assert render_once(insert_variables, roo_dir, template_path, inputs) == "written"
+    assert output_path.read_text(encoding="utf-8") == "system: Linux\n"
+    manifest_stat = (roo_dir / insert_variables.RENDER_MANIFEST_NAME).stat()
+
+    assert render_once(insert_variables, roo_dir, template_path, inputs) == "unchanged"
+    assert (roo_dir / insert_variables.RENDER_MANIFEST_NAME).stat().st_mtime_ns == manifest_stat.st_mtime_ns
+    assert render_once(insert_variables, roo_dir, template_path, inputs, force=True) == "written"
+
+    # Changed inputs, a changed template and a hand-edited output are all rendered again
+    assert render_once(insert_variables, roo_dir, template_path, {"system_info": "other"}) == "written"
+    template_path.write_text("system: OS_PLACEHOLDER (edited)\n", encoding="utf-8")
+    assert render_once(insert_variables, roo_dir, template_path, {"system_info": "other"}) == "written"
+    output_path.write_text("edited by hand\n", encoding="utf-8")
+    assert render_once(insert_variables, roo_dir, template_path, {"system_info": "other"}) == "written"
+    assert output_path.read_text(encoding="utf-8") == "system: Linux (edited)\n"
+
+
+def test_render_manifest_ignores_other_versions(insert_variables, tmp_path):
+    manifest_path = tmp_path / insert_variables.RENDER_MANIFEST_NAME
+    manifest_path.write_text(json.dumps({"version": insert_variables.RENDER_MANIFEST_VERSION + 1,
+                                         "outputs": {"system-prompt-code": {"inputs": {}}}}))
+
+    assert insert_variables.RenderManifest(tmp_path).previous(tmp_path / "system-prompt-code") is None
+
+
+def test_toolchain_probe_is_cached(insert_variables, tmp_path, monkeypatch):
+    monkeypatch.setattr(insert_variables, "get_toolchain_cache_path", lambda: tmp_path / "toolchain_probe.json")
+    monkeypatch.setattr(insert_variables.shutil, "which", lambda name: None if name == "uv" else sys.executable)
+    probes = []
+
+    def fake_probe(python_path):
+        probes.append(python_path)
+        return {"python_major": 3, "mcp": True}
+
+    monkeypatch.setattr(insert_variables, "_probe_python", fake_probe)
+    first = insert_variables.probe_toolchain()
+
+    assert insert_variables.probe_toolchain() == first
+    assert probes == [sys.executable]
+    insert_variables.probe_toolchain(refresh=True)
+    assert len(probes) == 2
+
+
+def test_probe_python_inspects_this_interpreter_in_process(insert_variables, monkeypatch):
+    def no_subprocess(*args, **kwargs):
+        raise AssertionError("started a child process")
+
+    monkeypatch.setattr(insert_variables.subprocess, "run", no_subprocess)
+
+    assert insert_variables._probe_python(sys.executable)["python_major"] == sys.version_info[0]
+
+
+def write_fragments(fragments_dir, sections):
+    fragments_dir.mkdir(exist_ok=True)
+    for section, text in sections.items():
+        (fragments_dir / f"{section}.yaml").write_text(text, encoding="utf-8")
+
+
+def test_compose_template_includes_fragments_from_section_files(insert_variables, tmp_path):
+    write_fragments(tmp_path, {
+        "tools": "# Header comment\n#@fragment tools.a\n    a: 1\n#@fragment tools.b\n    b: 2\n    #@include modes.x\n",
+        "modes": "#@fragment modes.x\n    x: 3\n",
+    })
+    fragments = {}
+    composed = insert_variables.compose_template(
+        "tools:\n    #@include tools.b\n    #@include tools.a\nend: 0\n", tmp_path, fragments)
+
+    assert composed == "tools:\n    b: 2\n    x: 3\n    a: 1\nend: 0\n"
+    assert set(fragments) == {"tools.a", "tools.b", "modes.x"}
+    assert insert_variables.compose_template("plain: 1\n", tmp_path) == "plain: 1\n"
+
+
+def test_compose_template_rejects_cycles_and_unknown_fragments(insert_variables, tmp_path):
+    write_fragments(tmp_path, {"umb": "#@fragment umb.a\n#@include umb.b\n#@fragment umb.b\n#@include umb.a\n"})
+
+    with pytest.raises(ValueError, match="cycle"):
+        insert_variables.compose_template("#@include umb.a\n", tmp_path)
+    with pytest.raises(ValueError, match="umb.missing not found"):
+        insert_variables.compose_template("#@include umb.missing\n", tmp_path)
+    with pytest.raises(OSError):
+        insert_variables.compose_template("#@include nosection.a\n", tmp_path)
+
+
+def test_shipped_templates_compose_to_valid_yaml(insert_variables, roo_config_dir):
+    yaml = pytest.importorskip("yaml")
+    fragments = {}
+    for template_path in sorted((roo_config_dir / ".roo").glob("system-prompt-*")):
+        composed = insert_variables.compose_template(
+            template_path.read_text(encoding="utf-8"), roo_config_dir / "fragments", fragments)
+        assert "#@include" not in composed, template_path.name
+        assert isinstance(yaml.safe_load(composed), dict), template_path.name
+
+
+def test_render_mcp_section_adds_connected_servers_to_mcp_sections_without_one(insert_variables, roo_config_dir):
+    template = insert_variables.compose_template(
+        (roo_config_dir / ".roo" / "system-prompt-architect").read_text(encoding="utf-8"),
+        roo_config_dir / "fragments")
+    metadata = "## alpha (`run`)\n\n- tool: Does a thing"
+
+    rendered = insert_variables.render_mcp_section(template, metadata)
+
+    assert rendered.count("## alpha") == 1
+    assert rendered.count("\nmcp:") == 1
+    assert '    - "Markdown-only file modifications for configuration templates"\n' \
+           '  connected_servers:\n    ## alpha (`run`)\n' in rendered
+    assert "\n\nfile_authority:" in rendered
+    # Later refreshes replace the inserted metadata instead of adding another key
+    assert insert_variables.render_mcp_section(rendered, "## beta (`run`)").count("connected_servers:") == 1
+    assert "## alpha" not in insert_variables.render_mcp_section(rendered, "## beta (`run`)")
+
+
+SYSTEM_INFO = {"os": "Linux", "shell": "bash", "home_dir": "/home/user", "workspace_dir": "/work",
+               "global_settings": "/settings", "mcp_location": "/mcp", "mcp_settings": "/mcp/settings.json"}
+
+PLACEHOLDER_VALUES = {f"{name}_PLACEHOLDER": value for name, value in zip(
+    ["OS", "SHELL", "HOME", "WORKSPACE", "GLOBAL_SETTINGS", "MCP_LOCATION", "MCP_SETTINGS"], SYSTEM_INFO.values())}
+
+
+def test_minified_prompts_parse_to_the_same_data(insert_variables, roo_config_dir):
+    yaml = pytest.importorskip("yaml")
+    for template_path in sorted((roo_config_dir / ".roo").glob("system-prompt-*")):
+        composed = insert_variables.compose_template(
+            template_path.read_text(encoding="utf-8"), roo_config_dir / "fragments")
+        rendered = insert_variables.render_template(composed, PLACEHOLDER_VALUES)
+
+        minified, report = insert_variables.minify_prompt(rendered)
+
+        assert "error" not in report, template_path.name
+        assert report["minified_bytes"] < report["bytes"] == len(rendered.encode("utf-8"))
+        assert yaml.safe_load(minified) == yaml.safe_load(rendered), template_path.name
+
+
+def test_minify_prompt_keeps_documents_that_do_not_round_trip(insert_variables, monkeypatch):
+    yaml = pytest.importorskip("yaml")
+    content = "# comment\ntools:\n    - name: read_file\n"
+
+    kept, report = insert_variables.minify_prompt("tools: [unclosed\n")
+    assert kept == "tools: [unclosed\n"
+    assert report["error"].startswith("not valid YAML")
+
+    monkeypatch.setattr(yaml, "dump", lambda *args, **kwargs: "tools: []\n")
+    kept, report = insert_variables.minify_prompt(content)
+    assert kept == content
+    assert report == {"bytes": len(content), "minified_bytes": len(content),
+                      "error": "the minified prompt does not parse to the same data"}
+
+
+def test_toggling_minify_renders_prompts_again(insert_variables, tmp_path):
+    pytest.importorskip("yaml")
+    config_dir = tmp_path / "roo_config"
+    (config_dir / ".roo").mkdir(parents=True)
+    (config_dir / ".roo" / "system-prompt-code").write_text(
+        "# The code mode\nsystem:\n    os: OS_PLACEHOLDER\n", encoding="utf-8")
+    roo_dir = tmp_path / ".roo"
+    roo_dir.mkdir()
+    output_path = roo_dir / "system-prompt-code"
+
+    def render(minify):
+        assert insert_variables.process_system_prompt_files(roo_dir, config_dir, SYSTEM_INFO, "", minify=minify) == {}
+        return output_path.read_text(encoding="utf-8")
+
+    assert render(False) == "# The code mode\nsystem:\n    os: Linux\n"
+    assert render(True) == "system: {os: Linux}\n"
+    assert render(False) == "# The code mode\nsystem:\n    os: Linux\n"
+
+
+def make_render_jobs(tmp_path, count):
+    jobs = []
+    for index in range(count):
+        template_path = tmp_path / f"template{index}"
+        # Larger templates first, so later jobs tend to finish before earlier ones
+        template_path.write_text(f"mode: {index}\nos: OS_PLACEHOLDER\n" + "# padding\n" * (count - index) * 2000,
+                                 encoding="utf-8")
+        jobs.append({"template_path": str(template_path), "output_path": str(tmp_path / f"system-prompt-{index}"),
+                     "inputs": {}, "previous": None})
+    return jobs
+
+
+@pytest.mark.parametrize("pool", ["thread", "process"])
+def test_run_render_jobs_returns_results_in_job_order(insert_variables, tmp_path, pool):
+    jobs = make_render_jobs(tmp_path, 6)
+
+    results = insert_variables.run_render_jobs(jobs, {"OS_PLACEHOLDER": "Linux"}, "", workers=3, pool=pool)
+
+    assert [result["path"] for result in results] == [job["output_path"] for job in jobs]
+    assert [result["status"] for result in results] == ["written"] * 6
+    for index in range(len(jobs)):
+        assert (tmp_path / f"system-prompt-{index}").read_text(encoding="utf-8").startswith(f"mode: {index}\nos: Linux\n")
+
+
+def test_run_render_jobs_reports_failing_jobs_and_writes_the_others(insert_variables, tmp_path):
+    jobs = make_render_jobs(tmp_path, 3)
+    # A directory in place of the output makes the atomic rename fail
+    (tmp_path / "system-prompt-1").mkdir()
+
+    results = insert_variables.run_render_jobs(jobs, {"OS_PLACEHOLDER": "Linux"}, "", workers=3)
+
+    assert [result["status"] for result in results] == ["written", "error", "written"]
+    assert results[1]["error"].startswith(("IsADirectoryError", "OSError", "PermissionError"))
+    assert (tmp_path / "system-prompt-0").is_file() and (tmp_path / "system-prompt-2").is_file()
+    assert not any(path.name.endswith(".tmp") for path in tmp_path.iterdir())
+
+
+def test_main_fails_when_a_prompt_cannot_be_rendered(insert_variables, tmp_path, monkeypatch, capsys):
+    config_dir = tmp_path / "roo_config"
+    (config_dir / ".roo").mkdir(parents=True)
+    for mode in ["ask", "code", "debug"]:
+        (config_dir / ".roo" / f"system-prompt-{mode}").write_text(f"mode: {mode}\n", encoding="utf-8")
+    (tmp_path / ".roo" / "system-prompt-code").mkdir(parents=True)
+    monkeypatch.setattr(insert_variables, "get_script_dir", lambda: config_dir)
+    monkeypatch.setattr(insert_variables, "get_system_info", lambda: dict(SYSTEM_INFO, workspace_dir=str(tmp_path)))
+    monkeypatch.setattr(insert_variables, "load_mcp_checker", lambda script_path: object())
+    monkeypatch.setattr(insert_variables, "extract_mcp_metadata", lambda script_path, options: "## alpha (`run`)")
+
+    assert insert_variables.main(["--jobs", "2"]) == 1
+    assert "Failed to render 1 system prompt file(s)" in capsys.readouterr().out
+    for mode in ["ask", "debug"]:
+        assert "## alpha" in (tmp_path / ".roo" / f"system-prompt-{mode}").read_text(encoding="utf-8")
+
+
+def test_render_template_substitutes_in_a_single_pass(insert_variables):
+    replacements = {"OS_PLACEHOLDER": "Linux in WORKSPACE_PLACEHOLDER", "WORKSPACE_PLACEHOLDER": "/work"}
+    template = "os: OS_PLACEHOLDER\nworkspace: WORKSPACE_PLACEHOLDER\nother: UNKNOWN_PLACEHOLDER\n"
+
+    rendered = insert_variables.render_template(template, replacements)
+
+    # Substituted values are not scanned for placeholders again, unknown placeholders are kept
+    assert rendered == "os: Linux in WORKSPACE_PLACEHOLDER\nworkspace: /work\nother: UNKNOWN_PLACEHOLDER\n"
+    assert insert_variables.render_template(template, replacements) == rendered
+    assert insert_variables.render_template("no placeholders\n", replacements) == "no placeholders\n"
+
+
+def test_failed_render_leaves_the_previous_prompt_intact(insert_variables, tmp_path, monkeypatch):
+    template_path = tmp_path / "template"
+    template_path.write_text("os: OS_PLACEHOLDER\n", encoding="utf-8")
+    template_path.chmod(0o640)
+    output_path = tmp_path / "system-prompt-code"
+    output_path.write_text("previous\n", encoding="utf-8")
+    job = {"template_path": str(template_path), "output_path": str(output_path), "inputs": {}, "previous": None}
+
+    def failing_copymode(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(insert_variables.shutil, "copymode", failing_copymode)
+    result = insert_variables.render_job(job, {"OS_PLACEHOLDER": "Linux"}, "")
+
+    assert result["status"] == "error" and "disk full" in result["error"]
+    assert output_path.read_text(encoding="utf-8") == "previous\n"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["system-prompt-code", "template"]
+
+    monkeypatch.undo()
+    assert insert_variables.render_job(job, {"OS_PLACEHOLDER": "Linux"}, "")["status"] == "written"
+    assert output_path.read_text(encoding="utf-8") == "os: Linux\n"
+    assert output_path.stat().st_mode & 0o777 == 0o640
+
+
+def test_fragment_sections_are_parsed_once_per_change(insert_variables, tmp_path):
+    write_fragments(tmp_path, {"tools": "#@fragment tools.a\na: 1\n#@fragment tools.b\nb: 2\n"})
+    parse = insert_variables._parse_fragment_section
+    parse.cache_clear()
+
+    composed = insert_variables.compose_template("#@include tools.a\n#@include tools.b\n", tmp_path)
+    assert composed == "a: 1\nb: 2\n"
+    assert insert_variables.compose_template("#@include tools.b\n", tmp_path) == "b: 2\n"
+    assert parse.cache_info().misses == 1
+
+    write_fragments(tmp_path, {"tools": "#@fragment tools.b\nb: 22\n"})
+    assert insert_variables.compose_template("#@include tools.b\n", tmp_path) == "b: 22\n"
+    assert parse.cache_info().misses == 2
@@ -0,0 +1,347 @@
+"""Tests for roo_config/mcp_checker.py."""
+
+import os
+import json
+import stat
+import time
+import asyncio
+
+import pytest
+
+
+def write_settings(tmp_path, names):
+    path = tmp_path / "mcp_settings.json"
+    path.write_text(json.dumps({"mcpServers": {name: {"command": "unused"} for name in names}}))
+    return str(path)
+
+
+def test_extract_all_metadata_bounds_concurrency_and_keeps_order(mcp_checker, tmp_path):
+    names = [f"server{index}" for index in range(6)]
+    extractor = mcp_checker.MCPMetadataExtractor(write_settings(tmp_path, names), concurrency=2, budget=None)
+    in_flight, peak = [0], [0]
+
+    async def fake_probe(server_name, metadata=None):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        # Later servers finish first
+        await asyncio.sleep(0.01 * (len(names) - names.index(server_name)))
+        in_flight[0] -= 1
+        if server_name == "server3":
+            raise RuntimeError("boom")
+        metadata.update({"name": server_name, "status": "connected", "tools": [], "resources": []})
+        return metadata
+
+    extractor.extract_server_metadata = fake_probe
+    results = asyncio.run(extractor.extract_all_metadata())
+
+    assert peak[0] == 2
+    assert list(results) == names
+    assert results["server3"]["status"] == "error"
+    assert results["server3"]["error"] == "boom"
+    assert all(results[name]["status"] == "connected" for name in names if name != "server3")
+
+
+def test_connect_timeout_is_reported_as_timeout(mcp_checker, stub_settings):
+    pytest.importorskip("mcp")
+    extractor = mcp_checker.MCPMetadataExtractor(stub_settings(["--latency", 3, "--tools", 2]),
+                                                 connect_timeout=1, budget=None)
+    results = asyncio.run(extractor.extract_all_metadata())
+
+    assert results["stub0"]["status"] == "timeout"
+    assert results["stub0"]["error"] == "initialize did not complete within 1s"
+
+
+def test_budget_expiry_is_reported_as_timeout(mcp_checker, stub_settings):
+    pytest.importorskip("mcp")
+    extractor = mcp_checker.MCPMetadataExtractor(stub_settings(["--latency", 1.5, "--tools", 2], count=2),
+                                                 budget=2)
+    results = asyncio.run(extractor.extract_all_metadata())
+
+    for server_data in results.values():
+        assert server_data["status"] == "timeout"
+        assert server_data["error"] == "time budget of 2s exhausted"
+
+
+def test_budget_expiry_does_not_outlive_its_run(mcp_checker, tmp_path):
+    pytest.importorskip("mcp")
+    extractor = mcp_checker.MCPMetadataExtractor(write_settings(tmp_path, ["missing"]), budget=30)
+    # As left behind by an earlier run of the same extractor that ran out of time
+    extractor._budget_expired = True
+    
+    results = asyncio.run(extractor.extract_all_metadata())
+    
+    assert results["missing"]["status"] == "error"
+    assert not extractor._budget_expired
+
+
+def test_describe_error_unwraps_exception_groups(mcp_checker):
+    group = mcp_checker._BaseExceptionGroup("outer", [ValueError("bad"), mcp_checker._BaseExceptionGroup(
+        "inner", [OSError("gone")])])
+
+    assert mcp_checker.describe_error(group) == "bad; gone"
+    assert mcp_checker.describe_error(ValueError()) == "ValueError"
+
+
+def test_metadata_cache_round_trip_and_ttl(mcp_checker, tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.json")
+    cache = mcp_checker.MetadataCache(path, ttl=60)
+    cache.put("key", {"status": "connected"})
+    cache.save()
+
+    assert mcp_checker.MetadataCache(path, ttl=60).get("key") == {"status": "connected"}
+    clock = mcp_checker.time.time()
+    monkeypatch.setattr(mcp_checker.time, "time", lambda: clock + 61)
+    assert mcp_checker.MetadataCache(path, ttl=60).get("key") is None
+
+
+def test_metadata_cache_evicts_least_recently_used(mcp_checker, tmp_path, monkeypatch):
+    metadata = {"description": "x" * 100}
+    size = len(json.dumps(metadata))
+    cache = mcp_checker.MetadataCache(str(tmp_path / "cache.json"), max_bytes=2 * size)
+    clock = [1000.0]
+    monkeypatch.setattr(mcp_checker.time, "time", lambda: clock[0])
+    for key in ("a", "b"):
+        cache.put(key, metadata)
+        clock[0] += 1
+    cache.get("a")
+    clock[0] += 1
+    cache.put("c", metadata)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == metadata
+    assert cache.get("c") == metadata
+
+
+def test_metadata_cache_hit_does_not_rewrite_file(mcp_checker, tmp_path):
+    path = tmp_path / "cache.json"
+    cache = mcp_checker.MetadataCache(str(path))
+    cache.put("key", {"status": "connected"})
+    cache.save()
+    before = path.stat()
+
+    warm = mcp_checker.MetadataCache(str(path))
+    assert warm.get("key") == {"status": "connected"}
+    warm.save()
+
+    after = path.stat()
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+
+
+def test_daemon_socket_falls_back_to_private_directory(mcp_checker, tmp_path, monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(mcp_checker.tempfile, "gettempdir", lambda: str(tmp_path))
+    socket_path = mcp_checker.get_daemon_socket_path()
+
+    assert os.path.dirname(socket_path) == str(tmp_path / f"rooflow-mcp-{os.getuid()}")
+
+
+def test_query_daemon_ignores_socket_of_another_user(mcp_checker, tmp_path, monkeypatch, caplog):
+    socket_path = tmp_path / "daemon.sock"
+    socket_path.write_text("")
+    other_user = os.getuid() + 1
+    monkeypatch.setattr(mcp_checker.os, "getuid", lambda: other_user)
+
+    assert asyncio.run(mcp_checker.query_daemon(str(socket_path), {"command": "status"})) is None
+    assert "belongs to another user" in caplog.text
+
+
+def test_daemon_forwards_no_cache_and_deadlines(mcp_checker, stub_settings, tmp_path):
+    pytest.importorskip("mcp")
+    settings_path = stub_settings(["--tools", 2])
+    socket_path = str(tmp_path / "d" / "probe.sock")
+
+    async def scenario():
+        daemon = mcp_checker.ProbeDaemon(socket_path, connect_timeout=30)
+        serving = asyncio.ensure_future(daemon.serve())
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.05)
+        try:
+            extractor = mcp_checker.MCPMetadataExtractor(settings_path, connect_timeout=12)
+            first = await extractor.collect_metadata(socket_path=socket_path)
+            warm = await extractor.collect_metadata(socket_path=socket_path)
+            fresh = await extractor.collect_metadata(socket_path=socket_path, no_cache=True)
+            recorded = []
+            original = daemon.metadata
+
+            async def spy(*args, **kwargs):
+                recorded.append(kwargs)
+                return await original(*args, **kwargs)
+
+            daemon.metadata = spy
+            await extractor.collect_metadata(socket_path=socket_path)
+            return first, warm, fresh, recorded
+        finally:
+            await mcp_checker.query_daemon(socket_path, {"command": "shutdown"})
+            await serving
+
+    first, warm, fresh, recorded = asyncio.run(scenario())
+
+    assert first["stub0"]["status"] == "connected"
+    assert warm["stub0"].get("cached") is True
+    assert "cached" not in fresh["stub0"]
+    assert recorded[0]["connect_timeout"] == 12
+    assert stat.S_IMODE(os.stat(os.path.dirname(socket_path)).st_mode) == 0o700
+
+
+class IdleSession:
+    server_name = "idle"
+    last_used = 0.0
+    
+    def __init__(self):
+        self.closed = False
+    
+    async def close(self):
+        self.closed = True
+
+
+def test_reaping_idle_sessions_drops_their_locks(mcp_checker, tmp_path):
+    daemon = mcp_checker.ProbeDaemon(str(tmp_path / "daemon.sock"), idle_timeout=1.0)
+    idle, busy = IdleSession(), IdleSession()
+    
+    async def reap():
+        daemon._sessions.update(idle=idle, busy=busy)
+        daemon._locks.update(idle=asyncio.Lock(), busy=asyncio.Lock())
+        await daemon._locks["busy"].acquire()
+        reaper = asyncio.ensure_future(daemon._reap_idle_sessions())
+        await asyncio.sleep(1.2)
+        reaper.cancel()
+        await asyncio.gather(reaper, return_exceptions=True)
+    
+    asyncio.run(reap())
+    
+    assert idle.closed and not busy.closed
+    assert list(daemon._sessions) == ["busy"]
+    assert list(daemon._locks) == ["busy"]
+
+
+def test_pagination_cursors_are_followed(mcp_checker, stub_settings):
+    pytest.importorskip("mcp")
+    extractor = mcp_checker.MCPMetadataExtractor(stub_settings(["--tools", 5, "--resources", 3, "--page-size", 2]))
+    results = asyncio.run(extractor.extract_all_metadata())
+
+    assert results["stub0"]["status"] == "connected"
+    assert len(results["stub0"]["tools"]) == 5
+    assert len({tool["name"] for tool in results["stub0"]["tools"]}) == 5
+    assert results["stub0"]["payload"]["resources"] == 3
+
+
+def test_repeated_pagination_cursor_stops_listing(mcp_checker, tmp_path):
+    extractor = mcp_checker.MCPMetadataExtractor(write_settings(tmp_path, []))
+    calls = []
+
+    class Page:
+        def __init__(self, tools, cursor):
+            self.tools = tools
+            self.nextCursor = cursor
+
+    async def list_tools(cursor=None):
+        calls.append(cursor)
+        # The server keeps handing out the same cursor
+        return Page([len(calls)], "again")
+
+    pages = []
+    asyncio.run(extractor._list_pages(list_tools, "tools", pages.extend))
+
+    assert calls == [None, "again"]
+    assert pages == [1, 2]
+
+
+def expand_refs(schema, definitions):
+    if isinstance(schema, dict):
+        if set(schema) == {"$ref"} and schema["$ref"] in definitions:
+            return expand_refs(definitions[schema["$ref"]], definitions)
+        return {key: expand_refs(value, definitions) for key, value in schema.items()}
+    if isinstance(schema, list):
+        return [expand_refs(item, definitions) for item in schema]
+    return schema
+
+
+def test_share_schemas_hoists_repeated_subschemas(mcp_checker, tmp_path):
+    extractor = mcp_checker.MCPMetadataExtractor(write_settings(tmp_path, []), compact=True)
+    address = {"type": "object", "properties": {"street": {"type": "string"}, "city": {"type": "string"}}}
+    tools = [
+        {"name": "ship", "inputSchema": {"$schema": "x", "type": "object", "properties": {"to": address}}},
+        {"name": "bill", "inputSchema": {"type": "object", "properties": {"address": address,
+                                                                          "note": {"type": "string"}}}},
+    ]
+    metadata = {"shop": {"status": "connected", "tools": tools}, "empty": {"status": "error"}}
+
+    rewritten, definitions = extractor._share_schemas(metadata)
+
+    assert definitions == {"#S1": address}
+    ship, bill = rewritten["shop"]["tools"]
+    assert ship["inputSchema"] == {"type": "object", "properties": {"to": {"$ref": "#S1"}}}
+    assert bill["inputSchema"]["properties"]["address"] == {"$ref": "#S1"}
+    assert expand_refs(bill["inputSchema"], definitions) == tools[1]["inputSchema"]
+    assert rewritten["empty"] is metadata["empty"]
+
+
+def test_share_schemas_inlines_definitions_used_once(mcp_checker, tmp_path):
+    extractor = mcp_checker.MCPMetadataExtractor(write_settings(tmp_path, []), compact=True)
+    schema = {"type": "object", "properties": {"query": {"type": "string", "description": "Search terms"}}}
+    metadata = {"search": {"status": "connected", "tools": [{"name": "find", "inputSchema": schema}]}}
+
+    rewritten, definitions = extractor._share_schemas(metadata)
+
+    assert definitions == {}
+    assert rewritten["search"]["tools"][0]["inputSchema"] == schema
+
+
+def test_strip_schema_drops_only_implied_defaults(mcp_checker, tmp_path):
+    extractor = mcp_checker.MCPMetadataExtractor(write_settings(tmp_path, []), compact=True)
+    schema = {"$schema": "x", "title": "Args", "type": "object", "required": [], "additionalProperties": True,
+              "properties": {"limit": {"type": ["integer", "null"], "default": None},
+                             "strict": {"type": "boolean", "default": False}}}
+
+    # An explicit null default is information, unlike a missing default
+    assert extractor._strip_schema(schema) == {
+        "type": "object",
+        "properties": {"limit": {"type": ["integer", "null"], "default": None},
+                       "strict": {"type": "boolean", "default": False}}}
+
+
+def budget_metadata():
+    address = {"type": "object", "properties": {"street": {"type": "string"}, "city": {"type": "string"}}}
+    schema = {"type": "object", "properties": {"to": address, "count": {"type": "integer"}}}
+    tools = [{"name": f"tool{index}", "description": "Does a thing " * 5, "inputSchema": schema} for index in range(4)]
+    return {f"server{index}": {"command": "run", "args": [], "status": "connected", "tools": tools, "resources": []}
+            for index in range(3)}
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_markdown_budget_is_met_when_possible(mcp_checker, tmp_path, compact):
+    for max_tokens in range(60, 900, 7):
+        extractor = mcp_checker.MCPMetadataExtractor(write_settings(tmp_path, []), max_tokens=max_tokens,
+                                                     compact=compact)
+        output = extractor.format_markdown(budget_metadata())
+        assert mcp_checker.estimate_tokens(output) <= max_tokens, max_tokens
+
+
+def test_markdown_budget_overshoot_is_reported(mcp_checker, tmp_path, caplog):
+    extractor = mcp_checker.MCPMetadataExtractor(write_settings(tmp_path, []), max_tokens=3)
+    output = extractor.format_markdown(budget_metadata())
+
+    assert "## server0" not in output
+    assert "exceeds the 3-token budget by about" in caplog.text
+
+
+def test_daemon_query_and_fallback_share_one_budget(mcp_checker, stub_settings, tmp_path):
+    pytest.importorskip("mcp")
+    socket_path = str(tmp_path / "hung.sock")
+    extractor = mcp_checker.MCPMetadataExtractor(stub_settings(["--latency", 0.5]), budget=1)
+
+    async def scenario():
+        async def never_answer(reader, writer):
+            await asyncio.sleep(30)
+
+        # A daemon that accepts requests but never answers
+        server = await asyncio.start_unix_server(never_answer, path=socket_path)
+        async with server:
+            started = time.monotonic()
+            results = await extractor.collect_metadata(socket_path=socket_path)
+            return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(scenario())
+
+    assert results["stub0"]["status"] == "timeout"
+    assert elapsed < 1.8
@@ -0,0 +1,137 @@
+"""Tests for roo_config/memory_compact.py."""
+
+import sys
+import logging
+
+
+DOCUMENT = """# Progress
+
+## Done
+- 2024-01-05 First entry
+  continued
+- 2024-02-10 Second entry
+
+```
+- 2024-03-01 in a fence
+```
+
+## 2024-03-15 Release
+Details
+### Notes
+More details
+## Next
+- 2024-04-01 Third entry
+"""
+
+
+def test_parse_document_finds_dated_entries(memory_compact):
+    document = memory_compact.parse_document(DOCUMENT)
+    lines = document["lines"]
+
+    assert [(entry["date"], entry["section"]) for entry in document["entries"]] == [
+        ("2024-01-05", "## Done"), ("2024-02-10", "## Done"),
+        ("2024-03-15", "## Done"), ("2024-04-01", "## Next"),
+    ]
+    first, second, release, third = document["entries"]
+    assert "".join(lines[first["start"]:first["end"]]) == "- 2024-01-05 First entry\n  continued\n"
+    # A dated line entry ends before a fenced code block
+    assert "".join(lines[second["start"]:second["end"]]) == "- 2024-02-10 Second entry\n"
+    # A dated heading keeps its subheadings
+    assert "".join(lines[release["start"]:release["end"]]).endswith("### Notes\nMore details\n")
+    assert first["bytes"] == len("- 2024-01-05 First entry\n  continued\n")
+    assert document["index_at"] is None
+
+
+def test_parse_document_keeps_trailing_undated_content_out_of_entries(memory_compact):
+    text = ("# Log\n- 2024-01-01 First\n\n    indented continuation\n\n- 2024-01-02 Last\n\n"
+            "```\ncode\n```\n\nClosing notes.\n")
+    document = memory_compact.parse_document(text)
+    lines = document["lines"]
+
+    assert ["".join(lines[entry["start"]:entry["end"]]) for entry in document["entries"]] == [
+        "- 2024-01-01 First\n\n    indented continuation\n\n", "- 2024-01-02 Last\n"]
+    assert memory_compact.parse_document("- 2024-01-01 Entry\n\nClosing notes.\n")["entries"][0]["end"] == 1
+
+
+def test_plan_render_keeps_content_after_the_last_entry(memory_compact, tmp_path):
+    path = tmp_path / "progress.md"
+    path.write_text("# Log\n- 2024-01-01 Old\n- 2024-01-02 New\n\n```\ncode\n```\n", encoding="utf-8")
+    plan = memory_compact.CompactionPlan(path, keep=0, archive="archive/progress.md.gz")
+    for entry in plan.candidates:
+        plan.remove(entry)
+
+    assert "```\ncode\n```\n" in plan.render()
+    assert "code" not in plan.archived_text("progress.md")
+
+
+def test_parse_document_takes_out_an_earlier_index(memory_compact):
+    index = memory_compact.render_index({"2023-12": 2, "2024-01": 1}, ["archive/progress.md.gz"])
+    document = memory_compact.parse_document("# Progress\n\n" + index + "- 2024-05-01 Entry\n")
+
+    assert document["months"] == {"2023-12": 2, "2024-01": 1}
+    assert document["archives"] == ["archive/progress.md.gz"]
+    assert document["index_at"] == 2
+    assert "".join(document["lines"]) == "# Progress\n\n- 2024-05-01 Entry\n"
+
+
+def write_bank(directory, files):
+    directory.mkdir(exist_ok=True)
+    paths = []
+    for name, entries in files.items():
+        path = directory / name
+        path.write_text("# Log\n" + "".join(f"- 2024-01-{day:02d} {'x' * 90}\n" for day in entries),
+                        encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def test_plan_compaction_archives_oldest_entries_over_file_budget(memory_compact, tmp_path):
+    paths = write_bank(tmp_path, {"a.md": range(1, 11), "b.md": range(1, 3)})
+
+    plans, total = memory_compact.plan_compaction(paths, 600, 10**6, keep=2)
+
+    assert [plan.path.name for plan in plans] == ["a.md"]
+    plan = plans[0]
+    assert plan.size <= 600
+    removed = sorted(entry["date"] for entry in plan.document["entries"] if entry["start"] in plan.removed)
+    assert removed == [f"2024-01-{day:02d}" for day in range(1, len(removed) + 1)]
+    assert total == plan.size + paths[1].stat().st_size
+
+    compacted = plan.render()
+    assert len(compacted.encode("utf-8")) == plan.size
+    assert memory_compact.INDEX_START in compacted and "2024-01-10" in compacted
+
+
+def test_plan_compaction_archives_oldest_entries_of_all_files_over_total_budget(memory_compact, tmp_path):
+    paths = write_bank(tmp_path, {"a.md": [2, 4, 6], "b.md": [1, 3, 5]})
+
+    plans, total = memory_compact.plan_compaction(paths, 10**6, 500, keep=1)
+
+    removed = sorted((entry["date"], plan.path.name) for plan in plans
+                     for entry in plan.document["entries"] if entry["start"] in plan.removed)
+    assert removed[:2] == [("2024-01-01", "b.md"), ("2024-01-02", "a.md")]
+    assert total == sum(plan.size for plan in plans)
+
+
+def run_main(memory_compact, monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["memory_compact.py", *map(str, args)])
+    memory_compact.main()
+
+
+def test_main_reports_whether_the_bank_is_within_budget(memory_compact, tmp_path, monkeypatch, caplog):
+    write_bank(tmp_path, {"a.md": [1, 2]})
+    caplog.set_level(logging.INFO)
+
+    run_main(memory_compact, monkeypatch, "--memory-bank", tmp_path)
+    assert "within budget" in caplog.text
+
+    caplog.clear()
+    run_main(memory_compact, monkeypatch, "--memory-bank", tmp_path, "--max-total-bytes", 100, "--keep", 2)
+    assert "over its budget" in caplog.text
+    assert "within budget" not in caplog.text
+    assert "No entries can be archived" in caplog.text
+
+    caplog.clear()
+    run_main(memory_compact, monkeypatch, "--memory-bank", tmp_path, "--max-file-bytes", 100, "--keep", 2)
+    assert "per-file budget of 100 bytes could not be met for a.md" in caplog.text
+    assert "within budget" not in caplog.text
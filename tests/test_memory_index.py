@@ -0,0 +1,100 @@
+"""Tests for roo_config/memory_index.py."""
+
+import pytest
+
+
+def test_split_chunks_follows_headings(memory_index):
+    text = "Preamble\n\n# Tech\n\nPython\n\n## DB\nSQLite\n### Empty\n\n# Next\n```\n# not a heading\n```\n"
+
+    assert memory_index.split_chunks(text) == [
+        ("", 1, 1, "Preamble"),
+        ("Tech", 3, 5, "# Tech\n\nPython"),
+        ("Tech > DB", 7, 8, "## DB\nSQLite"),
+        ("Next", 11, 14, "# Next\n```\n# not a heading\n```"),
+    ]
+
+
+def test_split_chunks_splits_long_sections_at_blank_lines(memory_index):
+    # The section is split at its first blank line, leaving a piece of only
+    # blank lines before the next heading
+    text = '# Tech\n' + ('x' * 100 + '\n') * 45 + '\n\n## DB\nSQLite\n'
+
+    chunks = memory_index.split_chunks(text)
+
+    assert [chunk[:3] for chunk in chunks] == [("Tech", 1, 46), ("Tech > DB", 49, 50)]
+    assert all(chunk[3].strip() for chunk in chunks)
+
+
+def test_split_chunks_keeps_paragraphs_together(memory_index, monkeypatch):
+    monkeypatch.setattr(memory_index, "MAX_CHUNK_CHARS", 10)
+    text = "# H\naaaa\nbbbb\n\n\ncccc\n\ndddddddddddddd\n"
+
+    assert memory_index.split_chunks(text) == [
+        ("H", 1, 3, "# H\naaaa\nbbbb"),
+        ("H", 6, 8, "cccc\n\ndddddddddddddd"),
+    ]
+
+
+@pytest.fixture
+def memory_bank(tmp_path, memory_index):
+    if not memory_index.fts5_available():
+        pytest.skip("sqlite3 was built without FTS5")
+    bank = tmp_path / "memory-bank"
+    bank.mkdir()
+    (bank / "productContext.md").write_text("# Product\n\nA tool for notes.\n", encoding="utf-8")
+    (bank / "decisionLog.md").write_text("# Decisions\n\n## Storage\nWe chose the database.\n", encoding="utf-8")
+    (bank / "activeContext.md").write_text("# Active\n\nWorking on search.\n", encoding="utf-8")
+    return bank
+
+
+def open_index(memory_index, memory_bank):
+    return memory_index.MemoryIndex(memory_bank, memory_bank.parent / ".roo" / "memory-index.sqlite3")
+
+
+def test_update_reindexes_changed_files_and_drops_deleted_ones(memory_index, memory_bank):
+    index = open_index(memory_index, memory_bank)
+    try:
+        assert index.update() == {"indexed": 3, "removed": 0, "unchanged": 0, "chunks": 3}
+        assert index.update() == {"indexed": 0, "removed": 0, "unchanged": 3, "chunks": 0}
+
+        (memory_bank / "activeContext.md").write_text("# Active\n\nWorking on compaction now.\n", encoding="utf-8")
+        (memory_bank / "productContext.md").unlink()
+        assert index.update() == {"indexed": 1, "removed": 1, "unchanged": 1, "chunks": 1}
+
+        assert [result["path"] for result in index.search("compaction")] == ["activeContext.md"]
+        assert index.search("search") == []
+        assert index.search("notes") == []
+    finally:
+        index.close()
+
+
+def test_search_ranks_heading_matches_first(memory_index, memory_bank):
+    (memory_bank / "systemPatterns.md").write_text(
+        "# Patterns\n\n## Caching\nResults are kept.\n\n## Workers\nThe workers read the caching layer often.\n",
+        encoding="utf-8")
+    index = open_index(memory_index, memory_bank)
+    try:
+        index.update()
+        results = index.search("caching")
+
+        assert [result["heading"] for result in results] == ["Patterns > Caching", "Patterns > Workers"]
+        assert results[0]["score"] < results[1]["score"]
+        assert (results[0]["start_line"], results[0]["end_line"]) == (3, 4)
+        assert index.search("!!!") == []
+    finally:
+        index.close()
+
+
+def test_index_of_another_version_is_rebuilt(memory_index, memory_bank):
+    index = open_index(memory_index, memory_bank)
+    index.update()
+    index.connection.execute(f"PRAGMA user_version = {memory_index.INDEX_VERSION + 1}")
+    index.connection.commit()
+    index.close()
+
+    index = open_index(memory_index, memory_bank)
+    try:
+        assert index.connection.execute("PRAGMA user_version").fetchone()[0] == memory_index.INDEX_VERSION
+        assert index.update()["indexed"] == 3
+    finally:
+        index.close()
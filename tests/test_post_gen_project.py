@@ -0,0 +1,108 @@
+"""Tests for hooks/post_gen_project.py."""
+
+import os
+import sys
+
+
+
+def make_templates(project_dir):
+    template_dir = project_dir / "roo_config" / ".roo"
+    template_dir.mkdir(parents=True)
+    (template_dir / "system-prompt-plain").write_text("mode: plain\n", encoding="utf-8")
+    (template_dir / "system-prompt-shared").write_text("mode: shared\n#@include system_information\n",
+                                                        encoding="utf-8")
+    fragments_dir = project_dir / "roo_config" / "fragments"
+    fragments_dir.mkdir()
+    (fragments_dir / "system_information.yaml").write_text("#@fragment system_information\nos: Linux\n",
+                                                             encoding="utf-8")
+
+
+def test_fallback_composes_fragments(post_gen_project, insert_variables, tmp_path, monkeypatch):
+    make_templates(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    assert post_gen_project.copy_system_prompt_files(insert_variables)
+    assert (tmp_path / ".roo" / "system-prompt-shared").read_text() == "mode: shared\nos: Linux\n"
+    assert (tmp_path / ".roo" / "system-prompt-plain").read_text() == "mode: plain\n"
+
+
+def test_fallback_refuses_templates_it_cannot_compose(post_gen_project, tmp_path, monkeypatch, caplog):
+    make_templates(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    post_gen_project.copy_system_prompt_files(None)
+
+    assert not (tmp_path / ".roo" / "system-prompt-shared").exists()
+    assert (tmp_path / ".roo" / "system-prompt-plain").read_text() == "mode: plain\n"
+    assert "Cannot copy system-prompt-shared" in caplog.text
+
+
+class FakeInsertVariables:
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def main(self, argv):
+        self.calls.append(argv)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def record_commands(post_gen_project, monkeypatch):
+    commands = []
+
+    def fake_run_command(cmd, error_msg=None):
+        commands.append(cmd)
+        return True, ""
+
+    monkeypatch.setattr(post_gen_project, "run_command", fake_run_command)
+    return commands
+
+
+def test_run_insert_variables_in_process(post_gen_project, monkeypatch):
+    commands = record_commands(post_gen_project, monkeypatch)
+    module = FakeInsertVariables(0)
+
+    assert post_gen_project.run_insert_variables(module) == (True, "")
+    assert module.calls == [[]]
+    assert commands == []
+
+    # A failed run is reported, not run a second time
+    assert post_gen_project.run_insert_variables(FakeInsertVariables(1)) == (
+        False, "insert_variables.py exited with status 1")
+    assert commands == []
+
+
+def test_run_insert_variables_falls_back_to_this_interpreter(post_gen_project, tmp_path, monkeypatch):
+    commands = record_commands(post_gen_project, monkeypatch)
+    script_path = tmp_path / "insert_variables.py"
+    script_path.write_text("import missing_module_for_the_test\n", encoding="utf-8")
+
+    module = post_gen_project.load_insert_variables(str(script_path))
+    assert module is None
+    assert post_gen_project.run_insert_variables(module, str(script_path)) == (True, "")
+    assert post_gen_project.run_insert_variables(FakeInsertVariables(RuntimeError("boom")), str(script_path)) == (
+        True, "")
+    assert commands == [[sys.executable, str(script_path)]] * 2
+
+
+def test_fallback_keeps_prompts_written_by_insert_variables(post_gen_project, insert_variables, tmp_path, monkeypatch):
+    make_templates(tmp_path)
+    (tmp_path / ".roo").mkdir()
+    rendered = tmp_path / ".roo" / "system-prompt-shared"
+    rendered.write_text("rendered by insert_variables\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    written = []
+    write_text_atomic = insert_variables.write_text_atomic
+
+    def record_write(path, content, mode_from=None):
+        written.append(path)
+        write_text_atomic(path, content, mode_from)
+
+    monkeypatch.setattr(insert_variables, "write_text_atomic", record_write)
+
+    assert post_gen_project.copy_system_prompt_files(insert_variables)
+    # Only the missing prompt is written
+    assert written == [os.path.join(".roo", "system-prompt-plain")]
+    assert rendered.read_text(encoding="utf-8") == "rendered by insert_variables\n"
+    assert (tmp_path / ".roo" / "system-prompt-plain").read_text(encoding="utf-8") == "mode: plain\n"
@@ -0,0 +1,41 @@
+"""Tests for roo_config/prompt_report.py."""
+
+import logging
+
+import pytest
+
+
+def test_split_sections_keeps_preamble_and_merges_repeated_keys(prompt_report):
+    content = "# Generated prompt\n\nmcp:\n  overview: x\ntools:\n  - a\nmcp:\n  connected_servers: y\n"
+
+    sections = prompt_report.split_sections(content)
+
+    assert list(sections) == [prompt_report.PREAMBLE_SECTION, "mcp", "tools"]
+    assert sections[prompt_report.PREAMBLE_SECTION] == "# Generated prompt\n\n"
+    assert sections["mcp"] == "mcp:\n  overview: x\nmcp:\n  connected_servers: y\n"
+    assert sum(map(len, sections.values())) == len(content)
+    assert prompt_report.split_sections("tools:\n  - a\n") == {"tools": "tools:\n  - a\n"}
+
+
+def test_parse_mode_budgets(prompt_report):
+    assert prompt_report.parse_mode_budgets(["code=100", "architect=2000"]) == {"code": 100, "architect": 2000}
+    for value in ["foo=", "=5", "foo", "foo=-1", "foo=1k"]:
+        with pytest.raises(ValueError, match="expected MODE=TOKENS"):
+            prompt_report.parse_mode_budgets([value])
+
+
+def test_build_report_applies_mode_budgets_over_the_global_budget(prompt_report, tmp_path, caplog):
+    (tmp_path / "system-prompt-code").write_text("tools:\n" + "x" * 400 + "\n", encoding="utf-8")
+    (tmp_path / "system-prompt-architect").write_text("tools:\n" + "x" * 400 + "\n", encoding="utf-8")
+    (tmp_path / "system-prompt-ask").write_text("tools:\n  - a\n", encoding="utf-8")
+    caplog.set_level(logging.DEBUG)
+
+    report = prompt_report.build_report(tmp_path, lambda text: len(text) // 4, budget=50,
+                                        mode_budgets={"architect": 1000, "ask": 1})
+
+    assert [prompt["mode"] for prompt in report["prompts"]] == ["architect", "ask", "code"]
+    assert [prompt["budget"] for prompt in report["prompts"]] == [1000, 1, 50]
+    assert report["over_budget"] == ["ask", "code"]
+    assert report["tokens"] == sum(prompt["tokens"] for prompt in report["prompts"])
+    assert "system-prompt-code" in caplog.text
+    assert "OVER" in prompt_report.format_report(report)
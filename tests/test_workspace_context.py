@@ -0,0 +1,171 @@
+"""Tests for roo_config/workspace_context.py."""
+
+import os
+import re
+
+import pytest
+
+
+@pytest.mark.parametrize("pattern, matching, other", [
+    ("*.log", ["a.log", ".log"], ["a/b.log", "a.logx"]),
+    ("a?c", ["abc"], ["a/c", "ac"]),
+    ("**/build", ["build", "x/build", "x/y/build"], ["xbuild"]),
+    ("docs/**", ["docs/a", "docs/a/b"], ["docs", "other/a"]),
+    ("a/**/b", ["a/b", "a/x/b", "a/x/y/b"], ["a/xb", "ab"]),
+    ("file[0-9].txt", ["file1.txt"], ["filex.txt"]),
+    ("file[!0-9].txt", ["filex.txt"], ["file1.txt"]),
+    ("\\*.md", ["*.md"], ["a.md"]),
+    ("a+b(c)", ["a+b(c)"], ["aab(c)"]),
+])
+def test_glob_to_regex(workspace_context, pattern, matching, other):
+    regex = re.compile(workspace_context.glob_to_regex(pattern))
+
+    for path in matching:
+        assert regex.fullmatch(path), path
+    for path in other:
+        assert not regex.fullmatch(path), path
+
+
+def test_parse_rule(workspace_context):
+    parse_rule = workspace_context.RooIgnore.parse_rule
+
+    assert parse_rule("\n") is None
+    assert parse_rule("# comment\n") is None
+    assert parse_rule("build/\n") == ("build", False, True)
+    assert parse_rule("!keep.log  \n") == ("keep.log", True, False)
+    assert parse_rule("\\#hash\n") == ("#hash", False, False)
+    assert parse_rule("trailing\\ \n") == ("trailing\\ ", False, False)
+
+
+def test_rooignore_last_matching_rule_wins(workspace_context):
+    matcher = workspace_context.RooIgnore([
+        "*.log\n",
+        "!keep.log\n",
+        "build/\n",
+        "/src/generated\n",
+        "!src/generated\n",
+        "logs/**\n",
+    ])
+
+    assert matcher.matches("a.log")
+    assert matcher.matches("deep/dir/a.log")
+    assert not matcher.matches("deep/keep.log")
+    # Directory-only rules do not match files of the same name
+    assert matcher.matches("x/build", is_dir=True)
+    assert not matcher.matches("x/build")
+    # The later negation re-includes the anchored path
+    assert not matcher.matches("src/generated", is_dir=True)
+    assert not matcher.matches("other/src/generated", is_dir=True)
+    assert matcher.matches("logs/today.txt")
+    assert not matcher.matches("readme.md")
+
+
+def test_rooignore_anchored_rules_match_from_the_root(workspace_context):
+    matcher = workspace_context.RooIgnore(["/dist\n", "docs/*.tmp\n"])
+
+    assert matcher.matches("dist", is_dir=True)
+    assert not matcher.matches("sub/dist", is_dir=True)
+    assert matcher.matches("docs/a.tmp")
+    assert not matcher.matches("docs/sub/a.tmp")
+    assert not matcher.matches("sub/docs/a.tmp")
+
+
+def test_rooignore_is_ignored_checks_parent_directories(workspace_context):
+    matcher = workspace_context.RooIgnore(["node_modules/\n", "!node_modules/keep.js\n"])
+
+    assert matcher.is_ignored("node_modules", is_dir=True)
+    # As in git, a file inside an ignored directory cannot be re-included
+    assert matcher.is_ignored("node_modules/keep.js")
+    assert matcher.is_ignored("a/node_modules/b/c.js")
+    assert not matcher.is_ignored("a/b/c.js")
+    assert not workspace_context.RooIgnore().is_ignored("anything/at/all")
+
+
+def test_rooignore_from_missing_file_ignores_nothing(workspace_context, tmp_path):
+    assert workspace_context.RooIgnore.from_file(tmp_path / ".rooignore").rules == []
+
+
+def age_directories(*paths, seconds=60):
+    """Move directory mtimes out of the racy window so the index may reuse their entries."""
+    for path in paths:
+        mtime = path.stat().st_mtime_ns - seconds * 10**9
+        os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "workspace"
+    for rel_path, text in {"a.txt": "aa", "notes.log": "log", "src/main.py": "print()",
+                           "src/lib/util.py": "x = 1", "build/out.bin": "0000"}.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    age_directories(root, *(path for path in root.rglob("*") if path.is_dir()))
+    return root
+
+
+def test_walk_workspace_skips_ignored_entries(workspace_context, workspace):
+    matcher = workspace_context.RooIgnore(["*.log\n", "build/\n"])
+
+    assert list(workspace_context.walk_workspace(workspace, matcher)) == [
+        ("a.txt", 2), ("src/main.py", 7), ("src/lib/util.py", 5)]
+
+
+def test_workspace_index_matches_walk_and_reuses_unchanged_directories(workspace_context, workspace):
+    matcher = workspace_context.RooIgnore(["*.log\n", "build/\n"])
+    index_path = workspace / ".roo" / "workspace-index.json"
+    index = workspace_context.WorkspaceIndex(workspace, matcher)
+    index.refresh()
+    index.save()
+
+    def walked():
+        return [entry for entry in workspace_context.walk_workspace(workspace, matcher)
+                if entry[0] != ".roo/workspace-index.json"]
+
+    assert index.path == index_path and index_path.exists()
+    assert list(index.iter_files()) == walked()
+    # Saving created .roo, which changed the mtime of the root
+    age_directories(workspace)
+    index.refresh()
+    index.save()
+
+    # A fresh index loaded from disk only rescans the directory of the index itself
+    index = workspace_context.WorkspaceIndex(workspace, matcher)
+    index.refresh()
+    assert index.stats == {"rescanned": 1, "reused": 3}
+
+    (workspace / "src" / "lib" / "new.py").write_text("y = 2", encoding="utf-8")
+    (workspace / "a.txt").unlink()
+    age_directories(workspace, workspace / "src" / "lib")
+    index.refresh()
+
+    # The root, src/lib and the index directory
+    assert index.stats == {"rescanned": 3, "reused": 1}
+    assert list(index.iter_files()) == walked()
+    assert ("src/lib/new.py", 5) in index.iter_files()
+
+
+def test_workspace_index_is_rebuilt_when_rules_change(workspace_context, workspace):
+    index = workspace_context.WorkspaceIndex(workspace, workspace_context.RooIgnore(["*.log\n"]))
+    index.refresh()
+    index.save()
+    age_directories(workspace)
+    index.refresh()
+    index.save()
+
+    index = workspace_context.WorkspaceIndex(workspace, workspace_context.RooIgnore(["*.txt\n"]))
+    index.refresh()
+
+    assert index.stats["reused"] == 0
+    assert ("notes.log", 3) in index.iter_files()
+    assert ("a.txt", 2) not in index.iter_files()
+
+
+def test_workspace_index_ignores_unreadable_index(workspace_context, workspace):
+    index_path = workspace / "index.json"
+    index_path.write_text("not json", encoding="utf-8")
+    index = workspace_context.WorkspaceIndex(workspace, workspace_context.RooIgnore(), path=index_path)
+    index.refresh()
+
+    assert ("index.json", 8) not in index.iter_files()
+    assert ("build/out.bin", 4) in index.iter_files()
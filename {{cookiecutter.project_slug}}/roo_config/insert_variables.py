@@ -0,0 +1,1459 @@
+#!/usr/bin/env python3
+"""
+RooFlow Environment Setup Script (Cross-Platform)
+
+This script updates system prompt files with local environment details and MCP metadata.
+It replaces both insert-variables.cmd (Windows) and insert-variables.sh (Unix/Linux/macOS)
+with a single cross-platform solution.
+
+Usage:
+    python insert_variables.py [--compact-mcp] [--mcp-max-tokens N] [--force] [--jobs N] [--pool {thread,process}]
+                               [--minify] [--watch] [--verbose]
+
+Arguments:
+    --compact-mcp   Render MCP tool schemas compactly (minified, shared sub-schemas hoisted)
+    --mcp-max-tokens  Estimated token budget for the connected_servers block
+    --force         Rewrite every prompt even if the render manifest shows it is up to date
+    --jobs          Number of prompt files rendered in parallel (default: number of CPUs, up to 8)
+    --pool          Worker pool used for parallel rendering: thread or process (default: thread)
+    --minify        Write prompts as compact YAML without comments (requires PyYAML)
+    --watch         After setup, keep running and refresh the connected_servers sections
+                    whenever the MCP settings file changes
+    --poll-interval Seconds between checks when inotify is unavailable (default: 1.0)
+    --verbose       Enable verbose output
+
+Dependencies:
+    - Python 3.6+
+    - mcp (for MCP metadata extraction). When it is importable, mcp_checker.py runs
+      inside this process; otherwise it is started through uv or python.
+    - PyYAML (optional, for --minify)
+
+Library use:
+    The script only depends on the standard library, so other tools (such as the
+    cookiecutter post-generation hook) can import it and call ``main(argv)``, which
+    returns an exit status instead of exiting.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import select
+import shutil
+import struct
+import asyncio
+import hashlib
+import argparse
+import functools
+import importlib.util
+import platform
+import subprocess
+import tempfile
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+import re
+
+
+# Overall time budget (seconds) passed to mcp_checker.py for probing all servers
+MCP_CHECKER_BUDGET = 120
+
+# Extra time allowed on top of the budget for interpreter/uv startup and cleanup
+MCP_CHECKER_GRACE = 60
+
+# Watch mode: polling interval when inotify is unavailable, and the quiet period
+# used to coalesce the burst of events an editor produces when saving
+WATCH_POLL_INTERVAL = 1.0
+WATCH_DEBOUNCE = 0.5
+
+# Number of tokenized templates kept in memory by render_template
+TEMPLATE_CACHE_SIZE = 256
+
+# Shared template fragments: a "#@include NAME" line in a template is replaced by
+# the fragment NAME, stored with the other fragments of its top-level prompt
+# section in roo_config/fragments/SECTION.yaml, where SECTION is NAME up to the first dot
+FRAGMENTS_DIR_NAME = "fragments"
+FRAGMENT_SUFFIX = ".yaml"
+
+# Render manifest kept in .roo/ to skip prompts whose inputs did not change
+RENDER_MANIFEST_NAME = ".render-manifest.json"
+RENDER_MANIFEST_VERSION = 1
+
+# Toolchain probe cache: entries expire after a day, a few PATH variants are kept
+TOOLCHAIN_CACHE_TTL = 24 * 60 * 60
+TOOLCHAIN_CACHE_ENTRIES = 8
+
+# Default number of prompt files rendered in parallel
+DEFAULT_RENDER_JOBS = min(8, os.cpu_count() or 1)
+
+# MCP settings file names written by Roo Code (current and legacy)
+MCP_SETTINGS_FILE_NAMES = ("mcp_settings.json", "cline_mcp_settings.json")
+
+# inotify event mask: file written or moved/created/deleted in the watched directory
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def setup_logging(verbose=False):
+    """Configure logging based on verbosity level."""
+    log_level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(levelname)s: %(message)s'
+    )
+
+
+def get_script_dir():
+    """Get the directory where this script is located."""
+    return Path(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_project_root(script_dir):
+    """Get the project root directory."""
+    return script_dir.parent
+
+
+def get_system_info():
+    """Get system information based on the current platform."""
+    system_info = {
+        "os": "",
+        "shell": "",
+        "home_dir": "",
+        "workspace_dir": "",
+        "global_settings": "",
+        "mcp_location": "",
+        "mcp_settings": ""
+    }
+    
+    # Get OS information
+    if platform.system() == "Windows":
+        system_info["os"] = f"Windows {platform.release()} {platform.version()}"
+    elif platform.system() == "Darwin":
+        system_info["os"] = f"macOS {platform.mac_ver()[0]}"
+    else:
+        system_info["os"] = f"{platform.system()} {platform.release()}"
+    
+    # Get shell information
+    if "SHELL" in os.environ:
+        system_info["shell"] = os.path.basename(os.environ["SHELL"])
+    elif platform.system() == "Windows":
+        system_info["shell"] = os.path.basename(os.environ.get("COMSPEC", "cmd.exe"))
+    else:
+        system_info["shell"] = "bash"  # Default fallback
+    
+    # Get home directory
+    system_info["home_dir"] = str(Path.home())
+    
+    # Get workspace directory (project root)
+    script_dir = get_script_dir()
+    project_root = get_project_root(script_dir)
+    system_info["workspace_dir"] = str(project_root)
+    
+    # Platform-specific paths
+    if platform.system() == "Windows":
+        # Windows paths
+        system_info["global_settings"] = str(Path(system_info["home_dir"]) / "AppData" / "Roaming" / "Code" / "User" / "globalStorage" / "rooveterinaryinc.roo-cline" / "settings" / "cline_custom_modes.json")
+        system_info["mcp_location"] = str(Path(system_info["home_dir"]) / ".local" / "share" / "Roo-Code" / "MCP")
+        system_info["mcp_settings"] = str(Path(system_info["home_dir"]) / "AppData" / "Roaming" / "Code" / "User" / "globalStorage" / "rooveterinaryinc.roo-cline" / "settings" / "cline_mcp_settings.json")
+    elif platform.system() == "Darwin":
+        # macOS paths
+        system_info["global_settings"] = str(Path(system_info["home_dir"]) / "Library" / "Application Support" / "Code" / "User" / "globalStorage" / "rooveterinaryinc.roo-cline" / "settings" / "cline_custom_modes.json")
+        system_info["mcp_location"] = str(Path(system_info["home_dir"]) / ".local" / "share" / "Roo-Code" / "MCP")
+        system_info["mcp_settings"] = str(Path(system_info["home_dir"]) / "Library" / "Application Support" / "Code" / "User" / "globalStorage" / "rooveterinaryinc.roo-cline" / "settings" / "cline_mcp_settings.json")
+    else:
+        # Linux paths
+        system_info["global_settings"] = str(Path(system_info["home_dir"]) / ".config" / "Code" / "User" / "globalStorage" / "rooveterinaryinc.roo-cline" / "settings" / "cline_custom_modes.json")
+        system_info["mcp_location"] = str(Path(system_info["home_dir"]) / ".local" / "share" / "Roo-Code" / "MCP")
+        system_info["mcp_settings"] = str(Path(system_info["home_dir"]) / ".config" / "Code" / "User" / "globalStorage" / "rooveterinaryinc.roo-cline" / "settings" / "cline_mcp_settings.json")
+    
+    return system_info
+
+
+def get_toolchain_cache_path():
+    """Get the platform-specific path of the toolchain probe cache."""
+    home_dir = os.path.expanduser("~")
+    if sys.platform == "win32":
+        base_dir = os.environ.get("LOCALAPPDATA", os.path.join(home_dir, "AppData/Local"))
+    elif sys.platform == "darwin":
+        base_dir = os.path.join(home_dir, "Library/Caches")
+    else:
+        base_dir = os.environ.get("XDG_CACHE_HOME", os.path.join(home_dir, ".cache"))
+    return Path(base_dir) / "rooflow" / "toolchain_probe.json"
+
+
+def _executable_stamp(path):
+    """Identify an executable by its resolved path and modification time."""
+    if not path:
+        return None
+    try:
+        resolved = os.path.realpath(path)
+        return [resolved, os.stat(resolved).st_mtime]
+    except OSError:
+        return None
+
+
+def toolchain_key():
+    """Compute the cache key of the toolchain probe.
+    
+    The key covers PATH and the resolved path and modification time of this
+    interpreter, of uv and of the Python found on PATH, so installing, upgrading
+    or switching any of them invalidates the probe without running them.
+    """
+    key = {
+        "path": os.environ.get("PATH", ""),
+        "interpreter": _executable_stamp(sys.executable),
+        "uv": _executable_stamp(shutil.which("uv")),
+        "python": _executable_stamp(shutil.which("python3") or shutil.which("python"))
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _probe_python(python_path):
+    """Find the major version of a Python interpreter and whether it can import mcp.
+    
+    This interpreter is inspected directly. Another interpreter can only be
+    asked by running it, which costs a single child process; probe_toolchain
+    caches the answer on disk, so this happens once per toolchain change rather
+    than on every run.
+    """
+    try:
+        if os.path.samefile(python_path, sys.executable):
+            return {"python_major": sys.version_info[0], "mcp": importlib.util.find_spec("mcp") is not None}
+    except OSError:
+        pass
+    
+    script = "import sys\ntry:\n    import mcp\n    found = 1\nexcept Exception:\n    found = 0\nprint(sys.version_info[0], found)"
+    try:
+        result = subprocess.run([python_path, "-c", script], stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, universal_newlines=True, timeout=30)
+        major, found = result.stdout.split()
+        return {"python_major": int(major), "mcp": found == "1"}
+    except (subprocess.SubprocessError, OSError, ValueError):
+        return {"python_major": None, "mcp": False}
+
+
+def probe_toolchain(refresh=False):
+    """Find uv, Python and the mcp package, using a persistent cache.
+    
+    Results are cached on disk under ``toolchain_key()`` for
+    ``TOOLCHAIN_CACHE_TTL`` seconds, so a warm run starts no child processes.
+    Python on PATH is only inspected when uv is missing, because
+    ``uv run --with mcp`` provides mcp by itself.
+    
+    Returns:
+        A dict with the ``uv`` and ``python`` executables (or None), the
+        ``python_major`` version and whether that Python can import ``mcp``.
+    """
+    cache_path = get_toolchain_cache_path()
+    key = toolchain_key()
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        entries = {}
+    if not isinstance(entries, dict):
+        entries = {}
+    
+    entry = entries.get(key)
+    if not refresh and entry and time.time() - entry.get("stored_at", 0) < TOOLCHAIN_CACHE_TTL:
+        logging.debug(f"Using cached toolchain probe from {cache_path}")
+        return entry["probe"]
+    
+    probe = {"uv": shutil.which("uv"), "python": shutil.which("python3") or shutil.which("python"),
+             "python_major": None, "mcp": None}
+    if probe["uv"] is None and probe["python"]:
+        probe.update(_probe_python(probe["python"]))
+    
+    # Keep the most recent keys only; PATH differs between shells and IDEs
+    entries[key] = {"stored_at": time.time(), "probe": probe}
+    entries = dict(sorted(entries.items(), key=lambda item: item[1].get("stored_at", 0))[-TOOLCHAIN_CACHE_ENTRIES:])
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(cache_path, json.dumps(entries, indent=2))
+    except OSError as e:
+        logging.debug(f"Could not write toolchain probe cache {cache_path}: {e}")
+    return probe
+
+
+def check_dependencies():
+    """Check for required dependencies and install them if needed."""
+    logging.info("Checking dependencies...")
+    probe = probe_toolchain()
+    
+    # uv provides mcp on demand through `uv run --with mcp`
+    if probe["uv"]:
+        logging.info("UV detected! Using UV for package management.")
+        return True
+    logging.info("UV not detected. Checking for traditional Python tools...")
+    
+    python_cmd = probe["python"]
+    if not python_cmd:
+        logging.error("Error: Python is required but not installed.")
+        logging.error("Please install Python 3.x to continue.")
+        return False
+    logging.info(f"Using Python command: {python_cmd}")
+    
+    if probe["python_major"] is None:
+        logging.warning("Warning: Could not verify Python version.")
+    elif probe["python_major"] < 3:
+        logging.warning("Warning: Python 3.x is recommended. You may encounter issues with older versions.")
+    
+    if probe["mcp"]:
+        return True
+    
+    logging.warning("Warning: 'mcp' package is not installed. Will attempt to install it.")
+    for pip_cmd in [["pip3"], ["pip"], [python_cmd, "-m", "pip"]]:
+        try:
+            subprocess.run(pip_cmd + ["install", "mcp"], check=True)
+        except (subprocess.SubprocessError, FileNotFoundError):
+            continue
+        
+        # Verify installation and update the cached probe; the import system
+        # caches directory listings, which the install has made stale
+        importlib.invalidate_caches()
+        if probe_toolchain(refresh=True)["mcp"]:
+            logging.info("Successfully installed mcp package.")
+            # Let the checker run in this process if mcp went into this interpreter
+            load_mcp_checker.cache_clear()
+            return True
+    
+    logging.error("Error: Failed to install mcp package.")
+    logging.error("Please install it manually: pip install mcp")
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def load_mcp_checker(script_path):
+    """Import mcp_checker.py as a module if the mcp package is available here.
+    
+    Returns:
+        The mcp_checker module, or None if mcp is not importable in this
+        interpreter or the checker cannot be loaded.
+    """
+    if importlib.util.find_spec("mcp") is None:
+        logging.debug("mcp is not importable in this interpreter")
+        return None
+    try:
+        spec = importlib.util.spec_from_file_location("mcp_checker", str(script_path))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    except Exception as e:
+        logging.warning(f"Could not load {script_path} in process: {e}")
+        return None
+
+
+def mcp_checker_args(options):
+    """Convert MCP checker options into command-line arguments for mcp_checker.py."""
+    args = []
+    if options.get("settings"):
+        args += ["--settings", str(options["settings"])]
+    for server_name in options.get("refresh", []):
+        args += ["--refresh", server_name]
+    if options.get("compact"):
+        args.append("--compact")
+    if options.get("max_tokens"):
+        args += ["--max-tokens", str(options["max_tokens"])]
+    return args
+
+
+def run_mcp_checker_in_process(checker, options):
+    """Extract MCP metadata by awaiting the checker in this process.
+    
+    Uses the same budget, metadata cache and probe daemon as the command-line
+    checker, without starting another interpreter or going through a file.
+    
+    Returns:
+        The Markdown metadata, or None if the MCP settings file does not exist.
+    """
+    settings_path = options.get("settings") or checker.get_mcp_settings_path()
+    if not os.path.isfile(settings_path):
+        logging.error(f"Error: MCP settings file not found: {settings_path}")
+        return None
+    
+    extractor = checker.MCPMetadataExtractor(
+        str(settings_path),
+        budget=MCP_CHECKER_BUDGET,
+        cache=checker.MetadataCache(),
+        refresh=options.get("refresh"),
+        compact=options.get("compact", False),
+        max_tokens=options.get("max_tokens")
+    )
+    metadata = asyncio.run(extractor.collect_metadata())
+    return extractor.format_markdown(metadata)
+
+
+def run_mcp_checker(script_path, output_file, error_log, extra_args=None):
+    """Run the MCP checker script to extract MCP metadata.
+    
+    The checker is given a global time budget and every attempt is bounded by a
+    subprocess timeout, so a hanging MCP server cannot stall the setup. A timed
+    out attempt is not retried with the remaining methods. ``extra_args`` are
+    passed on to the checker unchanged.
+    """
+    logging.info("Running MCP Checker to extract MCP metadata...")
+    checker_args = ["--output", str(output_file), "--budget", str(MCP_CHECKER_BUDGET)] + (extra_args or [])
+    timeout = MCP_CHECKER_BUDGET + MCP_CHECKER_GRACE
+    
+    # Try with UV first (preferred method)
+    try:
+        if not probe_toolchain()["uv"]:
+            raise FileNotFoundError("uv")
+        logging.info("Using UV to run MCP checker...")
+        
+        # Try different UV execution methods
+        try:
+            subprocess.run(
+                ["uv", "run", "--with", "mcp", str(script_path)] + checker_args,
+                stdout=subprocess.PIPE, stderr=open(error_log, "w"),
+                check=True, timeout=timeout
+            )
+            logging.info("Successfully ran MCP checker with UV.")
+            return True
+        except subprocess.TimeoutExpired:
+            logging.error(f"Error: MCP checker did not finish within {timeout} seconds.")
+            return False
+        except subprocess.SubprocessError:
+            logging.info("Trying alternative UV execution method...")
+            try:
+                subprocess.run(
+                    ["uv", "run", str(script_path)] + checker_args,
+                    stdout=subprocess.PIPE, stderr=open(error_log, "a"),
+                    check=True, timeout=timeout
+                )
+                logging.info("Successfully ran MCP checker with alternative UV method.")
+                return True
+            except subprocess.TimeoutExpired:
+                logging.error(f"Error: MCP checker did not finish within {timeout} seconds.")
+                return False
+            except subprocess.SubprocessError:
+                logging.warning("Warning: Failed to run MCP checker with UV. Falling back to direct Python execution.")
+    except (subprocess.SubprocessError, FileNotFoundError):
+        logging.info("UV not available. Using direct Python execution...")
+    
+    # Fallback to direct Python execution
+    for python_cmd in ["python3", "python"]:
+        try:
+            subprocess.run(
+                [python_cmd, str(script_path)] + checker_args,
+                stdout=subprocess.PIPE, stderr=open(error_log, "a"),
+                check=True, timeout=timeout
+            )
+            logging.info(f"Successfully ran MCP checker with {python_cmd}.")
+            return True
+        except subprocess.TimeoutExpired:
+            logging.error(f"Error: MCP checker did not finish within {timeout} seconds.")
+            return False
+        except (subprocess.SubprocessError, FileNotFoundError):
+            continue
+    
+    # If we got here, all methods failed
+    logging.error("Error: Failed to run MCP checker with all available methods.")
+    logging.error(f"Check {error_log} for details.")
+    return False
+
+
+def extract_mcp_metadata(script_path, options=None):
+    """Run the MCP checker and return its Markdown output.
+    
+    The checker runs in this process when mcp is importable. Otherwise, or if
+    that fails, it runs as a subprocess whose output goes through a temporary
+    file that is removed afterwards; the error log is kept when the checker
+    fails so it can be inspected.
+    
+    Args:
+        script_path: Path to mcp_checker.py
+        options: Checker options: ``settings`` (settings file), ``refresh`` (server
+            names to re-probe), ``compact`` and ``max_tokens``
+    
+    Returns:
+        The Markdown metadata, or None if the checker failed.
+    """
+    options = options or {}
+    checker = load_mcp_checker(script_path)
+    if checker is not None:
+        logging.info("Running MCP checker in process...")
+        try:
+            return run_mcp_checker_in_process(checker, options)
+        except Exception as e:
+            logging.warning(f"Warning: In-process MCP checker failed ({e}). Falling back to a subprocess.")
+    
+    with tempfile.NamedTemporaryFile(suffix='.md', delete=False) as temp_output_file, \
+         tempfile.NamedTemporaryFile(suffix='.log', delete=False) as temp_error_log:
+        output_file = Path(temp_output_file.name)
+        error_log = Path(temp_error_log.name)
+    
+    try:
+        if not run_mcp_checker(script_path, output_file, error_log, mcp_checker_args(options)):
+            logging.warning(f"MCP checker error log kept at {error_log}")
+            return None
+        with open(output_file, 'r', encoding='utf-8') as f:
+            metadata = f.read()
+        os.unlink(error_log)
+        return metadata
+    finally:
+        try:
+            os.unlink(output_file)
+        except OSError:
+            pass
+
+
+# Tokenized templates keyed by (content hash, placeholder names), oldest first
+_template_cache = {}
+
+# A whole "#@include NAME" line; it is a YAML comment, so templates stay valid YAML
+_include_pattern = re.compile(r'^[ \t]*#@include[ \t]+([\w.-]+)[ \t]*(?:\n|\Z)', re.MULTILINE)
+
+# The "#@fragment NAME" line that starts each fragment in a section file
+_fragment_pattern = re.compile(r'^#@fragment[ \t]+([\w.-]+)[ \t]*\n', re.MULTILINE)
+
+
+def read_fragment_section(fragments_dir, section):
+    """Read the fragments of one top-level prompt section.
+    
+    Each fragment starts after its ``#@fragment NAME`` line and runs up to the
+    next such line or the end of the file. Text before the first fragment is
+    a comment for readers and is ignored. Parsed files are cached by path,
+    mtime and size, so a section file is read once however many of its
+    fragments the templates include.
+    
+    Returns:
+        A dict mapping fragment names to their text.
+    
+    Raises:
+        OSError: If the section file cannot be read.
+    """
+    path = Path(fragments_dir) / f"{section}{FRAGMENT_SUFFIX}"
+    stat = os.stat(path)
+    return dict(_parse_fragment_section(str(path), stat.st_mtime_ns, stat.st_size))
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_fragment_section(path, mtime_ns, size):
+    """Read and split one section file; the mtime and size only key the cache."""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    markers = list(_fragment_pattern.finditer(text))
+    ends = [marker.start() for marker in markers[1:]] + [len(text)]
+    return {marker.group(1): text[marker.end():end] for marker, end in zip(markers, ends)}
+
+
+def compose_template(text, fragments_dir, fragments=None, _including=()):
+    """Replace every ``#@include NAME`` line in ``text`` with the fragment ``NAME``.
+    
+    Fragments are read from their section file in ``fragments_dir`` (see
+    read_fragment_section) and inserted verbatim, including their indentation,
+    so sections shared by several modes are stored once. Fragments may include
+    other fragments. ``fragments`` caches the composed fragments by name; pass
+    the same dict when composing several templates so that each fragment is
+    read and composed only once.
+    
+    Raises:
+        OSError: If a section file cannot be read.
+        ValueError: If a fragment does not exist or fragments include each other in a cycle.
+    """
+    if fragments is None:
+        fragments = {}
+    parts = []
+    position = 0
+    for match in _include_pattern.finditer(text):
+        name = match.group(1)
+        if name in _including:
+            raise ValueError(f"Fragment include cycle: {' -> '.join(_including + (name,))}")
+        if name not in fragments:
+            section = name.split('.', 1)[0]
+            fragment = read_fragment_section(fragments_dir, section).get(name)
+            if fragment is None:
+                raise ValueError(f"Fragment {name} not found in {section}{FRAGMENT_SUFFIX}")
+            fragments[name] = compose_template(fragment, fragments_dir, fragments, _including + (name,))
+        parts.append(text[position:match.start()])
+        parts.append(fragments[name])
+        position = match.end()
+    if not parts:
+        return text
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=None)
+def _placeholder_pattern(placeholders):
+    """Compile one alternation matching any of ``placeholders``, longest first."""
+    alternatives = sorted(placeholders, key=len, reverse=True)
+    return re.compile("|".join(re.escape(placeholder) for placeholder in alternatives))
+
+
+def tokenize_template(content, placeholders):
+    """Split a template into literal text and placeholder segments in one scan.
+    
+    Returns:
+        A tuple ``(parts, slots)``: ``parts`` lists the segments in order, with
+        each placeholder segment holding the placeholder name, and ``slots``
+        holds ``(index, placeholder)`` pairs for the placeholder segments.
+    """
+    parts, slots = [], []
+    position = 0
+    for match in _placeholder_pattern(placeholders).finditer(content):
+        parts.append(content[position:match.start()])
+        slots.append((len(parts), match.group()))
+        parts.append(match.group())
+        position = match.end()
+    parts.append(content[position:])
+    return parts, slots
+
+
+def render_template(content, replacements):
+    """Substitute every placeholder in ``content`` in a single pass.
+    
+    Templates are tokenized once and cached by a hash of their content, so
+    rendering the same template again (for another mode or another workspace)
+    is a single join. Substituted values are never scanned for placeholders.
+    """
+    placeholders = tuple(sorted(replacements))
+    key = (hashlib.sha256(content.encode('utf-8')).digest(), placeholders)
+    tokens = _template_cache.get(key)
+    if tokens is None:
+        tokens = tokenize_template(content, placeholders)
+        if len(_template_cache) >= TEMPLATE_CACHE_SIZE:
+            del _template_cache[next(iter(_template_cache))]
+        _template_cache[key] = tokens
+    
+    parts, slots = tokens
+    if not slots:
+        return content
+    rendered = list(parts)
+    for index, placeholder in slots:
+        rendered[index] = replacements[placeholder]
+    return "".join(rendered)
+
+
+def write_text_atomic(path, content, mode_from=None):
+    """Write ``content`` to ``path`` through a temporary file and an atomic rename.
+    
+    Readers such as the Roo extension never see a partially written prompt.
+    The permission bits of ``mode_from`` are applied when it is given.
+    """
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(content)
+        if mode_from is not None:
+            shutil.copymode(str(mode_from), temp_path)
+        os.replace(temp_path, str(path))
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def content_digest(text):
+    """Return the SHA-256 hex digest of ``text``."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class RenderManifest:
+    """
+    Hashes of the inputs and outputs of every rendered prompt in a .roo directory.
+    
+    An output is up to date when its recorded inputs (template, system info, MCP
+    metadata and, for the default template, the mode list) are unchanged and the
+    file on disk still has the recorded content. Up-to-date outputs are not
+    rewritten, so a refresh with nothing to do leaves every file untouched.
+    
+    Attributes:
+        path (Path): Path to the manifest file
+    """
+    
+    def __init__(self, roo_dir):
+        self.path = Path(roo_dir) / RENDER_MANIFEST_NAME
+        self._previous = self._load()
+        self._outputs = {}
+    
+    def _load(self):
+        """Load the recorded outputs; a missing or unreadable manifest is empty."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("version") == RENDER_MANIFEST_VERSION:
+                return manifest.get("outputs", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {}
+    
+    def previous(self, output_path):
+        """Return the entry recorded for ``output_path`` by the last run, if any."""
+        return self._previous.get(Path(output_path).name)
+    
+    @staticmethod
+    def is_current(output_path, entry, inputs):
+        """Check whether ``output_path`` was rendered from ``inputs`` and is unmodified."""
+        if not entry or entry.get("inputs") != inputs:
+            return False
+        try:
+            with open(output_path, 'r', encoding='utf-8') as f:
+                return content_digest(f.read()) == entry.get("output")
+        except (OSError, UnicodeDecodeError):
+            return False
+    
+    def update(self, output_path, entry):
+        """Record the entry of an output rendered or kept in this run."""
+        self._outputs[Path(output_path).name] = entry
+    
+    def save(self):
+        """Write the manifest if any entry changed. Outputs not rendered in this run are dropped."""
+        if self._outputs == self._previous:
+            return
+        try:
+            write_text_atomic(self.path, json.dumps(
+                {"version": RENDER_MANIFEST_VERSION, "outputs": self._outputs}, indent=2, sort_keys=True))
+        except OSError as e:
+            logging.warning(f"Could not write render manifest {self.path}: {e}")
+
+
+@functools.lru_cache(maxsize=None)
+def _minify_dumper():
+    """Build a PyYAML dumper for minified prompts.
+    
+    Multi-line strings are written as literal blocks rather than escaped
+    one-liners, and nulls as empty values, so keys such as ``connected_servers:``
+    keep the shape render_mcp_section expects.
+    """
+    import yaml
+    
+    class MinifyDumper(yaml.SafeDumper):
+        pass
+    
+    def represent_str(dumper, value):
+        style = '|' if '\n' in value else None
+        return dumper.represent_scalar('tag:yaml.org,2002:str', value, style=style)
+    
+    MinifyDumper.add_representer(str, represent_str)
+    MinifyDumper.add_representer(type(None), lambda dumper, value: dumper.represent_scalar('tag:yaml.org,2002:null', ''))
+    return MinifyDumper
+
+
+def minify_yaml(content):
+    """Return ``content`` as compact YAML that parses to the same data.
+    
+    Comments and blank lines are dropped, indentation is reduced to two spaces
+    per level and collections holding only scalars are written in flow style.
+    The result is parsed again and compared with the original data.
+    
+    Raises:
+        ImportError: If PyYAML is not installed.
+        ValueError: If ``content`` is not valid YAML or the minified text does
+            not parse to the same data.
+    """
+    import yaml
+    try:
+        data = yaml.safe_load(content)
+    except yaml.YAMLError as e:
+        mark = getattr(e, "problem_mark", None)
+        location = f" at line {mark.line + 1}" if mark else ""
+        raise ValueError(f"not valid YAML{location}: {getattr(e, 'problem', None) or e}")
+    minified = yaml.dump(data, Dumper=_minify_dumper(), default_flow_style=None, sort_keys=False,
+                         allow_unicode=True, width=float("inf"))
+    if yaml.safe_load(minified) != data:
+        raise ValueError("the minified prompt does not parse to the same data")
+    return minified
+
+
+def minify_prompt(content):
+    """Minify a rendered prompt, keeping it unchanged if it cannot be minified safely.
+    
+    Returns:
+        A tuple of the content to write and a dict with the size in ``bytes``
+        before and the ``minified_bytes`` after, or the ``error`` that
+        prevented minification.
+    """
+    size = len(content.encode('utf-8'))
+    try:
+        minified = minify_yaml(content)
+    except ValueError as e:
+        return content, {"bytes": size, "minified_bytes": size, "error": str(e)}
+    return minified, {"bytes": size, "minified_bytes": len(minified.encode('utf-8'))}
+
+
+def render_job(job, replacements, mcp_metadata, force=False, minify=False):
+    """Render one prompt file: read the template once, write the output once, atomically.
+    
+    ``job`` is a dict with the ``template_path`` and ``output_path``, the digests
+    of the shared ``inputs``, the ``previous`` manifest entry and optionally the
+    already read ``template``. The output is left untouched when the manifest
+    entry shows it is up to date, unless ``force`` is set.
+    
+    The template is rendered in memory: placeholders first, then the optional
+    ``minify`` stage, then the MCP section. The MCP metadata is Markdown, so it
+    is spliced in after minification and never passes through the YAML parser.
+    
+    The job only touches its own output file, so jobs can run in worker threads
+    or processes; the caller applies the returned manifest entries.
+    
+    Returns:
+        A dict with the output ``path``, its ``status`` (``written``, ``unchanged``
+        or ``error``), the manifest ``entry``, the ``error`` message if any and,
+        for minified prompts, the ``minify`` result of minify_prompt().
+    """
+    output_path = Path(job["output_path"])
+    result = {"path": str(output_path), "status": "error", "entry": None, "error": None, "minify": None}
+    try:
+        template = job.get("template")
+        if template is None:
+            with open(job["template_path"], 'r', encoding='utf-8') as file:
+                template = file.read()
+        inputs = dict(job["inputs"], template=content_digest(template))
+        if not force and RenderManifest.is_current(output_path, job.get("previous"), inputs):
+            result.update(status="unchanged", entry=job["previous"])
+            return result
+        
+        content = render_template(template, replacements)
+        if minify:
+            content, result["minify"] = minify_prompt(content)
+        if mcp_metadata:
+            content = render_mcp_section(content, mcp_metadata)
+        write_text_atomic(output_path, content, job["template_path"])
+        result.update(status="written", entry={"inputs": inputs, "output": content_digest(content)})
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def run_render_jobs(jobs, replacements, mcp_metadata, force=False, workers=1, pool="thread", minify=False):
+    """Run render jobs, in parallel when ``workers`` > 1.
+    
+    Results are returned in the order of ``jobs`` regardless of which job
+    finishes first, so logs and the manifest are deterministic.
+    """
+    render = functools.partial(render_job, replacements=replacements, mcp_metadata=mcp_metadata,
+                               force=force, minify=minify)
+    if workers <= 1 or len(jobs) <= 1:
+        return [render(job) for job in jobs]
+    
+    executor_class = ProcessPoolExecutor if pool == "process" else ThreadPoolExecutor
+    with executor_class(max_workers=min(workers, len(jobs))) as executor:
+        return list(executor.map(render, jobs))
+
+
+def update_mcp_section(file_path, mcp_metadata):
+    """Update the MCP section in a system prompt file.
+    
+    Returns:
+        True if the file was rewritten, False if it was already up to date or
+        could not be updated.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+        
+        updated = render_mcp_section(content, mcp_metadata)
+        if updated == content:
+            return False
+        write_text_atomic(file_path, updated, file_path)
+        return True
+    except Exception as e:
+        logging.error(f"Error updating MCP section in {file_path}: {e}")
+        return False
+
+
+@functools.lru_cache(maxsize=8)
+def format_connected_servers(mcp_metadata):
+    """Indent ``mcp_metadata`` for the connected_servers key, once per metadata."""
+    return "".join(f"    {metadata_line}\n" for metadata_line in mcp_metadata.splitlines())
+
+
+def render_mcp_section(content, mcp_metadata):
+    """Return ``content`` with its MCP connected_servers section replaced by ``mcp_metadata``.
+    
+    The indented metadata is formatted once and spliced into every prompt;
+    prompts without an ``mcp:`` section get one appended without a line scan,
+    and an ``mcp:`` section without a connected_servers key gets one at its end.
+    """
+    connected_servers = format_connected_servers(mcp_metadata)
+    
+    # Define the formatted MCP section
+    formatted_mcp = """mcp:
+  overview:
+    - "The Model Context Protocol (MCP) enables communication with external servers"
+    - "MCP servers provide additional tools and resources to extend capabilities"
+    - "Servers can be local (Stdio-based) or remote (SSE-based)"
+  usage:
+    - "Use server tools via the `use_mcp_tool` tool"
+    - "Access server resources via the `access_mcp_resource` tool"
+    - "Wait for server responses before proceeding with additional operations"
+  connected_servers:
+"""
+    if not content.startswith('mcp:') and '\nmcp:' not in content:
+        return content + "\n" + formatted_mcp + connected_servers
+    
+    # Process the content line by line
+    lines = io.StringIO(content).readlines()
+    new_content = []
+    found_mcp = False
+    in_mcp = False
+    found_connected_servers = False
+    in_connected_servers = False
+    
+    def add_connected_servers():
+        """Add the connected_servers key at the end of an mcp section that has none, before its blank lines."""
+        blank_lines = []
+        while new_content and not new_content[-1].strip():
+            blank_lines.insert(0, new_content.pop())
+        if new_content and not new_content[-1].endswith('\n'):
+            new_content[-1] += '\n'
+        new_content.append("  connected_servers:\n")
+        new_content.append(connected_servers)
+        new_content.extend(blank_lines)
+    
+    for line in lines:
+        if line.startswith('mcp:'):
+            found_mcp = True
+            in_mcp = True
+            found_connected_servers = False
+            new_content.append(line)
+        elif in_mcp and line.strip().startswith('connected_servers:'):
+            found_connected_servers = True
+            in_connected_servers = True
+            new_content.append(line)
+            # Add the MCP metadata with proper indentation
+            new_content.append(connected_servers)
+        elif in_mcp and re.match(r'^[a-z]', line):
+            if not found_connected_servers:
+                add_connected_servers()
+            in_mcp = False
+            in_connected_servers = False
+            new_content.append(line)
+        elif in_connected_servers and (line.strip().startswith('-') or line.startswith('    ')):
+            # Skip existing connected_servers content, including previously inserted metadata
+            pass
+        elif in_connected_servers and re.match(r'^  [a-z]', line):
+            in_connected_servers = False
+            new_content.append(line)
+        else:
+            new_content.append(line)
+    
+    if in_mcp and not found_connected_servers:
+        add_connected_servers()
+    
+    # If no MCP section was found, append it
+    if not found_mcp:
+        new_content.append("\n")  # Add a blank line for separation
+        new_content.append(formatted_mcp)
+        new_content.append(connected_servers)
+    
+    return "".join(new_content)
+
+
+def process_system_prompt_files(roo_dir, config_dir, system_info, mcp_metadata, force=False,
+                                jobs=DEFAULT_RENDER_JOBS, pool="thread", minify=False):
+    """Process system prompt files by replacing placeholders and updating MCP sections.
+    
+    Templates in roo_config/.roo are first composed from the shared fragments
+    in roo_config/fragments. Prompts are rendered by up to ``jobs`` workers of
+    a thread or process ``pool``. Prompts whose inputs match the render manifest
+    in ``roo_dir`` are skipped unless ``force`` is set. With ``minify``, prompts
+    are written as compact YAML and the bytes saved per prompt are logged.
+    
+    Returns:
+        A dict mapping each output file that could not be rendered to its error.
+    """
+    logging.info("Looking for system prompt files...")
+    
+    # Define the replacements dictionary
+    replacements = {
+        "OS_PLACEHOLDER": system_info["os"],
+        "SHELL_PLACEHOLDER": system_info["shell"],
+        "HOME_PLACEHOLDER": system_info["home_dir"],
+        "WORKSPACE_PLACEHOLDER": system_info["workspace_dir"],
+        "GLOBAL_SETTINGS_PLACEHOLDER": system_info["global_settings"],
+        "MCP_LOCATION_PLACEHOLDER": system_info["mcp_location"],
+        "MCP_SETTINGS_PLACEHOLDER": system_info["mcp_settings"]
+    }
+    
+    # Digests of the inputs shared by every prompt, for the render manifest
+    manifest = RenderManifest(roo_dir)
+    inputs = {
+        "system_info": content_digest(json.dumps(replacements, sort_keys=True)),
+        "mcp_metadata": content_digest(mcp_metadata or "")
+    }
+    if minify:
+        inputs["minify"] = True
+    render_jobs = []
+    errors = {}
+    
+    # Check for system prompt files in the project's roo_config/.roo directory
+    prompt_files_dir = config_dir / ".roo"
+    
+    if prompt_files_dir.exists() and any(prompt_files_dir.iterdir()):
+        logging.info(f"Found system prompt files in {prompt_files_dir}")
+        
+        # Compose each template from the shared fragments, read once for all modes,
+        # then render it straight into .roo: one write per file
+        fragments_dir = config_dir / FRAGMENTS_DIR_NAME
+        fragments = {}
+        for file_path in sorted(prompt_files_dir.glob("*")):
+            output_path = roo_dir / file_path.name
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    template = compose_template(f.read(), fragments_dir, fragments)
+            except (OSError, ValueError) as e:
+                logging.error(f"Error composing {file_path}: {e}")
+                errors[str(output_path)] = f"{type(e).__name__}: {e}"
+                continue
+            render_jobs.append({
+                "template_path": str(file_path),
+                "template": template,
+                "output_path": str(output_path),
+                "inputs": inputs,
+                "previous": manifest.previous(output_path)
+            })
+    else:
+        logging.info(f"No system prompt files found in {prompt_files_dir}")
+        
+        # List directories to help debug
+        logging.info("Current directory structure:")
+        for path in [roo_dir, config_dir]:
+            if path.exists():
+                logging.info(f"- {path}")
+        
+        # Check for default template in the project
+        default_template = None
+        possible_templates = [
+            Path(system_info["workspace_dir"]) / "default-system-prompt.md",
+            config_dir / "default-system-prompt.md"
+        ]
+        
+        for template_path in possible_templates:
+            if template_path.exists():
+                default_template = template_path
+                logging.info(f"Found default template at {default_template}")
+                break
+        
+        if default_template:
+            # Define the list of supported modes
+            supported_modes = []
+            
+            # Try to read modes from .roomodes file if it exists
+            roomodes_path = Path(system_info["workspace_dir"]) / ".roomodes"
+            if roomodes_path.exists():
+                try:
+                    with open(roomodes_path, 'r', encoding='utf-8') as f:
+                        try:
+                            # Try to parse as JSON first (new format)
+                            roomodes_data = json.load(f)
+                            if "customModes" in roomodes_data:
+                                for mode in roomodes_data["customModes"]:
+                                    if "slug" in mode:
+                                        supported_modes.append(mode["slug"])
+                            logging.info(f"Read {len(supported_modes)} modes from .roomodes JSON file")
+                        except json.JSONDecodeError:
+                            # Fallback to old format (one mode per line)
+                            f.seek(0)  # Reset file pointer to beginning
+                            for line in f:
+                                mode = line.strip()
+                                if mode and not mode.startswith('#'):
+                                    supported_modes.append(mode)
+                            logging.info(f"Read {len(supported_modes)} modes from .roomodes text file")
+                except Exception as e:
+                    logging.warning(f"Error reading .roomodes file: {e}")
+            
+            # If no modes found in .roomodes, use default set
+            if not supported_modes:
+                logging.info("No modes found in .roomodes file, using default set")
+                # Read from default modes file or use a minimal set
+                supported_modes = ["code", "ask", "architect", "debug"]  # Minimal default set
+                
+            # The template does not depend on the mode, so read it only once
+            try:
+                with open(default_template, 'r', encoding='utf-8') as f:
+                    template = f.read()
+            except Exception as e:
+                logging.error(f"Error reading {default_template}: {e}")
+                return {str(default_template): f"{type(e).__name__}: {e}"}
+            mode_inputs = dict(inputs, modes=content_digest(json.dumps(supported_modes)))
+            
+            # Create system prompt files for each mode
+            for mode in supported_modes:
+                output_path = roo_dir / f"system-prompt-{mode}"
+                render_jobs.append({
+                    "template_path": str(default_template),
+                    "template": template,
+                    "output_path": str(output_path),
+                    "inputs": mode_inputs,
+                    "previous": manifest.previous(output_path)
+                })
+        else:
+            logging.warning("No default system prompt template found.")
+            logging.warning("Please create system prompt files manually or provide a default template.")
+    
+    unchanged = 0
+    minified_bytes = saved_bytes = 0
+    for result in run_render_jobs(render_jobs, replacements, mcp_metadata, force, jobs, pool, minify):
+        if result["status"] == "error":
+            logging.error(f"Error rendering {result['path']}: {result['error']}")
+            errors[result["path"]] = result["error"]
+            continue
+        manifest.update(result["path"], result["entry"])
+        if result["status"] == "written":
+            logging.info(f"Rendered {result['path']}")
+        else:
+            logging.debug(f"{result['path']} is up to date")
+            unchanged += 1
+        
+        report = result["minify"]
+        if report and report.get("error"):
+            logging.warning(f"Not minifying {result['path']}: {report['error']}")
+        elif report:
+            saved = report["bytes"] - report["minified_bytes"]
+            minified_bytes += report["bytes"]
+            saved_bytes += saved
+            logging.info(f"Minified {Path(result['path']).name}: {report['bytes']:,} -> "
+                         f"{report['minified_bytes']:,} bytes ({saved:,} saved, {saved / report['bytes']:.1%})")
+    
+    manifest.save()
+    if unchanged:
+        logging.info(f"Rendered {len(render_jobs) - unchanged - len(errors)} prompt file(s); "
+                     f"{unchanged} already up to date")
+    if minified_bytes:
+        logging.info(f"Minification saved {saved_bytes:,} of {minified_bytes:,} bytes "
+                     f"({saved_bytes / minified_bytes:.1%})")
+    return errors
+
+
+def get_mcp_settings_candidates(system_info):
+    """Get the MCP settings files Roo Code may use, current name first."""
+    settings_dir = Path(system_info["mcp_settings"]).parent
+    return [settings_dir / name for name in MCP_SETTINGS_FILE_NAMES]
+
+
+def load_mcp_servers(settings_path):
+    """Load the ``mcpServers`` map from an MCP settings file.
+    
+    Returns:
+        The server definitions keyed by name (empty if the file does not exist),
+        or None if the file cannot be parsed, e.g. while an editor is saving it.
+    """
+    try:
+        with open(settings_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("mcpServers", {})
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, AttributeError) as e:
+        logging.warning(f"Could not read MCP settings {settings_path}: {e}")
+        return None
+
+
+def merge_mcp_servers(server_maps):
+    """Merge several ``mcpServers`` maps into one.
+    
+    A server defined in more than one map keeps the definition from the first,
+    so pass the maps in the order of ``get_mcp_settings_candidates``.
+    
+    Returns:
+        The merged server definitions keyed by name.
+    """
+    merged = {}
+    for servers in server_maps:
+        for name, server in servers.items():
+            merged.setdefault(name, server)
+    return merged
+
+
+def diff_mcp_servers(old_servers, new_servers):
+    """Compare two ``mcpServers`` maps.
+    
+    Returns:
+        A tuple of sorted lists: (added, changed, removed) server names.
+    """
+    added = sorted(name for name in new_servers if name not in old_servers)
+    removed = sorted(name for name in old_servers if name not in new_servers)
+    changed = sorted(name for name in new_servers
+                     if name in old_servers and new_servers[name] != old_servers[name])
+    return added, changed, removed
+
+
+def update_connected_servers(roo_dir, mcp_metadata):
+    """Rewrite the connected_servers section of every system prompt in ``roo_dir``.
+    
+    Placeholders are not touched, so prompts keep their rendered environment details.
+    
+    Returns:
+        The number of prompt files whose content changed.
+    """
+    updated = 0
+    for prompt_path in sorted(roo_dir.glob("system-prompt-*")):
+        if update_mcp_section(prompt_path, mcp_metadata):
+            logging.info(f"Updated MCP section in {prompt_path}")
+            updated += 1
+    return updated
+
+
+def _file_signature(path):
+    """Return a value that changes whenever ``path`` is written, replaced or removed."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _open_inotify(directories):
+    """Watch ``directories`` with inotify.
+    
+    Directories are watched rather than files because editors usually save by
+    writing a new file and renaming it over the old one.
+    
+    Returns:
+        A non-blocking inotify file descriptor, or None if inotify is unavailable
+        (not Linux, no libc, or none of the directories exist).
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError) as e:
+        logging.debug(f"inotify unavailable: {e}")
+        return None
+    if fd < 0:
+        return None
+    
+    watched = 0
+    for directory in directories:
+        if libc.inotify_add_watch(fd, os.fsencode(directory), INOTIFY_MASK) >= 0:
+            watched += 1
+    if not watched:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _inotify_names(fd):
+    """Drain pending inotify events and return the file names they refer to."""
+    names = set()
+    while True:
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset < len(data):
+            _, _, _, name_length = struct.unpack_from("iIII", data, offset)
+            offset += struct.calcsize("iIII")
+            names.add(os.fsdecode(data[offset:offset + name_length].rstrip(b"\0")))
+            offset += name_length
+
+
+def watch_files(paths, on_change, poll_interval=WATCH_POLL_INTERVAL, debounce=WATCH_DEBOUNCE):
+    """Call ``on_change(path)`` whenever one of ``paths`` is written, created or removed.
+    
+    Uses inotify on Linux and falls back to polling file signatures elsewhere.
+    Events are debounced so that one save triggers a single callback. Runs until
+    interrupted.
+    """
+    signatures = {path: _file_signature(path) for path in paths}
+    names = {path.name for path in paths}
+    fd = _open_inotify({path.parent for path in paths if path.parent.exists()})
+    if fd is None:
+        logging.info(f"Polling MCP settings every {poll_interval} seconds")
+    else:
+        logging.info("Watching MCP settings with inotify")
+    
+    try:
+        while True:
+            if fd is None:
+                time.sleep(poll_interval)
+            else:
+                select.select([fd], [], [])
+                if not _inotify_names(fd) & names:
+                    continue
+                # Let the editor finish its write/rename sequence
+                time.sleep(debounce)
+                _inotify_names(fd)
+            
+            for path in paths:
+                signature = _file_signature(path)
+                if signature != signatures[path]:
+                    signatures[path] = signature
+                    on_change(path)
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+
+def watch_mcp_settings(settings_paths, roo_dir, script_path, options=None,
+                       poll_interval=WATCH_POLL_INTERVAL):
+    """Refresh the connected_servers sections whenever the MCP settings change.
+    
+    Each change is diffed against the last snapshot of ``mcpServers``. Edits
+    outside that map are ignored; otherwise the checker re-probes only the added
+    and changed servers (the others are served from its metadata cache) and only
+    the connected_servers sections of the prompts are rewritten. The prompts list
+    the servers of every watched file, merged with ``merge_mcp_servers``, so a
+    change to one file does not drop the servers of the others.
+    """
+    snapshots = {path: load_mcp_servers(path) or {} for path in settings_paths}
+    
+    def on_change(settings_path):
+        servers = load_mcp_servers(settings_path)
+        if servers is None:
+            return
+        added, changed, removed = diff_mcp_servers(snapshots[settings_path], servers)
+        if not (added or changed or removed):
+            logging.info(f"{settings_path.name} changed, but its MCP servers did not")
+            return
+        print(f"{settings_path.name} changed: added {added or 'none'}, "
+              f"changed {changed or 'none'}, removed {removed or 'none'}")
+        
+        current = dict(snapshots)
+        current[settings_path] = servers
+        merged = merge_mcp_servers(current[path] for path in settings_paths)
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as merged_file:
+            json.dump({"mcpServers": merged}, merged_file)
+        try:
+            mcp_metadata = extract_mcp_metadata(
+                script_path, dict(options or {}, settings=merged_file.name, refresh=added + changed))
+        finally:
+            os.unlink(merged_file.name)
+        if mcp_metadata is None:
+            # Keep the old snapshot so the next change re-probes these servers
+            logging.warning("Failed to refresh MCP metadata; prompts were left unchanged.")
+            return
+        
+        snapshots[settings_path] = servers
+        print(f"Updated the MCP section in {update_connected_servers(roo_dir, mcp_metadata)} prompt file(s)")
+    
+    print(f"Watching {', '.join(str(path) for path in settings_paths)} (press Ctrl+C to stop)")
+    try:
+        watch_files(settings_paths, on_change, poll_interval=poll_interval)
+    except KeyboardInterrupt:
+        print()
+        print("Stopped watching MCP settings.")
+
+
+def main(argv=None):
+    """Main entry point for the script.
+    
+    Args:
+        argv: Command-line arguments, without the program name (default: sys.argv[1:])
+    
+    Returns:
+        The exit status: 0 on success, 1 if any system prompt could not be rendered.
+    """
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description='RooFlow Environment Setup Script (Cross-Platform)')
+    parser.add_argument('--compact-mcp', action='store_true',
+                        help='Render MCP tool schemas compactly (minified, shared sub-schemas hoisted)')
+    parser.add_argument('--mcp-max-tokens', type=int,
+                        help='Estimated token budget for the connected_servers block')
+    parser.add_argument('--force', action='store_true',
+                        help='Rewrite every prompt even if the render manifest shows it is up to date')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_RENDER_JOBS,
+                        help=f'Number of prompt files rendered in parallel (default: {DEFAULT_RENDER_JOBS})')
+    parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                        help='Worker pool used for parallel rendering (default: thread)')
+    parser.add_argument('--minify', action='store_true',
+                        help='Write prompts as compact YAML without comments (requires PyYAML)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and refresh the MCP sections whenever the MCP settings change')
+    parser.add_argument('--poll-interval', type=float, default=WATCH_POLL_INTERVAL,
+                        help=f'Seconds between checks when inotify is unavailable (default: {WATCH_POLL_INTERVAL})')
+    parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
+    args = parser.parse_args(argv)
+    
+    # Setup logging
+    setup_logging(args.verbose)
+    
+    # Print header
+    print("RooFlow Environment Setup Script (Cross-Platform)")
+    print("==============================================")
+    print()
+    print("This script will update system prompt files with your local environment details and MCP metadata.")
+    print()
+    
+    # Determine script location and project root
+    script_dir = get_script_dir()
+    project_root = get_project_root(script_dir)
+    config_dir = script_dir
+    
+    print(f"Script directory: {script_dir}")
+    print(f"- Project Root: {project_root}")
+    print(f"- Config Directory: {config_dir}")
+    
+    # Get system information
+    system_info = get_system_info()
+    
+    print("Detected Environment:")
+    print(f"- OS: {system_info['os']}")
+    print(f"- Shell: {system_info['shell']}")
+    print(f"- Home Directory: {system_info['home_dir']}")
+    print(f"- Workspace Directory: {system_info['workspace_dir']}")
+    print()
+    
+    # Directory setup
+    roo_dir = Path(system_info["workspace_dir"]) / ".roo"
+    
+    # Create .roo directory if it doesn't exist
+    if not roo_dir.exists():
+        roo_dir.mkdir(parents=True)
+        print(f"Created .roo directory at {roo_dir}")
+    
+    # Set up paths for MCP checker
+    mcp_checker_script = config_dir / "mcp_checker.py"
+    
+    # Check dependencies (not needed when the checker can run in this process)
+    if load_mcp_checker(mcp_checker_script) is None and not check_dependencies():
+        logging.warning("Warning: Dependency check failed. Some features may not work correctly.")
+    
+    # Run MCP checker
+    checker_options = {"compact": args.compact_mcp, "max_tokens": args.mcp_max_tokens}
+    mcp_metadata = extract_mcp_metadata(mcp_checker_script, checker_options)
+    if mcp_metadata is not None:
+        print("MCP metadata extracted successfully")
+        
+        # Display size and first few lines
+        print(f"Size: {len(mcp_metadata.encode('utf-8'))} bytes")
+        
+        print("First few lines of MCP metadata:")
+        for line in mcp_metadata.splitlines()[:5]:
+            print(line)
+    else:
+        print("Warning: Failed to extract MCP metadata. See the error log mentioned above.")
+        print("The script will continue, but MCP metadata may not be updated.")
+        mcp_metadata = "No MCP metadata available"
+    
+    # Minification needs PyYAML to check that the minified prompts mean the same
+    minify = args.minify
+    if minify and importlib.util.find_spec("yaml") is None:
+        logging.warning("Warning: --minify requires PyYAML (pip install pyyaml). Writing prompts unminified.")
+        minify = False
+    
+    # Process system prompt files
+    render_errors = process_system_prompt_files(roo_dir, config_dir, system_info, mcp_metadata,
+                                                force=args.force, jobs=args.jobs, pool=args.pool,
+                                                minify=minify)
+    if render_errors:
+        print()
+        print(f"Failed to render {len(render_errors)} system prompt file(s):")
+        for path, error in render_errors.items():
+            print(f"- {path}: {error}")
+        return 1
+    
+    print()
+    print("Setup complete!")
+    print("You can now use RooFlow with your local environment settings and updated MCP metadata.")
+    print()
+    
+    if args.watch:
+        watch_mcp_settings(get_mcp_settings_candidates(system_info), roo_dir, mcp_checker_script,
+                           checker_options, poll_interval=args.poll_interval)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,2109 @@
+"""
+MCP Metadata Extractor
+
+This script connects to MCP (Model Context Protocol) servers defined in the settings file,
+extracts metadata about their tools and resources, and formats this information as Markdown
+or JSON.
+
+Usage:
+    python mcp_checker.py [--settings SETTINGS_PATH] [--output OUTPUT_FILE] [--format {markdown,json}] [--concurrency N] [--budget SECONDS] [--verbose]
+    
+    With UV:
+    uv run --with mcp mcp_checker.py [--settings SETTINGS_PATH] [--output OUTPUT_FILE] [--format {markdown,json}] [--concurrency N] [--budget SECONDS] [--verbose]
+    
+    Alternative UV method:
+    uv run mcp_checker.py [--settings SETTINGS_PATH] [--output OUTPUT_FILE] [--format {markdown,json}] [--concurrency N] [--budget SECONDS] [--verbose]
+
+Arguments:
+    --settings      Path to the MCP settings file (default: platform-specific path)
+    --output        Output file path (default: mcp_metadata.md)
+    --format        Output format: markdown or json (default: markdown)
+    --concurrency   Maximum number of servers probed at the same time (default: 4, 1 = sequential)
+    --connect-timeout         Seconds allowed to spawn and initialize each server (default: 30)
+    --list-tools-timeout      Seconds allowed for each list_tools request (default: 15)
+    --list-resources-timeout  Seconds allowed for each list_resources request (default: 15)
+    --budget        Overall time budget in seconds for all servers, 0 to disable (default: 120)
+    --no-cache      Probe every server and do not read or write the metadata cache
+    --refresh       Re-probe the named server even if it is cached (repeatable)
+    --cache-path    Path to the metadata cache file (default: platform-specific path)
+    --cache-ttl     Maximum age of cached metadata in seconds (default: 86400)
+    --daemon        Run as a probe daemon serving metadata from warm sessions over a Unix socket
+    --stop-daemon   Ask a running probe daemon to shut down
+    --socket        Path of the probe daemon socket (default: per-user runtime path)
+    --idle-timeout  Seconds after which the daemon closes an unused server session (default: 600)
+    --no-daemon     Do not query a running probe daemon
+    --stream        Write Markdown output incrementally as pages arrive, keeping memory use flat
+    --compact       Render minified input schemas and hoist shared sub-schemas into one definitions block
+    --max-tokens    Estimated token budget for the Markdown output; lower-priority content is elided
+    --priority      Keep the named server first when the token budget is tight (repeatable)
+    --profile       Print a table of per-phase probe timings, slowest servers first, to stderr
+    --verbose       Enable verbose output
+
+Examples:
+    # Extract metadata using default settings with UV (recommended)
+    uv run --with mcp mcp_checker.py
+    
+    # Extract metadata using default settings with traditional Python
+    python mcp_checker.py
+    
+    # Extract metadata with custom settings file and output to JSON
+    uv run --with mcp mcp_checker.py --settings /path/to/settings.json --format json --output metadata.json
+    
+    # Extract metadata with verbose logging
+    uv run --with mcp mcp_checker.py --verbose
+    
+    # Probe up to 8 servers in parallel
+    uv run --with mcp mcp_checker.py --concurrency 8
+    
+    # Ignore cached metadata for one server
+    uv run --with mcp mcp_checker.py --refresh github
+    
+    # Find out which servers make probing slow
+    uv run --with mcp mcp_checker.py --no-cache --profile
+    
+    # Keep server sessions warm in the background; later runs query the daemon
+    uv run --with mcp mcp_checker.py --daemon &
+
+Dependencies:
+    - mcp: The Model Context Protocol client library
+    - asyncio: For asynchronous operations
+    - json: For parsing and formatting JSON data
+"""
+
+import json
+import asyncio
+import hashlib
+import inspect
+import os
+import re
+import shutil
+import stat
+import sys
+import tempfile
+import time
+import argparse
+import logging
+from typing import Dict, Any, List, Optional
+
+
+# Number of servers probed in parallel when no explicit limit is given
+DEFAULT_CONCURRENCY = 4
+
+# Per-phase deadlines in seconds (spawn + initialize, list_tools, list_resources)
+DEFAULT_CONNECT_TIMEOUT = 30.0
+DEFAULT_LIST_TOOLS_TIMEOUT = 15.0
+DEFAULT_LIST_RESOURCES_TIMEOUT = 15.0
+
+# Overall time budget in seconds for probing every server
+DEFAULT_BUDGET = 120.0
+
+# Probe phases timed for every server, in the order they run
+TIMING_PHASES = ("spawn", "initialize", "list_tools", "list_resources", "total")
+
+# Metadata cache defaults: entries expire after a day, the file is kept under 8 MiB
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+DEFAULT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# Compact schema rendering: keys dropped as boilerplate, keys dropped when they
+# hold the JSON Schema default, and the minimum serialized size of a sub-schema
+# worth hoisting into the shared definitions block
+SCHEMA_BOILERPLATE_KEYS = ("$schema", "$id", "title")
+SCHEMA_DEFAULT_VALUES = {"additionalProperties": True, "required": []}
+MIN_SHARED_SCHEMA_CHARS = 40
+
+# JSON Schema keywords whose values are sub-schemas, maps of sub-schemas or lists of sub-schemas
+SCHEMA_KEYWORDS = ("items", "additionalProperties", "not", "contains", "propertyNames", "if", "then", "else")
+SCHEMA_MAP_KEYWORDS = ("properties", "patternProperties", "$defs", "definitions", "dependentSchemas")
+SCHEMA_LIST_KEYWORDS = ("anyOf", "oneOf", "allOf", "prefixItems", "items")
+
+# Offline token estimate: letter runs cost one token per 6 characters, digit runs one
+# per 3, whitespace runs and punctuation one each
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d+|\s+|[^\w\s]|_")
+
+# Probe daemon defaults: warm sessions are closed after 10 minutes without use
+DEFAULT_IDLE_TIMEOUT = 600.0
+DAEMON_CLOSE_TIMEOUT = 5.0
+
+# The mcp client runs on anyio task groups, which wrap errors and cancellations in
+# exception groups; interpreters before 3.11 get the class from anyio's backport
+try:
+    _BaseExceptionGroup = BaseExceptionGroup
+except NameError:
+    try:
+        from exceptiongroup import BaseExceptionGroup as _BaseExceptionGroup
+    except ImportError:
+        _BaseExceptionGroup = ()
+
+
+def get_mcp_settings_path():
+    """Get the platform-specific path to MCP settings.
+    
+    Determines the appropriate path to the MCP settings file based on the user's
+    operating system (Windows, macOS, or Linux).
+    
+    Returns:
+        str: The path to the MCP settings file based on the current platform.
+    """
+    home_dir = os.path.expanduser("~")
+    
+    # Platform-specific paths using a dictionary for cleaner code
+    paths = {
+        "darwin": os.path.join(home_dir, "Library/Application Support/Code/User/globalStorage/rooveterinaryinc.roo-cline/settings/mcp_settings.json"),
+        "win32": os.path.join(home_dir, "AppData/Roaming/Code/User/globalStorage/rooveterinaryinc.roo-cline/settings/mcp_settings.json"),
+        # Default to Linux path
+        "default": os.path.join(home_dir, ".config/Code/User/globalStorage/rooveterinaryinc.roo-cline/settings/mcp_settings.json")
+    }
+    
+    return paths.get(sys.platform, paths["default"])
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens a language model tokenizer produces for ``text``.
+    
+    This is an offline approximation of byte-pair encodings such as cl100k: it
+    needs no tokenizer files and is meant for budgeting, not exact accounting.
+    
+    Args:
+        text (str): The text to measure
+    
+    Returns:
+        int: The estimated number of tokens
+    """
+    tokens = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        if piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            tokens += (len(piece) + 5) // 6
+        else:
+            tokens += 1
+    return tokens
+
+
+def describe_error(error: BaseException) -> str:
+    """
+    Describe an exception, unwrapping the exception groups raised by anyio.
+    
+    Args:
+        error (BaseException): The exception to describe
+    
+    Returns:
+        str: The messages of the innermost exceptions, separated by semicolons
+    """
+    if _BaseExceptionGroup and isinstance(error, _BaseExceptionGroup):
+        return "; ".join(describe_error(inner) for inner in error.exceptions)
+    return str(error) or type(error).__name__
+
+
+def _is_cancellation(error: BaseException) -> bool:
+    """Return whether an exception, or every exception in a group, is a cancellation."""
+    if _BaseExceptionGroup and isinstance(error, _BaseExceptionGroup):
+        return all(_is_cancellation(inner) for inner in error.exceptions)
+    return isinstance(error, asyncio.CancelledError)
+
+
+def get_cache_path():
+    """Get the platform-specific path to the MCP metadata cache file.
+    
+    Uses LOCALAPPDATA on Windows, ~/Library/Caches on macOS and XDG_CACHE_HOME
+    (defaulting to ~/.cache) elsewhere.
+    
+    Returns:
+        str: The path to the metadata cache file.
+    """
+    home_dir = os.path.expanduser("~")
+    
+    if sys.platform == "win32":
+        base_dir = os.environ.get("LOCALAPPDATA", os.path.join(home_dir, "AppData/Local"))
+    elif sys.platform == "darwin":
+        base_dir = os.path.join(home_dir, "Library/Caches")
+    else:
+        base_dir = os.environ.get("XDG_CACHE_HOME", os.path.join(home_dir, ".cache"))
+    
+    return os.path.join(base_dir, "rooflow", "mcp_metadata_cache.json")
+
+
+def get_daemon_socket_path():
+    """Get the default path of the probe daemon's Unix socket.
+    
+    The socket lives in XDG_RUNTIME_DIR when available. Otherwise it lives in a
+    per-user directory inside the system temporary directory, which the daemon
+    creates with mode 0700, since the temporary directory is shared by all users.
+    
+    Returns:
+        str: The path to the probe daemon socket.
+    """
+    user_id = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or \
+        os.path.join(tempfile.gettempdir(), f"rooflow-mcp-{user_id}")
+    return os.path.join(runtime_dir, f"rooflow-mcp-{user_id}.sock")
+
+
+def _owned_by_current_user(path: str) -> bool:
+    """Return whether a file belongs to the current user (always True where uids do not exist)."""
+    if not hasattr(os, "getuid"):
+        return True
+    try:
+        return os.lstat(path).st_uid == os.getuid()
+    except FileNotFoundError:
+        # Nothing there to distrust
+        return True
+
+
+class MetadataCache:
+    """
+    A persistent, size-bounded LRU cache of MCP server metadata.
+    
+    Entries are keyed by a hash of the server definition (command, args and env)
+    plus the modification time of the resolved executable, so editing a server's
+    configuration or upgrading its binary invalidates the entry automatically.
+    The whole cache is a single JSON file that is loaded lazily and written back
+    atomically by ``save``.
+    
+    Attributes:
+        path (str): Path to the cache file
+        ttl (float): Maximum age of an entry in seconds
+        max_bytes (int): Maximum serialized size of all entries combined
+    """
+    
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_CACHE_TTL,
+                 max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """
+        Initialize the cache.
+        
+        Args:
+            path (str, optional): Path to the cache file (default: platform-specific path)
+            ttl (float): Maximum age of an entry in seconds
+            max_bytes (int): Maximum serialized size of all entries combined
+        """
+        self.path = path or get_cache_path()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = None
+        self._dirty = False
+    
+    def _load(self) -> Dict[str, Any]:
+        """
+        Load the cache file on first use.
+        
+        A missing or unreadable cache file is treated as an empty cache.
+        
+        Returns:
+            Dict[str, Any]: The cache entries keyed by definition hash
+        """
+        if self._entries is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f).get("entries", {})
+            except (OSError, ValueError, AttributeError) as e:
+                if os.path.exists(self.path):
+                    logging.warning(f"Ignoring unreadable metadata cache {self.path}: {e}")
+                self._entries = {}
+        return self._entries
+    
+    @staticmethod
+    def make_key(server_config: Dict[str, Any]) -> str:
+        """
+        Compute the cache key for a server definition.
+        
+        Args:
+            server_config (Dict[str, Any]): The server entry from the MCP settings
+        
+        Returns:
+            str: A hex digest identifying the definition and its executable
+        """
+        command = server_config.get('command')
+        env = server_config.get('env', {})
+        search_path = env.get('PATH', os.environ.get('PATH'))
+        executable = shutil.which(command, path=search_path) if command else None
+        try:
+            executable_mtime = os.stat(executable).st_mtime if executable else None
+        except OSError:
+            executable_mtime = None
+        
+        definition = {
+            "command": command,
+            "args": server_config.get('args', []),
+            "env": env,
+            "executable": executable,
+            "executable_mtime": executable_mtime
+        }
+        return hashlib.sha256(json.dumps(definition, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up fresh metadata for a key and mark it as recently used.
+        
+        The recency update is kept in memory and only written out when an insert
+        or eviction changes the cache, so runs served entirely from the cache do
+        not rewrite the file.
+
+        Args:
+            key (str): The cache key from ``make_key``
+        
+        Returns:
+            Optional[Dict[str, Any]]: The cached metadata, or None on a miss or expired entry
+        """
+        entries = self._load()
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        
+        now = time.time()
+        if now - entry.get("stored_at", 0) > self.ttl:
+            del entries[key]
+            self._dirty = True
+            return None
+        
+        entry["last_used"] = now
+        return entry["metadata"]
+    
+    def put(self, key: str, metadata: Dict[str, Any]) -> None:
+        """
+        Store metadata for a key, evicting least recently used entries if needed.
+        
+        Args:
+            key (str): The cache key from ``make_key``
+            metadata (Dict[str, Any]): The server metadata to store
+        """
+        entries = self._load()
+        now = time.time()
+        entries[key] = {
+            "stored_at": now,
+            "last_used": now,
+            "size": len(json.dumps(metadata)),
+            "metadata": metadata
+        }
+        self._dirty = True
+        self._evict()
+    
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in ``max_bytes``."""
+        entries = self._load()
+        total = sum(entry.get("size", 0) for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key].get("size", 0)
+            del entries[key]
+            logging.debug(f"Evicted metadata cache entry {key[:12]}")
+    
+    def save(self) -> None:
+        """
+        Write the cache back to disk if it changed.
+        
+        The file is written to a temporary file and renamed into place so that
+        concurrent readers never see a partially written cache. Failures are
+        logged and otherwise ignored; the cache is only an optimization.
+        """
+        if not self._dirty:
+            return
+        
+        try:
+            cache_dir = os.path.dirname(self.path)
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({"entries": self._entries}, f)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self._dirty = False
+        except OSError as e:
+            logging.warning(f"Could not write metadata cache {self.path}: {e}")
+
+
+class MCPMetadataExtractor:
+    """
+    A class for extracting metadata from MCP servers.
+    
+    This class connects to MCP servers defined in the settings file, extracts metadata
+    about their tools and resources, and formats this information as Markdown or JSON.
+    
+    Attributes:
+        settings_path (str): Path to the MCP settings file
+        settings (dict): Parsed settings from the MCP settings file
+        concurrency (int): Maximum number of servers probed at the same time
+        connect_timeout (float): Deadline in seconds for spawning and initializing a server
+        list_tools_timeout (float): Deadline in seconds for the list_tools request
+        list_resources_timeout (float): Deadline in seconds for the list_resources request
+        budget (float): Overall time budget in seconds for all servers, or None for no limit
+        cache (MetadataCache): Persistent metadata cache, or None to always probe
+        refresh (set): Names of servers that bypass the cache and are always probed
+        stream (MarkdownStreamWriter): Writer receiving pages as they arrive, or None
+        compact (bool): Whether Markdown output uses compact schema rendering
+        max_tokens (int): Estimated token budget for the Markdown output, or None for no limit
+        priority (List[str]): Servers that are kept first when the token budget is tight
+    """
+    
+    def __init__(self, settings_path: str, concurrency: int = DEFAULT_CONCURRENCY,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 list_tools_timeout: float = DEFAULT_LIST_TOOLS_TIMEOUT,
+                 list_resources_timeout: float = DEFAULT_LIST_RESOURCES_TIMEOUT,
+                 budget: Optional[float] = DEFAULT_BUDGET,
+                 cache: Optional[MetadataCache] = None,
+                 refresh: Optional[List[str]] = None,
+                 compact: bool = False,
+                 max_tokens: Optional[int] = None,
+                 priority: Optional[List[str]] = None):
+        """
+        Initialize the MCPMetadataExtractor with a settings file path.
+        
+        Args:
+            settings_path (str): Path to the MCP settings file
+            concurrency (int): Maximum number of servers probed at the same time.
+                Values below 1 are treated as 1 (sequential probing).
+            connect_timeout (float): Deadline in seconds for spawning and initializing a server
+            list_tools_timeout (float): Deadline in seconds for the list_tools request
+            list_resources_timeout (float): Deadline in seconds for the list_resources request
+            budget (float, optional): Overall time budget in seconds for all servers.
+                None or a value <= 0 disables the budget.
+            cache (MetadataCache, optional): Persistent metadata cache. Cached servers are
+                served without being started; None disables caching.
+            refresh (List[str], optional): Names of servers to re-probe even if cached
+            compact (bool): Render input schemas minified, without boilerplate keys and
+                with sub-schemas shared between tools hoisted into one definitions block
+            max_tokens (int, optional): Estimated token budget for the Markdown output.
+                Content is kept by priority and the rest is elided; None disables the budget.
+            priority (List[str], optional): Servers kept first when the budget is tight;
+                the remaining servers follow in settings order
+
+        Raises:
+            FileNotFoundError: If the settings file does not exist
+        """
+        self.settings_path = settings_path
+        self.settings = self._load_settings()
+        self.concurrency = max(1, concurrency)
+        self.connect_timeout = connect_timeout
+        self.list_tools_timeout = list_tools_timeout
+        self.list_resources_timeout = list_resources_timeout
+        self.budget = budget if budget and budget > 0 else None
+        self.cache = cache
+        self.refresh = set(refresh or [])
+        self.stream = None
+        self.compact = compact
+        self.max_tokens = max_tokens if max_tokens and max_tokens > 0 else None
+        self.priority = list(priority or [])
+        self._budget_expired = False
+    
+    def _load_settings(self) -> Dict[str, Any]:
+        """
+        Load and parse the MCP settings file.
+        
+        Returns:
+            Dict[str, Any]: The parsed settings as a dictionary
+            
+        Raises:
+            FileNotFoundError: If the settings file does not exist
+            json.JSONDecodeError: If the settings file is not valid JSON
+        """
+        with open(self.settings_path, 'r') as f:
+            return json.load(f)
+    
+    async def extract_server_metadata(self, server_name: str,
+                                      metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Connect to an MCP server and extract its metadata.
+        
+        This function connects to the specified MCP server, retrieves information about
+        its tools and resources, and returns this information as a dictionary. Each
+        phase runs under its own deadline; a phase that exceeds it marks the server
+        as ``timeout`` while keeping whatever was retrieved before.
+        
+        Args:
+            server_name (str): The name of the MCP server to connect to
+            metadata (Dict[str, Any], optional): Dictionary to fill in place. Passing one
+                lets the caller keep partial results if the probe is cancelled.
+            
+        Returns:
+            Dict[str, Any]: A dictionary containing the server's metadata including:
+                - name: Server name
+                - command: Command used to start the server
+                - args: Command arguments
+                - status: Connection status (connected, disabled, error, timeout)
+                - timings: Seconds spent in each of ``TIMING_PHASES`` that ran
+                - payload: Number of tools and resources and their size in JSON bytes
+                - tools: List of available tools with their schemas
+                - resources: List of available resources
+                - error: Error message if connection failed
+                
+        Raises:
+            ValueError: If the server is not found in the settings
+            Exception: If there is an error connecting to the server
+        """
+        if server_name not in self.settings.get('mcpServers', {}):
+            raise ValueError(f"Server '{server_name}' not found in settings")
+        
+        server_config = self.settings['mcpServers'][server_name]
+        
+        # Check if the server is disabled in settings
+        if metadata is None:
+            metadata = {}
+        if server_config.get('disabled', False):
+            logging.info(f"Server '{server_name}' is disabled, skipping")
+            metadata.update({"name": server_name, "status": "disabled"})
+            return metadata
+        
+        # Imported lazily so that runs served entirely from the cache skip loading mcp
+        from mcp import ClientSession
+        from mcp.client.stdio import stdio_client
+        
+        server_params = self._server_params(server_config)
+        metadata.update({
+            "name": server_name,
+            "command": server_params.command,
+            "args": server_params.args,
+            "status": "connected",
+            "timings": {},
+            "payload": self._empty_payload(),
+            "tools": [],
+            "resources": []
+        })
+        timings = metadata["timings"]
+        started = time.perf_counter()
+        
+        try:
+            logging.debug(f"Connecting to server '{server_name}'")
+            async with stdio_client(server_params) as (read, write):
+                timings["spawn"] = round(time.perf_counter() - started, 4)
+                async with ClientSession(read, write) as session:
+                    # Initialize the connection with the MCP server
+                    phase_started = time.perf_counter()
+                    try:
+                        await asyncio.wait_for(session.initialize(), self.connect_timeout)
+                    except asyncio.TimeoutError:
+                        self._mark_timeout(metadata, f"initialize did not complete within {self.connect_timeout}s")
+                        return metadata
+                    finally:
+                        timings["initialize"] = round(time.perf_counter() - phase_started, 4)
+                    
+                    spool = self.stream.open_server(server_name, metadata) if self.stream else None
+                    await self._list_server_contents(session, metadata, spool)
+        
+        except (Exception, asyncio.CancelledError, _BaseExceptionGroup) as e:
+            if _is_cancellation(e):
+                # Cancelled by the time budget; extract_all_metadata records the timeout
+                raise
+            if metadata.get("status") == "timeout" or self._budget_expired:
+                # Closing the session after a deadline surfaces the cancellation of
+                # its pending requests; keep the timeout already recorded
+                logging.debug(f"Ignoring error while closing server '{server_name}': {describe_error(e)}")
+            else:
+                # Handle connection errors
+                message = describe_error(e)
+                logging.error(f"Error connecting to server '{server_name}': {message}")
+                metadata["status"] = "error"
+                metadata["error"] = message
+        finally:
+            # Also recorded when the probe is cancelled by the time budget
+            timings["total"] = round(time.perf_counter() - started, 4)
+        
+        return metadata
+    
+    @staticmethod
+    def _empty_payload() -> Dict[str, int]:
+        """Return the payload counters of a server that has not listed anything yet."""
+        return {"tools": 0, "tools_bytes": 0, "resources": 0, "resources_bytes": 0}
+    
+    def _server_params(self, server_config: Dict[str, Any]):
+        """
+        Build the stdio launch parameters for a server definition.
+        
+        Args:
+            server_config (Dict[str, Any]): The server entry from the MCP settings
+        
+        Returns:
+            StdioServerParameters: Command, arguments and merged environment for the server
+        """
+        from mcp import StdioServerParameters
+        
+        # Merge environment variables with current environment
+        full_env = os.environ.copy()
+        full_env.update(server_config.get('env', {}))
+        
+        return StdioServerParameters(
+            command=server_config.get('command'),
+            args=server_config.get('args', []),
+            env=full_env
+        )
+    
+    async def _list_server_contents(self, session, metadata: Dict[str, Any], spool=None) -> None:
+        """
+        List the tools and resources of an initialized session into ``metadata``.
+        
+        Pagination cursors are followed until the server has returned every page.
+        Each listing runs under its own deadline. Failures are recorded as
+        ``tools_error``/``resources_error`` and timeouts additionally mark the
+        server as ``timeout``; neither discards what was already retrieved. The
+        duration of each listing and the size of what it returned are recorded
+        in ``timings`` and ``payload``.
+        
+        Args:
+            session (ClientSession): An initialized MCP client session
+            metadata (Dict[str, Any]): The server metadata to fill in place
+            spool (_ServerSpool, optional): When given, pages are written to the
+                spool as they arrive instead of being collected in ``metadata``
+        """
+        server_name = metadata.get("name")
+        timings = metadata.setdefault("timings", {})
+        payload = metadata.setdefault("payload", self._empty_payload())
+        
+        def add_tools(tools):
+            page = [self._tool_data(tool) for tool in tools]
+            payload["tools"] += len(page)
+            payload["tools_bytes"] += len(json.dumps(page))
+            if spool is not None:
+                spool.add_tools(page)
+            else:
+                metadata["tools"].extend(page)
+        
+        def add_resources(resources):
+            page = [self._resource_data(resource) for resource in resources]
+            payload["resources"] += len(page)
+            payload["resources_bytes"] += len(json.dumps(page))
+            if spool is not None:
+                spool.add_resources(page)
+            else:
+                metadata["resources"].extend(page)
+        
+        # Get tools from the server
+        phase_started = time.perf_counter()
+        try:
+            metadata["tools"] = []
+            await asyncio.wait_for(self._list_pages(session.list_tools, "tools", add_tools),
+                                   self.list_tools_timeout)
+            logging.debug(f"Retrieved tools from '{server_name}'")
+        except asyncio.TimeoutError:
+            message = f"list_tools did not complete within {self.list_tools_timeout}s"
+            metadata["tools_error"] = message
+            self._mark_timeout(metadata, message)
+        except Exception as e:
+            # Store the error message if tool retrieval fails
+            logging.error(f"Error retrieving tools from '{server_name}': {e}")
+            metadata["tools_error"] = str(e)
+        finally:
+            timings["list_tools"] = round(time.perf_counter() - phase_started, 4)
+        if spool is not None:
+            spool.tools_done(metadata)
+        
+        # Get resources from the server
+        phase_started = time.perf_counter()
+        try:
+            metadata["resources"] = []
+            await asyncio.wait_for(self._list_pages(session.list_resources, "resources", add_resources),
+                                   self.list_resources_timeout)
+            logging.debug(f"Retrieved resources from '{server_name}'")
+        except asyncio.TimeoutError:
+            message = f"list_resources did not complete within {self.list_resources_timeout}s"
+            metadata["resources_error"] = message
+            self._mark_timeout(metadata, message)
+        except Exception as e:
+            # Store the error message if resource retrieval fails
+            logging.error(f"Error retrieving resources from '{server_name}': {e}")
+            metadata["resources_error"] = str(e)
+        finally:
+            timings["list_resources"] = round(time.perf_counter() - phase_started, 4)
+        if spool is not None:
+            spool.resources_done(metadata)
+    
+    async def _list_pages(self, list_method, attribute: str, on_page) -> None:
+        """
+        Call a paginated list method until the server stops returning a cursor.
+        
+        Each page is handed to ``on_page`` as soon as it arrives, so callers can
+        process or write it out without holding the whole listing in memory.
+        
+        Args:
+            list_method: ``session.list_tools`` or ``session.list_resources``
+            attribute (str): Name of the result attribute holding the page items
+            on_page: Callable receiving the items of each page
+        """
+        accepts_params = 'params' in inspect.signature(list_method).parameters
+        cursor = None
+        seen_cursors = set()
+        while True:
+            if cursor is None:
+                response = await list_method()
+            elif accepts_params:
+                from mcp.types import PaginatedRequestParams
+                response = await list_method(params=PaginatedRequestParams(cursor=cursor))
+            else:
+                response = await list_method(cursor)
+            on_page(getattr(response, attribute))
+            
+            cursor = getattr(response, 'nextCursor', None)
+            if not cursor:
+                break
+            if cursor in seen_cursors:
+                logging.warning(f"Server repeated pagination cursor {cursor!r}, stopping")
+                break
+            seen_cursors.add(cursor)
+    
+    @staticmethod
+    def _tool_data(tool) -> Dict[str, Any]:
+        """Convert a tool returned by list_tools into plain metadata."""
+        return {
+            "name": tool.name,
+            "description": tool.description,
+            "inputSchema": tool.inputSchema
+        }
+    
+    @staticmethod
+    def _resource_data(resource) -> Dict[str, Any]:
+        """Convert a resource returned by list_resources into plain metadata."""
+        resource_data = {"description": getattr(resource, "description", "No description available")}
+        # Safely access uriTemplate attribute which may not exist in all resources
+        if hasattr(resource, 'uriTemplate'):
+            resource_data["uriTemplate"] = resource.uriTemplate
+        else:
+            resource_data["uriTemplate"] = "No URI template available"
+        return resource_data
+    
+    def _mark_timeout(self, metadata: Dict[str, Any], message: str) -> None:
+        """
+        Record a timeout on a server's metadata without discarding partial results.
+        
+        Args:
+            metadata (Dict[str, Any]): The server metadata to update in place
+            message (str): Description of the deadline that was exceeded
+        """
+        logging.warning(f"Timeout on server '{metadata.get('name')}': {message}")
+        metadata["status"] = "timeout"
+        if metadata.get("error"):
+            metadata["error"] = f"{metadata['error']}; {message}"
+        else:
+            metadata["error"] = message
+    
+    async def extract_all_metadata(self, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Extract metadata from all servers in the settings file.
+        
+        Servers are probed concurrently, with at most ``self.concurrency`` probes
+        in flight at once. Each probe is isolated: an unexpected failure in one
+        server is recorded as an error entry for that server and does not cancel
+        the others. The returned dictionary keeps the order of the settings file
+        regardless of which server finishes first.
+        
+        When a global budget is set, probes still running once it is exhausted are
+        cancelled and recorded with status ``timeout``, keeping any tools or
+        resources they had already retrieved. This holds however the cancelled
+        probe ends, since the mcp client may surface the cancellation as an error.
+        
+        When a cache is configured, servers with a fresh entry are served from it
+        without being started, and successfully probed servers are stored back.
+        Cached entries are marked ``cached`` and keep the timings of the probe
+        that produced them.
+        
+        Args:
+            deadline (float, optional): ``time.monotonic()`` value at which the budget
+                runs out, for callers that already spent part of it (default: the
+                full budget from now)
+        
+        Returns:
+            Dict[str, Any]: A dictionary mapping server names to their metadata
+        """
+        servers = self.settings.get('mcpServers', {})
+        # An extractor may be reused (in process, by the daemon); each run has its own budget
+        self._budget_expired = False
+        cached, cache_keys = {}, {}
+        if self.cache is not None:
+            for server_name, server_config in servers.items():
+                if server_config.get('disabled', False):
+                    continue
+                cache_keys[server_name] = self.cache.make_key(server_config)
+                if server_name in self.refresh:
+                    continue
+                entry = self.cache.get(cache_keys[server_name])
+                if entry is not None:
+                    logging.info(f"Using cached metadata for server '{server_name}'")
+                    cached[server_name] = dict(entry, name=server_name, cached=True)
+        
+        server_names = [server_name for server_name in servers if server_name not in cached]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        partial = {server_name: {} for server_name in server_names}
+        
+        async def probe(server_name: str) -> Dict[str, Any]:
+            async with semaphore:
+                logging.info(f"Extracting metadata from server '{server_name}'")
+                return await self.extract_server_metadata(server_name, partial[server_name])
+        
+        tasks = [asyncio.ensure_future(probe(server_name)) for server_name in server_names]
+        pending = set()
+        if tasks:
+            timeout = self.budget if deadline is None or self.budget is None \
+                else max(0.0, deadline - time.monotonic())
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            if pending:
+                self._budget_expired = True
+            for task in pending:
+                task.cancel()
+            if pending:
+                logging.warning(f"Time budget of {self.budget}s exhausted, "
+                                f"cancelling {len(pending)} unfinished server probe(s)")
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        results = {}
+        for server_name, task in zip(server_names, tasks):
+            if task in pending:
+                message = f"time budget of {self.budget}s exhausted"
+                if partial[server_name].get("status"):
+                    self._mark_timeout(partial[server_name], message)
+                    outcome = partial[server_name]
+                else:
+                    outcome = self._error_metadata(server_name, message, status="timeout")
+            elif task.exception() is not None:
+                error = task.exception()
+                if not isinstance(error, Exception):
+                    # Propagate interpreter shutdown and similar signals
+                    raise error
+                logging.error(f"Error extracting metadata from server '{server_name}': {describe_error(error)}")
+                outcome = self._error_metadata(server_name, error)
+            else:
+                outcome = task.result()
+                if server_name in cache_keys and self.stream is None and outcome.get("status") == "connected" \
+                        and "tools_error" not in outcome and "resources_error" not in outcome:
+                    self.cache.put(cache_keys[server_name], outcome)
+            results[server_name] = outcome
+        
+        if self.cache is not None:
+            self.cache.save()
+        
+        # Keep the order of the settings file
+        results.update(cached)
+        results = {server_name: results[server_name] for server_name in servers}
+        if self.stream is not None:
+            for server_name, server_data in results.items():
+                self.stream.finish_server(server_name, server_data)
+        return results
+    
+    async def collect_metadata(self, use_daemon: bool = True, socket_path: Optional[str] = None,
+                               no_cache: bool = False) -> Dict[str, Any]:
+        """
+        Collect metadata for all servers in the settings file.
+        
+        This is the entry point for code that embeds the extractor in its own
+        process, such as insert_variables.py. A running probe daemon is queried
+        first; if none answers, the servers are probed in this process with
+        ``extract_all_metadata``. Both share one time budget, so the fallback only
+        gets what the daemon query left of it.
+        
+        Args:
+            use_daemon (bool): Whether to query a running probe daemon first
+            socket_path (str, optional): Path of the daemon socket (default: per-user runtime path)
+            no_cache (bool): Whether the daemon should list every server again
+                instead of answering from its warm listings
+        
+        Returns:
+            Dict[str, Any]: A dictionary mapping server names to their metadata
+        """
+        deadline = time.monotonic() + self.budget if self.budget is not None else None
+        if use_daemon and self.stream is None:
+            socket_path = socket_path or get_daemon_socket_path()
+            response = await query_daemon(
+                socket_path,
+                {"command": "metadata", "settings": os.path.abspath(self.settings_path),
+                 "refresh": sorted(self.refresh), "no_cache": no_cache,
+                 "connect_timeout": self.connect_timeout,
+                 "list_tools_timeout": self.list_tools_timeout,
+                 "list_resources_timeout": self.list_resources_timeout},
+                timeout=self.budget
+            )
+            if response is not None:
+                logging.info(f"Using metadata from probe daemon at {socket_path}")
+                return response["servers"]
+        return await self.extract_all_metadata(deadline)
+    
+    def _error_metadata(self, server_name: str, error: Any, status: str = "error") -> Dict[str, Any]:
+        """
+        Build the metadata entry for a server whose probe did not complete.
+        
+        Args:
+            server_name (str): The name of the MCP server
+            error (Any): The exception or message describing the failure
+            status (str): Status to record, ``error`` or ``timeout``
+            
+        Returns:
+            Dict[str, Any]: A metadata dictionary with the given status
+        """
+        server_config = self.settings.get('mcpServers', {}).get(server_name, {})
+        return {
+            "name": server_name,
+            "command": server_config.get('command'),
+            "args": server_config.get('args', []),
+            "status": status,
+            "tools": [],
+            "resources": [],
+            "error": error if isinstance(error, str) else describe_error(error)
+        }
+    
+    def format_markdown(self, metadata: Dict[str, Any]) -> str:
+        """
+        Format the metadata as Markdown.
+        
+        This function takes the metadata dictionary and formats it as a Markdown string
+        with sections for each server, its tools, and resources. In compact mode the
+        sections are preceded by a block of schema definitions shared between tools.
+        
+        When a token budget is set, content is kept in priority order: server
+        sections first (prioritized servers, then settings order), then tool names
+        and descriptions, then full input schemas. A closing note lists what was
+        elided.
+        
+        Args:
+            metadata (Dict[str, Any]): The metadata dictionary to format
+        
+        Returns:
+            str: The formatted Markdown string
+        """
+        if self.max_tokens is None:
+            return self._render_markdown(metadata)
+        return self._render_markdown_within_budget(metadata)
+    
+    def _render_markdown(self, metadata: Dict[str, Any]) -> str:
+        """Render metadata as Markdown without applying the token budget."""
+        output = []
+        
+        if self.compact:
+            metadata, definitions = self._share_schemas(metadata)
+            output.extend(self._markdown_definition_lines(definitions))
+        
+        for server_name, server_data in metadata.items():
+            output.extend(self._markdown_server_lines(server_name, server_data))
+        
+        return "\n".join(output)
+    
+    def _render_markdown_within_budget(self, metadata: Dict[str, Any]) -> str:
+        """
+        Render metadata as Markdown, eliding content that does not fit ``max_tokens``.
+        
+        Each phase adds content in priority order and stops at the first item
+        that does not fit, so lower-priority content never displaces higher.
+        The rendered result is checked against the budget at the end because
+        shared schema definitions are only known after rendering; if it is over,
+        schemas, then tools, then whole servers are dropped from the lowest
+        priority end until it fits. A budget too small even for an empty listing
+        is reported with the size of the overshoot.
+        
+        Args:
+            metadata (Dict[str, Any]): The metadata dictionary to format
+        
+        Returns:
+            str: The formatted Markdown string, ending with an elision note if needed
+        """
+        def cost(lines):
+            return estimate_tokens("\n".join(lines)) + len(lines)
+        
+        ordered = [name for name in self.priority if name in metadata]
+        ordered += [name for name in metadata if name not in ordered]
+        ordered = [name for name in ordered if metadata[name].get("status") != "disabled"]
+        
+        # Keep room for the elision note
+        remaining = self.max_tokens - estimate_tokens(self._elision_note(ordered, len(ordered), len(ordered)))
+        
+        # Phase 1: server sections without tools
+        kept_servers = []
+        for server_name in ordered:
+            section = self._markdown_server_lines(server_name, dict(metadata[server_name], tools=[]))
+            if cost(section) > remaining:
+                break
+            remaining -= cost(section)
+            kept_servers.append(server_name)
+        
+        # Phase 2: tool names and descriptions
+        kept_tools = {server_name: [] for server_name in kept_servers}
+        phase_open = True
+        for server_name in kept_servers:
+            for tool in metadata[server_name].get("tools") or []:
+                lines = self._markdown_tool_lines(dict(tool, inputSchema=None))
+                if not phase_open or cost(lines) > remaining:
+                    phase_open = False
+                    break
+                remaining -= cost(lines)
+                kept_tools[server_name].append(dict(tool, inputSchema=None))
+        
+        # Phase 3: full input schemas
+        with_schema = []
+        phase_open = True
+        for server_name in kept_servers:
+            for index, tool in enumerate(metadata[server_name].get("tools") or []):
+                if index >= len(kept_tools[server_name]):
+                    break
+                if not tool.get("inputSchema"):
+                    continue
+                extra = cost(self._markdown_tool_lines(tool)) - cost(self._markdown_tool_lines(kept_tools[server_name][index]))
+                if not phase_open or extra > remaining:
+                    phase_open = False
+                    break
+                remaining -= extra
+                kept_tools[server_name][index] = tool
+                with_schema.append((server_name, index))
+        
+        def render():
+            trimmed = {
+                server_name: dict(metadata[server_name], tools=kept_tools[server_name])
+                for server_name in kept_servers
+            }
+            text = self._render_markdown(trimmed)
+            elided_tools = sum(len(metadata[name].get("tools") or []) - len(kept_tools[name]) for name in kept_servers)
+            elided_tools += sum(len(metadata[name].get("tools") or []) for name in ordered if name not in kept_servers)
+            total_schemas = sum(1 for name in ordered for tool in metadata[name].get("tools") or [] if tool.get("inputSchema"))
+            note = self._elision_note([name for name in ordered if name not in kept_servers],
+                                      elided_tools, total_schemas - len(with_schema))
+            return (f"{text}\n{note}" if note else text), note
+        
+        # Shared definitions and rounding can push the total over budget: drop
+        # the lowest-priority schemas, then tools, then servers until it fits
+        output, note = render()
+        while estimate_tokens(output) > self.max_tokens:
+            with_tools = [server_name for server_name in kept_servers if kept_tools[server_name]]
+            if with_schema:
+                server_name, index = with_schema.pop()
+                kept_tools[server_name][index] = dict(kept_tools[server_name][index], inputSchema=None)
+            elif with_tools:
+                kept_tools[with_tools[-1]].pop()
+            elif kept_servers:
+                del kept_tools[kept_servers.pop()]
+            else:
+                break
+            output, note = render()
+        if note:
+            logging.warning(note.strip("_"))
+        overshoot = estimate_tokens(output) - self.max_tokens
+        if overshoot > 0:
+            logging.warning(f"Markdown output exceeds the {self.max_tokens}-token budget by about "
+                            f"{overshoot} tokens even with every server elided")
+        return output
+    
+    def _elision_note(self, elided_servers: List[str], elided_tools: int, elided_schemas: int) -> str:
+        """
+        Describe what the token budget left out of the Markdown output.
+        
+        Args:
+            elided_servers (List[str]): Names of servers omitted entirely
+            elided_tools (int): Number of tools omitted
+            elided_schemas (int): Number of input schemas omitted
+        
+        Returns:
+            str: A note for the end of the output, or an empty string if nothing was elided
+        """
+        parts = []
+        if elided_servers:
+            parts.append(f"{len(elided_servers)} server(s) ({', '.join(elided_servers)})")
+        if elided_tools:
+            parts.append(f"{elided_tools} tool(s)")
+        if elided_schemas:
+            parts.append(f"{elided_schemas} input schema(s)")
+        if not parts:
+            return ""
+        return f"_Elided to fit the {self.max_tokens}-token budget: {', '.join(parts)}._"
+    
+    def _markdown_server_lines(self, server_name: str, server_data: Dict[str, Any]) -> List[str]:
+        """
+        Render one server's complete Markdown section as a list of lines.
+        
+        Args:
+            server_name (str): The name of the MCP server
+            server_data (Dict[str, Any]): The server's metadata
+        
+        Returns:
+            List[str]: The section's lines; empty for disabled servers
+        """
+        # Skip disabled servers
+        if server_data.get("status") == "disabled":
+            return []
+        
+        output = self._markdown_header_lines(server_name, server_data)
+        
+        # Error handling
+        if server_data.get("status") == "error":
+            output.append(f"**ERROR**: {server_data.get('error')}\n")
+            return output
+        
+        # Timed out servers keep whatever was retrieved before the deadline
+        if server_data.get("status") == "timeout":
+            output.append(f"**TIMEOUT**: {server_data.get('error')}\n")
+        
+        # Tools section
+        if server_data.get("tools"):
+            output.append("### Available Tools")
+            for tool in server_data["tools"]:
+                output.extend(self._markdown_tool_lines(tool))
+        else:
+            output.extend(self._markdown_no_tools_lines(server_data))
+        
+        # Resources section
+        if server_data.get("resources"):
+            output.append("### Direct Resources")
+            for resource in server_data["resources"]:
+                output.extend(self._markdown_resource_lines(resource))
+            output.append("")
+        else:
+            output.extend(self._markdown_no_resources_lines(server_data))
+        
+        return output
+    
+    def _markdown_header_lines(self, server_name: str, server_data: Dict[str, Any]) -> List[str]:
+        """Render the heading line of a server section."""
+        # Format command string
+        command_str = f"{server_data['command']} {' '.join(server_data['args'])}"
+        return [f"## {server_name} (`{command_str}`)\n"]
+    
+    def _markdown_tool_lines(self, tool: Dict[str, Any]) -> List[str]:
+        """Render one tool entry, followed by an empty line."""
+        output = [f"- {tool['name']}: {tool.get('description', 'No description')}"]
+        
+        if tool.get("inputSchema") and self.compact:
+            schema_json = json.dumps(self._strip_schema(tool["inputSchema"]), separators=(',', ':'))
+            output.append(f"    Input Schema: {schema_json}")
+        # Format input schema with proper indentation
+        elif tool.get("inputSchema"):
+            output.append("    Input Schema:")
+            schema_json = json.dumps(tool["inputSchema"], indent=2)
+            # Add tab indentation to each line
+            indented_schema = "\t\t" + schema_json.replace("\n", "\n\t\t")
+            output.append(indented_schema)
+        output.append("")  # Empty line after each tool
+        return output
+    
+    def _markdown_definition_lines(self, definitions: Dict[str, Any]) -> List[str]:
+        """Render the block of schema definitions shared between tools."""
+        if not definitions:
+            return []
+        output = [
+            "## Shared Schema Definitions\n",
+            'Tool input schemas refer to these definitions as {"$ref":"<id>"}.',
+            ""
+        ]
+        for definition_id, schema in definitions.items():
+            output.append(f"- {definition_id}: {json.dumps(schema, separators=(',', ':'))}")
+        output.append("")
+        return output
+    
+    @staticmethod
+    def _map_subschemas(schema: Dict[str, Any], transform) -> Dict[str, Any]:
+        """
+        Return a copy of a JSON schema with ``transform`` applied to each direct sub-schema.
+        
+        Only values in sub-schema positions (``properties`` entries, ``items``,
+        ``anyOf`` members and so on) are transformed; property names and other
+        keywords are copied unchanged.
+        """
+        result = {}
+        for key, value in schema.items():
+            if key in SCHEMA_MAP_KEYWORDS and isinstance(value, dict):
+                result[key] = {name: transform(subschema) for name, subschema in value.items()}
+            elif key in SCHEMA_LIST_KEYWORDS and isinstance(value, list):
+                result[key] = [transform(subschema) for subschema in value]
+            elif key in SCHEMA_KEYWORDS and isinstance(value, dict):
+                result[key] = transform(value)
+            else:
+                result[key] = value
+        return result
+    
+    def _strip_schema(self, schema: Any) -> Any:
+        """Drop boilerplate keys and keys holding their default value, recursively."""
+        if not isinstance(schema, dict):
+            return schema
+        stripped = {
+            key: value for key, value in schema.items()
+            if key not in SCHEMA_BOILERPLATE_KEYS
+            and not (key in SCHEMA_DEFAULT_VALUES and value == SCHEMA_DEFAULT_VALUES[key])
+        }
+        return self._map_subschemas(stripped, self._strip_schema)
+    
+    def _share_schemas(self, metadata: Dict[str, Any]):
+        """
+        Hoist sub-schemas that occur more than once across all tools.
+        
+        Schemas are first stripped of boilerplate. Every sub-schema of at least
+        ``MIN_SHARED_SCHEMA_CHARS`` serialized characters that appears two or more
+        times is replaced by ``{"$ref": "#S<n>"}``, outermost occurrences first.
+        Definitions that end up referenced only once are inlined again.
+        
+        Args:
+            metadata (Dict[str, Any]): The metadata dictionary to format
+        
+        Returns:
+            tuple: A copy of ``metadata`` with rewritten input schemas, and the
+                shared definitions keyed by id
+        """
+        def canonical(schema):
+            return json.dumps(schema, sort_keys=True, separators=(',', ':'))
+        
+        # Count every sub-schema across all tools
+        counts = {}
+        
+        def count(schema):
+            if isinstance(schema, dict):
+                key = canonical(schema)
+                if len(key) >= MIN_SHARED_SCHEMA_CHARS:
+                    counts[key] = counts.get(key, 0) + 1
+                self._map_subschemas(schema, count)
+            return schema
+        
+        stripped = {}
+        for server_name, server_data in metadata.items():
+            stripped[server_name] = [
+                self._strip_schema(tool.get("inputSchema")) for tool in server_data.get("tools") or []
+            ]
+            for schema in stripped[server_name]:
+                count(schema)
+        
+        # Replace repeated sub-schemas with references to provisional ids
+        provisional, bodies, uses = {}, {}, {}
+        
+        def share(schema):
+            if not isinstance(schema, dict):
+                return schema
+            key = canonical(schema)
+            if counts.get(key, 0) < 2:
+                return self._map_subschemas(schema, share)
+            if key not in provisional:
+                provisional[key] = len(provisional)
+                bodies[provisional[key]] = self._map_subschemas(schema, share)
+            uses[provisional[key]] = uses.get(provisional[key], 0) + 1
+            return {"$ref": provisional[key]}
+        
+        shared = {
+            server_name: [share(schema) for schema in schemas]
+            for server_name, schemas in stripped.items()
+        }
+        
+        # Inline definitions used once and number the rest in order of appearance
+        final_ids = {}
+        for provisional_id in sorted(bodies):
+            if uses[provisional_id] > 1:
+                final_ids[provisional_id] = f"#S{len(final_ids) + 1}"
+        
+        def resolve(schema):
+            if not isinstance(schema, dict):
+                return schema
+            if set(schema) == {"$ref"} and isinstance(schema["$ref"], int):
+                provisional_id = schema["$ref"]
+                if provisional_id in final_ids:
+                    return {"$ref": final_ids[provisional_id]}
+                return resolve(bodies[provisional_id])
+            return self._map_subschemas(schema, resolve)
+        
+        definitions = {
+            final_ids[provisional_id]: resolve(bodies[provisional_id])
+            for provisional_id in final_ids
+        }
+        
+        rewritten = {}
+        for server_name, server_data in metadata.items():
+            if not server_data.get("tools"):
+                rewritten[server_name] = server_data
+                continue
+            rewritten[server_name] = dict(server_data, tools=[
+                dict(tool, inputSchema=resolve(schema))
+                for tool, schema in zip(server_data["tools"], shared[server_name])
+            ])
+        return rewritten, definitions
+    
+    def _markdown_no_tools_lines(self, server_data: Dict[str, Any]) -> List[str]:
+        """Render the tools section of a server that returned no tools."""
+        if "tools_error" in server_data:
+            return [f"**ERROR RETRIEVING TOOLS**: {server_data['tools_error']}\n"]
+        return ["### No tools available\n"]
+    
+    def _markdown_resource_lines(self, resource: Dict[str, Any]) -> List[str]:
+        """Render one resource entry."""
+        uri = resource.get("uriTemplate", "No URI")
+        desc = resource.get("description", "undefined")
+        return [f"- {uri} ({desc}): undefined"]
+    
+    def _markdown_no_resources_lines(self, server_data: Dict[str, Any]) -> List[str]:
+        """Render the resources section of a server that returned no resources."""
+        if "resources_error" in server_data:
+            return [f"**ERROR RETRIEVING RESOURCES**: {server_data['resources_error']}\n"]
+        return ["### No direct resources available\n"]
+
+    def format_json(self, metadata: Dict[str, Any]) -> str:
+        """
+        Format the metadata as JSON.
+        
+        This function takes the metadata dictionary and formats it as a JSON string.
+        
+        Args:
+            metadata (Dict[str, Any]): The metadata dictionary to format
+            
+        Returns:
+            str: The formatted JSON string with indentation for readability
+        """
+        return json.dumps(metadata, indent=2)
+    
+    def format_profile(self, metadata: Dict[str, Any]) -> str:
+        """
+        Format per-phase probe timings as a plain-text table, slowest server first.
+        
+        Servers served from the cache or a warm daemon session were not probed by
+        this run and are listed after the others, as are servers with no timings
+        (disabled, or failed before starting).
+        
+        Args:
+            metadata (Dict[str, Any]): The metadata dictionary to profile
+        
+        Returns:
+            str: The formatted table
+        """
+        def sort_key(server_data):
+            probed = bool(server_data.get("timings")) and not server_data.get("cached")
+            return (not probed, -server_data.get("timings", {}).get("total", 0.0))
+        
+        def seconds(timings, phase):
+            return f"{timings[phase]:.3f}" if phase in timings else "-"
+        
+        header = ["server", "status"] + list(TIMING_PHASES) + ["tools", "resources", "bytes"]
+        rows = []
+        for server_data in sorted(metadata.values(), key=sort_key):
+            timings = server_data.get("timings", {})
+            payload = server_data.get("payload", {})
+            status = server_data.get("status", "unknown")
+            if server_data.get("cached"):
+                status += " (cached)"
+            rows.append([server_data.get("name", ""), status]
+                        + [seconds(timings, phase) for phase in TIMING_PHASES]
+                        + [str(payload.get("tools", 0)), str(payload.get("resources", 0)),
+                           str(payload.get("tools_bytes", 0) + payload.get("resources_bytes", 0))])
+        
+        widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+        lines = []
+        for row in [header] + rows:
+            cells = [cell.ljust(width) if i < 2 else cell.rjust(width)
+                     for i, (cell, width) in enumerate(zip(row, widths))]
+            lines.append("  ".join(cells).rstrip())
+        return "\n".join(lines)
+
+
+class _ServerSpool:
+    """
+    Temporary file holding one server's Markdown section while it is probed.
+    
+    Pages of tools and resources are rendered and written as they arrive, so
+    memory use does not grow with the size of the server's catalog.
+    """
+    
+    def __init__(self, extractor: MCPMetadataExtractor, server_name: str, metadata: Dict[str, Any]):
+        self.extractor = extractor
+        self.file = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self.tool_count = 0
+        self.resource_count = 0
+        self.listed = False
+        self._write(extractor._markdown_header_lines(server_name, metadata))
+    
+    def _write(self, lines: List[str]) -> None:
+        for line in lines:
+            self.file.write(line)
+            self.file.write("\n")
+    
+    def add_tools(self, tools: List[Dict[str, Any]]) -> None:
+        """Write a page of tools."""
+        if tools and not self.tool_count:
+            self._write(["### Available Tools"])
+        for tool in tools:
+            self._write(self.extractor._markdown_tool_lines(tool))
+        self.tool_count += len(tools)
+    
+    def tools_done(self, metadata: Dict[str, Any]) -> None:
+        """Close the tools section once every page has been listed."""
+        self.listed = True
+        if not self.tool_count:
+            self._write(self.extractor._markdown_no_tools_lines(metadata))
+    
+    def add_resources(self, resources: List[Dict[str, Any]]) -> None:
+        """Write a page of resources."""
+        if resources and not self.resource_count:
+            self._write(["### Direct Resources"])
+        for resource in resources:
+            self._write(self.extractor._markdown_resource_lines(resource))
+        self.resource_count += len(resources)
+    
+    def resources_done(self, metadata: Dict[str, Any]) -> None:
+        """Close the resources section once every page has been listed."""
+        if self.resource_count:
+            self._write([""])
+        else:
+            self._write(self.extractor._markdown_no_resources_lines(metadata))
+    
+    def finish(self, metadata: Dict[str, Any]) -> None:
+        """Append notes about errors or timeouts that ended the probe early."""
+        if metadata.get("status") == "error":
+            self._write([f"**ERROR**: {metadata.get('error')}\n"])
+        elif metadata.get("status") == "timeout":
+            self._write([f"**TIMEOUT**: {metadata.get('error')}\n"])
+
+
+class MarkdownStreamWriter:
+    """
+    Writes the Markdown rendering of server metadata to a file incrementally.
+    
+    While servers are probed, each one's section is streamed page by page into
+    its own temporary spool file. ``finish_server`` then appends the sections to
+    the output in settings order, and ``close`` atomically moves the output into
+    place. Servers that were not probed live (cached entries, daemon results,
+    failures) are rendered from their metadata as usual.
+    
+    Attributes:
+        output_path (str): Path of the Markdown file to write
+    """
+    
+    def __init__(self, extractor: MCPMetadataExtractor, output_path: str):
+        """
+        Initialize the writer and open a temporary output file next to ``output_path``.
+        
+        Args:
+            extractor (MCPMetadataExtractor): Extractor whose Markdown rendering is used
+            output_path (str): Path of the Markdown file to write
+        """
+        self.extractor = extractor
+        self.output_path = output_path
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        fd, self._temp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+        self._output = os.fdopen(fd, 'w', encoding='utf-8')
+        self._spools = {}
+    
+    def open_server(self, server_name: str, metadata: Dict[str, Any]) -> _ServerSpool:
+        """
+        Start spooling the section of a server that is about to be listed.
+        
+        Args:
+            server_name (str): The name of the MCP server
+            metadata (Dict[str, Any]): The server's metadata so far
+        
+        Returns:
+            _ServerSpool: The spool receiving the server's pages
+        """
+        spool = _ServerSpool(self.extractor, server_name, metadata)
+        self._spools[server_name] = spool
+        return spool
+    
+    def finish_server(self, server_name: str, metadata: Dict[str, Any]) -> None:
+        """
+        Append a server's section to the output.
+        
+        Args:
+            server_name (str): The name of the MCP server
+            metadata (Dict[str, Any]): The server's final metadata
+        """
+        spool = self._spools.pop(server_name, None)
+        if spool is None:
+            for line in self.extractor._markdown_server_lines(server_name, metadata):
+                self._output.write(line)
+                self._output.write("\n")
+            return
+        
+        spool.finish(metadata)
+        spool.file.seek(0)
+        shutil.copyfileobj(spool.file, self._output)
+        spool.file.close()
+    
+    def close(self, commit: bool = True) -> None:
+        """
+        Close the output, moving it into place or discarding it.
+        
+        Args:
+            commit (bool): Whether to replace ``output_path`` with the written output
+        """
+        for spool in self._spools.values():
+            spool.file.close()
+        self._spools.clear()
+        self._output.close()
+        if commit:
+            os.replace(self._temp_path, self.output_path)
+        else:
+            os.unlink(self._temp_path)
+
+
+class _WarmSession:
+    """
+    An initialized MCP client session kept open by the probe daemon.
+    
+    The stdio transport and client session are entered and exited inside a
+    dedicated task, as required by the underlying anyio context managers, while
+    other tasks issue requests through ``session``.
+    
+    Attributes:
+        server_name (str): Name of the server the session was started for
+        session (ClientSession): The initialized session, or None once closed
+        metadata (dict): Last successful listing of the server's tools and resources
+        timings (dict): Seconds spent spawning and initializing the server
+        last_used (float): Monotonic time of the last request served by the session
+    """
+    
+    def __init__(self, server_name: str):
+        self.server_name = server_name
+        self.session = None
+        self.metadata = None
+        self.timings = {}
+        self.last_used = time.monotonic()
+        self._task = None
+        self._closing = asyncio.Event()
+    
+    async def start(self, extractor: MCPMetadataExtractor, server_config: Dict[str, Any]) -> None:
+        """
+        Spawn the server and initialize the session.
+        
+        Args:
+            extractor (MCPMetadataExtractor): Supplies launch parameters and the connect deadline
+            server_config (Dict[str, Any]): The server entry from the MCP settings
+        
+        Raises:
+            asyncio.TimeoutError: If initialization exceeds the connect deadline
+            Exception: If the server cannot be started or initialized
+        """
+        from mcp import ClientSession
+        from mcp.client.stdio import stdio_client
+        
+        server_params = extractor._server_params(server_config)
+        ready = asyncio.get_running_loop().create_future()
+        
+        async def run():
+            started = time.perf_counter()
+            try:
+                async with stdio_client(server_params) as (read, write):
+                    self.timings["spawn"] = round(time.perf_counter() - started, 4)
+                    async with ClientSession(read, write) as session:
+                        phase_started = time.perf_counter()
+                        await session.initialize()
+                        self.timings["initialize"] = round(time.perf_counter() - phase_started, 4)
+                        self.session = session
+                        ready.set_result(None)
+                        await self._closing.wait()
+            except Exception as e:
+                if not ready.done():
+                    ready.set_exception(e)
+                else:
+                    logging.warning(f"Session for server '{self.server_name}' ended: {e}")
+            finally:
+                self.session = None
+        
+        self._task = asyncio.ensure_future(run())
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), extractor.connect_timeout)
+        except BaseException:
+            await self.close()
+            raise
+    
+    async def close(self) -> None:
+        """Close the session and wait for the server process to exit."""
+        self._closing.set()
+        if self._task is None or self._task.done():
+            return
+        if self.session is None:
+            # Still initializing: nothing to shut down gracefully
+            self._task.cancel()
+        try:
+            await asyncio.wait_for(self._task, DAEMON_CLOSE_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+
+
+class ProbeDaemon:
+    """
+    A long-lived process that serves MCP metadata from warm server sessions.
+    
+    The daemon listens on a Unix socket for newline-terminated JSON requests and
+    answers each with a single JSON document before closing the connection.
+    Sessions are keyed by server definition, so a changed ``command``, ``args``
+    or ``env`` starts a fresh session, and sessions unused for ``idle_timeout``
+    seconds are shut down. Deadlines given in a request override the daemon's
+    own for that request, and ``no_cache`` lists every server again.
+    
+    Supported requests:
+        {"command": "metadata", "settings": PATH, "refresh": [SERVER, ...], "no_cache": BOOL,
+         "connect_timeout": SECONDS, "list_tools_timeout": SECONDS, "list_resources_timeout": SECONDS}
+        {"command": "status"}
+        {"command": "shutdown"}
+    
+    Attributes:
+        socket_path (str): Path of the Unix socket to listen on
+        idle_timeout (float): Seconds after which an unused session is closed
+    """
+    
+    def __init__(self, socket_path: Optional[str] = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 list_tools_timeout: float = DEFAULT_LIST_TOOLS_TIMEOUT,
+                 list_resources_timeout: float = DEFAULT_LIST_RESOURCES_TIMEOUT):
+        """
+        Initialize the daemon.
+        
+        Args:
+            socket_path (str, optional): Path of the Unix socket (default: per-user runtime path)
+            idle_timeout (float): Seconds after which an unused session is closed
+            concurrency (int): Maximum number of servers started or listed at the same time
+            connect_timeout (float): Deadline in seconds for spawning and initializing a server
+            list_tools_timeout (float): Deadline in seconds for the list_tools request
+            list_resources_timeout (float): Deadline in seconds for the list_resources request
+        """
+        self.socket_path = socket_path or get_daemon_socket_path()
+        self.idle_timeout = idle_timeout
+        self.concurrency = max(1, concurrency)
+        self.connect_timeout = connect_timeout
+        self.list_tools_timeout = list_tools_timeout
+        self.list_resources_timeout = list_resources_timeout
+        self._sessions = {}
+        self._locks = {}
+        self._stopped = None
+    
+    async def serve(self) -> None:
+        """
+        Listen on the socket until a shutdown request or SIGTERM is received.
+        
+        Raises:
+            RuntimeError: If Unix sockets are unavailable, another daemon is running,
+                or the socket path belongs to another user
+        """
+        if not hasattr(asyncio, 'start_unix_server'):
+            raise RuntimeError("Daemon mode requires Unix domain sockets, which are not available on this platform")
+        
+        socket_dir = os.path.dirname(os.path.abspath(self.socket_path))
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+        if not _owned_by_current_user(socket_dir) and not os.stat(socket_dir).st_mode & stat.S_ISVTX:
+            # Another user could replace the socket in a directory they own
+            raise RuntimeError(f"Socket directory {socket_dir} belongs to another user")
+        
+        if await query_daemon(self.socket_path, {"command": "status"}, timeout=1.0, quiet=True) is not None:
+            raise RuntimeError(f"A probe daemon is already listening on {self.socket_path}")
+        if os.path.lexists(self.socket_path):
+            # Left behind by a daemon that did not shut down cleanly
+            if not _owned_by_current_user(self.socket_path):
+                raise RuntimeError(f"{self.socket_path} belongs to another user")
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+            except PermissionError as e:
+                raise RuntimeError(f"Cannot remove stale socket {self.socket_path}: {e}")
+
+        self._stopped = asyncio.Event()
+        try:
+            import signal
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self._stopped.set)
+        except (ImportError, NotImplementedError, RuntimeError):
+            pass
+        
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        logging.info(f"Probe daemon listening on {self.socket_path}")
+        reaper = asyncio.ensure_future(self._reap_idle_sessions())
+        try:
+            async with server:
+                await self._stopped.wait()
+        finally:
+            reaper.cancel()
+            await asyncio.gather(*(handle.close() for handle in self._sessions.values()),
+                                 return_exceptions=True)
+            self._sessions.clear()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+            logging.info("Probe daemon stopped")
+    
+    async def _handle_client(self, reader, writer) -> None:
+        """Read one request from a client connection and write the response."""
+        try:
+            request = json.loads(await reader.readline())
+            response = await self._dispatch(request)
+        except Exception as e:
+            logging.error(f"Error handling daemon request: {e}")
+            response = {"error": str(e)}
+        try:
+            writer.write(json.dumps(response).encode('utf-8') + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+    
+    async def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute a decoded request.
+        
+        Args:
+            request (Dict[str, Any]): The request sent by the client
+        
+        Returns:
+            Dict[str, Any]: The response to send back
+        
+        Raises:
+            ValueError: If the command is unknown
+        """
+        command = request.get("command")
+        if command == "metadata":
+            servers = await self.metadata(
+                request["settings"], request.get("refresh", []),
+                no_cache=request.get("no_cache", False),
+                connect_timeout=request.get("connect_timeout"),
+                list_tools_timeout=request.get("list_tools_timeout"),
+                list_resources_timeout=request.get("list_resources_timeout")
+            )
+            return {"servers": servers}
+        if command == "status":
+            now = time.monotonic()
+            return {"sessions": {
+                handle.server_name: {"idle_seconds": round(now - handle.last_used, 1)}
+                for handle in self._sessions.values()
+            }}
+        if command == "shutdown":
+            self._stopped.set()
+            return {"ok": True}
+        raise ValueError(f"Unknown command: {command}")
+    
+    async def metadata(self, settings_path: str, refresh: List[str], no_cache: bool = False,
+                       connect_timeout: Optional[float] = None,
+                       list_tools_timeout: Optional[float] = None,
+                       list_resources_timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Return metadata for every server in a settings file, reusing warm sessions.
+        
+        Args:
+            settings_path (str): Path to the MCP settings file
+            refresh (List[str]): Names of servers whose tools and resources are
+                listed again even if the session already has a listing
+            no_cache (bool): Whether to list every server again
+            connect_timeout (float, optional): Connect deadline for this request
+                (default: the daemon's)
+            list_tools_timeout (float, optional): list_tools deadline for this request
+                (default: the daemon's)
+            list_resources_timeout (float, optional): list_resources deadline for this
+                request (default: the daemon's)
+
+        Returns:
+            Dict[str, Any]: A dictionary mapping server names to their metadata,
+                in the order of the settings file
+        """
+        extractor = MCPMetadataExtractor(
+            settings_path,
+            concurrency=self.concurrency,
+            connect_timeout=connect_timeout or self.connect_timeout,
+            list_tools_timeout=list_tools_timeout or self.list_tools_timeout,
+            list_resources_timeout=list_resources_timeout or self.list_resources_timeout
+        )
+        server_names = list(extractor.settings.get('mcpServers', {}))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def probe(server_name: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._server_metadata(extractor, server_name, no_cache or server_name in refresh)
+        
+        outcomes = await asyncio.gather(*(probe(server_name) for server_name in server_names),
+                                        return_exceptions=True)
+        results = {}
+        for server_name, outcome in zip(server_names, outcomes):
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, Exception):
+                    raise outcome
+                logging.error(f"Error extracting metadata from server '{server_name}': {outcome}")
+                outcome = extractor._error_metadata(server_name, outcome)
+            results[server_name] = outcome
+        return results
+    
+    async def _server_metadata(self, extractor: MCPMetadataExtractor, server_name: str,
+                               refresh: bool) -> Dict[str, Any]:
+        """
+        Return one server's metadata from its warm session, starting it if needed.
+        
+        Args:
+            extractor (MCPMetadataExtractor): Extractor holding the request's settings
+            server_name (str): The name of the MCP server
+            refresh (bool): Whether to list tools and resources again
+        
+        Returns:
+            Dict[str, Any]: The server's metadata
+        """
+        server_config = extractor.settings['mcpServers'][server_name]
+        if server_config.get('disabled', False):
+            return {"name": server_name, "status": "disabled"}
+        
+        key = MetadataCache.make_key(server_config)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            started = time.perf_counter()
+            handle = self._sessions.get(key)
+            if handle is not None and handle.session is None:
+                # The server exited since the last request
+                await handle.close()
+                del self._sessions[key]
+                handle = None
+            
+            timings = {}
+            if handle is None:
+                handle = _WarmSession(server_name)
+                timings = handle.timings
+                try:
+                    logging.info(f"Starting warm session for server '{server_name}'")
+                    await handle.start(extractor, server_config)
+                except asyncio.TimeoutError:
+                    return extractor._error_metadata(
+                        server_name, f"initialize did not complete within {extractor.connect_timeout}s",
+                        status="timeout")
+                self._sessions[key] = handle
+            
+            handle.last_used = time.monotonic()
+            if handle.metadata is not None and not refresh:
+                return dict(handle.metadata, name=server_name, cached=True)
+            
+            server_params = extractor._server_params(server_config)
+            metadata = {
+                "name": server_name,
+                "command": server_params.command,
+                "args": server_params.args,
+                "status": "connected",
+                "timings": dict(timings),
+                "payload": extractor._empty_payload(),
+                "tools": [],
+                "resources": []
+            }
+            await extractor._list_server_contents(handle.session, metadata)
+            metadata["timings"]["total"] = round(time.perf_counter() - started, 4)
+            if metadata["status"] == "connected" and "tools_error" not in metadata \
+                    and "resources_error" not in metadata:
+                handle.metadata = metadata
+            elif "tools_error" in metadata and "resources_error" in metadata:
+                # Neither request succeeded: start from a fresh process next time
+                await handle.close()
+                del self._sessions[key]
+            return metadata
+    
+    async def _reap_idle_sessions(self) -> None:
+        """Periodically close sessions that have not been used for ``idle_timeout`` seconds."""
+        interval = max(1.0, min(self.idle_timeout / 2, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for key, handle in list(self._sessions.items()):
+                if now - handle.last_used < self.idle_timeout or self._locks[key].locked():
+                    continue
+                logging.info(f"Closing idle session for server '{handle.server_name}'")
+                del self._sessions[key]
+                # Settings changes create new keys; drop the lock with its session
+                del self._locks[key]
+                await handle.close()
+
+
+async def query_daemon(socket_path: str, request: Dict[str, Any], timeout: Optional[float] = None,
+                       quiet: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Send a request to a running probe daemon.
+    
+    Args:
+        socket_path (str): Path of the daemon's Unix socket
+        request (Dict[str, Any]): The request to send
+        timeout (float, optional): Seconds to wait for the response
+        quiet (bool): Whether to suppress warnings when the daemon cannot be reached
+    
+    Returns:
+        Optional[Dict[str, Any]]: The daemon's response, or None if no daemon is
+            listening, the socket belongs to another user, or the request failed
+    """
+    if not hasattr(asyncio, 'open_unix_connection') or not os.path.exists(socket_path):
+        return None
+    if not _owned_by_current_user(socket_path):
+        # Anyone can create files in a shared directory; do not trust their answers
+        logging.warning(f"Ignoring probe daemon socket {socket_path}, which belongs to another user")
+        return None
+
+    try:
+        async def exchange():
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            try:
+                writer.write(json.dumps(request).encode('utf-8') + b"\n")
+                await writer.drain()
+                # Responses can exceed the stream's line limit, so read until EOF
+                return json.loads(await reader.read())
+            finally:
+                writer.close()
+        
+        response = await asyncio.wait_for(exchange(), timeout)
+    except (OSError, ValueError, asyncio.TimeoutError) as e:
+        if not quiet:
+            logging.warning(f"Could not query probe daemon at {socket_path}: {e}")
+        return None
+    
+    if "error" in response:
+        if not quiet:
+            logging.warning(f"Probe daemon returned an error: {response['error']}")
+        return None
+    return response
+
+
+async def main():
+    """
+    Main entry point for the script.
+    
+    This function parses command-line arguments, sets up logging, and runs the
+    metadata extraction process.
+    
+    Returns:
+        None
+        
+    Raises:
+        SystemExit: If there is an error during execution
+    """
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description='Extract metadata from MCP servers.')
+    parser.add_argument('--settings', help='Path to MCP settings file')
+    parser.add_argument('--output', default="mcp_metadata.md", help='Output file path')
+    parser.add_argument('--format', choices=['markdown', 'json'], default='markdown', help='Output format')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Maximum number of servers probed at the same time (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--connect-timeout', type=float, default=DEFAULT_CONNECT_TIMEOUT,
+                        help=f'Seconds allowed to spawn and initialize each server (default: {DEFAULT_CONNECT_TIMEOUT})')
+    parser.add_argument('--list-tools-timeout', type=float, default=DEFAULT_LIST_TOOLS_TIMEOUT,
+                        help=f'Seconds allowed for each list_tools request (default: {DEFAULT_LIST_TOOLS_TIMEOUT})')
+    parser.add_argument('--list-resources-timeout', type=float, default=DEFAULT_LIST_RESOURCES_TIMEOUT,
+                        help=f'Seconds allowed for each list_resources request (default: {DEFAULT_LIST_RESOURCES_TIMEOUT})')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help=f'Overall time budget in seconds for all servers, 0 to disable (default: {DEFAULT_BUDGET})')
+    parser.add_argument('--no-cache', action='store_true', help='Probe every server and do not read or write the metadata cache')
+    parser.add_argument('--refresh', action='append', default=[], metavar='SERVER',
+                        help='Re-probe SERVER even if it is cached (may be given multiple times)')
+    parser.add_argument('--cache-path', help='Path to the metadata cache file (default: platform-specific path)')
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_CACHE_TTL,
+                        help=f'Maximum age of cached metadata in seconds (default: {DEFAULT_CACHE_TTL})')
+    parser.add_argument('--compact', action='store_true',
+                        help='Render minified input schemas and hoist shared sub-schemas into one definitions block')
+    parser.add_argument('--max-tokens', type=int,
+                        help='Estimated token budget for the Markdown output; lower-priority content is elided')
+    parser.add_argument('--priority', action='append', default=[], metavar='SERVER',
+                        help='Keep SERVER first when the token budget is tight (may be given multiple times)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print a table of per-phase probe timings, slowest servers first, to stderr')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write Markdown output incrementally as pages arrive, keeping memory use flat')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Run as a probe daemon that keeps server sessions warm and serves metadata over a Unix socket')
+    parser.add_argument('--stop-daemon', action='store_true', help='Ask a running probe daemon to shut down')
+    parser.add_argument('--socket', default=get_daemon_socket_path(),
+                        help='Path of the probe daemon socket (default: per-user runtime path)')
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help=f'Seconds after which the daemon closes an unused server session (default: {DEFAULT_IDLE_TIMEOUT})')
+    parser.add_argument('--no-daemon', action='store_true', help='Do not query a running probe daemon')
+    parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
+    args = parser.parse_args()
+    
+    # Configure logging
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(level=log_level, format='%(levelname)s: %(message)s')
+    
+    if args.daemon:
+        daemon = ProbeDaemon(
+            args.socket,
+            idle_timeout=args.idle_timeout,
+            concurrency=args.concurrency,
+            connect_timeout=args.connect_timeout,
+            list_tools_timeout=args.list_tools_timeout,
+            list_resources_timeout=args.list_resources_timeout
+        )
+        try:
+            await daemon.serve()
+        except RuntimeError as e:
+            logging.error(f"Error: {e}")
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+    
+    if args.stream and args.format != 'markdown':
+        parser.error("--stream is only supported with --format markdown")
+    if args.stream and args.max_tokens:
+        parser.error("--stream cannot be combined with --max-tokens")
+    
+    if args.stop_daemon:
+        if await query_daemon(args.socket, {"command": "shutdown"}, timeout=DAEMON_CLOSE_TIMEOUT) is None:
+            print(f"No probe daemon is listening on {args.socket}")
+            sys.exit(1)
+        print("Probe daemon stopped")
+        return
+
+    # Determine settings path
+    settings_path = args.settings if args.settings else get_mcp_settings_path()
+    logging.info(f"Using MCP settings from: {settings_path}")
+    
+    # Check if settings file exists
+    if not os.path.isfile(settings_path):
+        logging.error(f"Settings file not found: {settings_path}")
+        print(f"Error: Settings file not found: {settings_path}")
+        sys.exit(1)
+    
+    try:
+        # Create extractor instance
+        extractor = MCPMetadataExtractor(
+            settings_path,
+            concurrency=args.concurrency,
+            connect_timeout=args.connect_timeout,
+            list_tools_timeout=args.list_tools_timeout,
+            list_resources_timeout=args.list_resources_timeout,
+            budget=args.budget,
+            cache=None if args.no_cache else MetadataCache(args.cache_path, ttl=args.cache_ttl),
+            refresh=args.refresh,
+            compact=args.compact,
+            max_tokens=args.max_tokens,
+            priority=args.priority
+        )
+        
+        if args.stream:
+            # Stream sections to the output file; cached entries are not updated
+            # because streamed metadata does not keep the tool listings
+            extractor.stream = MarkdownStreamWriter(extractor, args.output)
+            extractor.cache = None
+            try:
+                all_metadata = await extractor.extract_all_metadata()
+            except BaseException:
+                extractor.stream.close(commit=False)
+                raise
+            extractor.stream.close()
+            with open(args.output, 'r', encoding='utf-8') as f:
+                shutil.copyfileobj(f, sys.stdout)
+            logging.info(f"Metadata saved to {args.output}")
+            if args.profile:
+                print(extractor.format_profile(all_metadata), file=sys.stderr)
+            return
+        
+        # Extract metadata for all servers, from a running probe daemon when available
+        all_metadata = await extractor.collect_metadata(use_daemon=not args.no_daemon, socket_path=args.socket,
+                                                        no_cache=args.no_cache)
+        
+        # Format output based on selected format
+        if args.format == 'json':
+            output = extractor.format_json(all_metadata)
+        else:  # markdown
+            output = extractor.format_markdown(all_metadata)
+        
+        # Print to console
+        print(output)
+        
+        # Save to file
+        with open(args.output, "w") as f:
+            f.write(output)
+        
+        logging.info(f"Metadata saved to {args.output}")
+        if args.profile:
+            print(extractor.format_profile(all_metadata), file=sys.stderr)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    """
+    Script execution entry point.
+    
+    Example usage:
+        # Extract metadata using default settings with UV (recommended)
+        uv run --with mcp mcp_checker.py
+        
+        # Extract metadata using default settings with traditional Python
+        python mcp_checker.py
+        
+        # Extract metadata with custom settings file and output to JSON
+        uv run --with mcp mcp_checker.py --settings /path/to/settings.json --format json --output metadata.json
+        
+        # Extract metadata with verbose logging
+        uv run --with mcp mcp_checker.py --verbose
+    """
+    asyncio.run(main())
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Memory Bank Compaction
+
+The memory bank update instructions in the prompts only ever append dated
+entries ("[YYYY-MM-DD HH:MM:SS] - ...") to files such as decisionLog.md and
+activeContext.md, and every session starts by reading those files. This script
+keeps them within a byte budget per file and for the whole memory bank: the
+oldest dated entries are moved into compressed archives in memory-bank/archive/
+(gzip or lzma from the standard library), and each compacted file gets a short
+index of the archived entries per month.
+
+Compaction is incremental. Files within their budget are not parsed, archived
+entries are appended to the archives as a new compressed member without
+reading or recompressing what is already there, and the index in each file is
+the only record of earlier runs.
+
+Usage:
+    python memory_compact.py [--memory-bank DIR] [--max-file-bytes N] [--max-total-bytes N]
+                             [--keep N] [--compression {gzip,lzma}] [--dry-run] [--verbose]
+
+Arguments:
+    --memory-bank       Memory bank directory (default: the project's memory-bank)
+    --max-file-bytes    Budget for each memory bank file (default: 32768)
+    --max-total-bytes   Budget for all memory bank files together (default: 131072)
+    --keep              Newest dated entries never archived from a file (default: 5)
+    --compression       Archive format: gzip or lzma (default: gzip)
+    --dry-run           Show what would be archived without changing any file
+    --verbose           Enable verbose output
+
+Examples:
+    # Compact the memory bank with the default budgets
+    python memory_compact.py
+    
+    # Preview a tighter budget
+    python memory_compact.py --max-file-bytes 16000 --max-total-bytes 64000 --dry-run
+    
+    # Read the archived entries of decisionLog.md
+    zcat ../memory-bank/archive/decisionLog.md.gz
+"""
+
+import os
+import re
+import sys
+import gzip
+import lzma
+import time
+import argparse
+import tempfile
+import logging
+from pathlib import Path
+
+
+# Default locations, relative to the project root
+DEFAULT_MEMORY_BANK_DIR = "memory-bank"
+
+# Archives are kept in this subdirectory of the memory bank
+ARCHIVE_DIR_NAME = "archive"
+
+# Default budgets and the number of newest entries always kept in a file
+DEFAULT_MAX_FILE_BYTES = 32 * 1024
+DEFAULT_MAX_TOTAL_BYTES = 128 * 1024
+DEFAULT_KEEP = 5
+
+# Archive formats: opener and file suffix
+COMPRESSORS = {
+    "gzip": (gzip.open, ".gz"),
+    "lzma": (lzma.open, ".xz")
+}
+
+# Markers around the index of archived entries in a compacted file
+INDEX_START = "<!-- memory-compact:start -->"
+INDEX_END = "<!-- memory-compact:end -->"
+
+# A dated entry starts with a date, optionally in brackets or after a list
+# marker, or is a heading containing a date
+_DATED_LINE_PATTERN = re.compile(r'^\s*(?:[-*+]\s+)?\[?(\d{4}-\d{2}-\d{2})\b')
+_DATE_PATTERN = re.compile(r'\b(\d{4}-\d{2}-\d{2})\b')
+_HEADING_PATTERN = re.compile(r'^ {0,3}(#{1,6})\s')
+_FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+_INDEX_MONTH_PATTERN = re.compile(r'^- (\d{4}-\d{2}): (\d+) entr')
+
+
+def get_script_dir():
+    """Get the directory where this script is located."""
+    return Path(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_index(lines):
+    """
+    Read the index of archived entries written by an earlier run.
+    
+    Returns:
+        tuple: ({month: entry count}, [archive paths relative to the memory bank])
+    """
+    months = {}
+    archives = []
+    for line in lines:
+        match = _INDEX_MONTH_PATTERN.match(line)
+        if match:
+            months[match.group(1)] = months.get(match.group(1), 0) + int(match.group(2))
+        else:
+            archives.extend(path for path in re.findall(r'`([^`]+)`', line) if path not in archives)
+    return months, archives
+
+
+def render_index(months, archives):
+    """Render the index of archived entries, or an empty string if nothing was archived."""
+    if not months:
+        return ""
+    lines = [
+        INDEX_START,
+        "## Archived Entries",
+        "",
+        "Older dated entries were moved to compressed archives by roo_config/memory_compact.py: "
+        + ", ".join(f"`{archive}`" for archive in archives),
+        ""
+    ]
+    lines += [f"- {month}: {months[month]} {'entry' if months[month] == 1 else 'entries'}" for month in sorted(months)]
+    lines.append(INDEX_END)
+    return "\n".join(lines) + "\n"
+
+
+def parse_document(text):
+    """
+    Split a memory bank file into lines and dated entries.
+    
+    A dated line starts an entry that runs to the next dated line or heading,
+    and ends earlier at a fenced code block or at unindented text after a
+    blank line, so closing notes are never archived with the last entry. A
+    heading containing a date starts an entry that runs to the next heading
+    of the same or a higher level. Dates inside fenced code blocks are not
+    entries. The index of an earlier run is taken out of the lines.
+    
+    Returns:
+        dict: The ``lines`` (with line endings), the ``entries`` as dicts with
+        ``start`` and ``end`` line, ``date``, enclosing ``section`` heading and
+        ``bytes``, the ``months`` and ``archives`` of the earlier index and the
+        line ``index_at`` where that index was, or None
+    """
+    lines = text.splitlines(keepends=True)
+    months, archives, index_at = {}, [], None
+    for number, line in enumerate(lines):
+        if line.strip() != INDEX_START:
+            continue
+        end = next((i for i in range(number + 1, len(lines)) if lines[i].strip() == INDEX_END), None)
+        if end is not None:
+            months, archives = parse_index(lines[number + 1:end])
+            del lines[number:end + 1]
+            index_at = number
+        break
+    
+    entries = []
+    current = None
+    section = ""
+    in_fence = False
+    # First line of the blank lines before the current line, if any
+    blank_at = None
+
+    def close(end):
+        current["end"] = end
+        current["bytes"] = sum(len(line.encode('utf-8')) for line in lines[current["start"]:end])
+        entries.append(current)
+    
+    for number, line in enumerate(lines):
+        if _FENCE_PATTERN.match(line):
+            if not in_fence and current is not None and current["level"] is None:
+                close(number if blank_at is None else blank_at)
+                current = None
+            in_fence = not in_fence
+            blank_at = None
+            continue
+        if in_fence:
+            continue
+        if not line.strip():
+            if blank_at is None:
+                blank_at = number
+            continue
+        after_blank, blank_at = blank_at, None
+        heading = _HEADING_PATTERN.match(line)
+        if heading:
+            level = len(heading.group(1))
+            if current is not None and current["level"] is not None and level > current["level"]:
+                continue
+            if current is not None:
+                close(number)
+                current = None
+            date = _DATE_PATTERN.search(line)
+            if date:
+                current = {"start": number, "level": level, "date": date.group(1), "section": section}
+            else:
+                section = line.strip()
+            continue
+        if current is not None and current["level"] is not None:
+            continue
+        date = _DATED_LINE_PATTERN.match(line)
+        if date:
+            if current is not None:
+                close(number)
+            current = {"start": number, "level": None, "date": date.group(1), "section": section}
+        elif current is not None and after_blank is not None and not line[0].isspace():
+            close(after_blank)
+            current = None
+    if current is not None:
+        close(len(lines))
+    
+    return {"lines": lines, "entries": entries, "months": months, "archives": archives, "index_at": index_at}
+
+
+class CompactionPlan:
+    """
+    The entries to archive from one memory bank file.
+    
+    Attributes:
+        path (Path): The memory bank file
+        document (dict): The parsed file from ``parse_document``
+        removed (set): Start lines of the entries to archive
+        archive (str): Archive for this run's entries, relative to the memory bank
+        months (dict): Archived entries per month, including earlier runs
+        archives (list): All archive paths, relative to the memory bank
+        size (int): Estimated size of the file after compaction
+    """
+    
+    def __init__(self, path, keep, archive):
+        """
+        Parse a memory bank file.
+        
+        Args:
+            path (Path): The memory bank file
+            keep (int): Number of newest dated entries never archived
+            archive (str): Archive for this run's entries, relative to the memory bank
+        """
+        self.path = Path(path)
+        self.archive = archive
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            self.document = parse_document(f.read())
+        self.removed = set()
+        self.months = dict(self.document["months"])
+        self.archives = list(self.document["archives"])
+        if archive not in self.archives:
+            self.archives.append(archive)
+        self._base_bytes = sum(len(line.encode('utf-8')) for line in self.document["lines"])
+        self._removed_bytes = 0
+        ordered = sorted(self.document["entries"], key=lambda entry: (entry["date"], entry["start"]))
+        self.candidates = ordered[:max(len(ordered) - keep, 0)]
+        self.size = self._estimate()
+    
+    def _estimate(self):
+        """Estimate the file size after archiving the removed entries."""
+        index = render_index(self.months, self.archives)
+        return self._base_bytes - self._removed_bytes + len(index.encode('utf-8')) + (1 if index else 0)
+    
+    def remove(self, entry):
+        """Mark one entry for archiving and update the estimated size."""
+        self.removed.add(entry["start"])
+        self._removed_bytes += entry["bytes"]
+        month = entry["date"][:7]
+        self.months[month] = self.months.get(month, 0) + 1
+        self.size = self._estimate()
+    
+    def remaining(self):
+        """Return the candidate entries not yet marked for archiving, oldest first."""
+        return [entry for entry in self.candidates if entry["start"] not in self.removed]
+    
+    def archived_text(self, source_name):
+        """Render the removed entries for the archive, under their section headings."""
+        parts = [f"# {source_name}, archived {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"]
+        section = None
+        lines = self.document["lines"]
+        for entry in self.document["entries"]:
+            if entry["start"] not in self.removed:
+                continue
+            if entry["section"] and entry["section"] != section:
+                section = entry["section"]
+                parts.append(f"{section}\n\n")
+            text = "".join(lines[entry["start"]:entry["end"]])
+            parts.append(text if text.endswith("\n") else text + "\n")
+        return "".join(parts)
+    
+    def render(self):
+        """Render the compacted file: the kept lines with the updated index."""
+        lines = self.document["lines"]
+        skipped = set()
+        for entry in self.document["entries"]:
+            if entry["start"] in self.removed:
+                skipped.update(range(entry["start"], entry["end"]))
+        index_at = self.document["index_at"]
+        before = [line for number, line in enumerate(lines) if number not in skipped
+                  and (index_at is None or number < index_at)]
+        after = [line for number, line in enumerate(lines) if number not in skipped
+                 and index_at is not None and number >= index_at]
+        index = render_index(self.months, self.archives)
+        if index and before:
+            if not before[-1].endswith("\n"):
+                before[-1] += "\n"
+            if before[-1].strip() and index_at is None:
+                before.append("\n")
+        return "".join(before) + index + "".join(after)
+
+
+def archive_name(path, compression):
+    """Return the archive of a memory bank file, relative to the memory bank."""
+    return f"{ARCHIVE_DIR_NAME}/{Path(path).name}{COMPRESSORS[compression][1]}"
+
+
+def plan_compaction(paths, max_file_bytes, max_total_bytes, keep, compression="gzip"):
+    """
+    Decide which entries to archive from which files.
+    
+    Files over ``max_file_bytes`` lose their oldest entries until they fit.
+    If the memory bank is then still over ``max_total_bytes``, the oldest
+    remaining entries of all files are archived until it fits. Files within
+    their budget are only parsed when the total is over budget.
+    
+    Returns:
+        tuple: (list of CompactionPlan with entries to archive, estimated total bytes)
+    """
+    sizes = {path: path.stat().st_size for path in paths}
+    plans = {}
+    for path in paths:
+        if sizes[path] <= max_file_bytes:
+            continue
+        plan = CompactionPlan(path, keep, archive_name(path, compression))
+        for entry in plan.candidates:
+            if plan.size <= max_file_bytes:
+                break
+            plan.remove(entry)
+        if plan.size > max_file_bytes:
+            logging.warning(f"{path.name} is still about {plan.size:,} bytes, over its budget of {max_file_bytes:,}: "
+                            f"the rest is not dated entries or among the {keep} newest")
+        plans[path] = plan
+        sizes[path] = plan.size
+    
+    total = sum(sizes.values())
+    if total > max_total_bytes:
+        for path in paths:
+            if path not in plans:
+                plans[path] = CompactionPlan(path, keep, archive_name(path, compression))
+        candidates = sorted(
+            ((entry["date"], path.name, entry["start"]), path, entry)
+            for path, plan in plans.items() for entry in plan.remaining()
+        )
+        for _, path, entry in candidates:
+            if total <= max_total_bytes:
+                break
+            plan = plans[path]
+            before = plan.size
+            plan.remove(entry)
+            total += plan.size - before
+        if total > max_total_bytes:
+            logging.warning(f"The memory bank is still about {total:,} bytes, over its budget of {max_total_bytes:,}")
+    return [plan for plan in plans.values() if plan.removed], total
+
+
+def write_text_atomic(path, content):
+    """Write ``content`` to ``path`` through a temporary file and an atomic rename, keeping its line endings."""
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        if path.exists():
+            os.chmod(temp_path, path.stat().st_mode & 0o777)
+        os.replace(temp_path, str(path))
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def apply_plan(plan, memory_bank, compression):
+    """
+    Append the plan's entries to its archive, then rewrite the file.
+    
+    The archive is written first, so an interruption can at worst archive some
+    entries twice but never lose them.
+    """
+    archive_path = Path(memory_bank) / plan.archive
+    os.makedirs(archive_path.parent, exist_ok=True)
+    # Appending adds a new member; readers decompress all members in order
+    with COMPRESSORS[compression][0](str(archive_path), 'ab') as f:
+        f.write(plan.archived_text(plan.path.name).encode('utf-8'))
+    write_text_atomic(plan.path, plan.render())
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description='Archive old dated memory bank entries to keep it within a byte budget.')
+    parser.add_argument('--memory-bank', help="Memory bank directory (default: the project's memory-bank)")
+    parser.add_argument('--max-file-bytes', type=int, default=DEFAULT_MAX_FILE_BYTES,
+                        help=f'Budget for each memory bank file (default: {DEFAULT_MAX_FILE_BYTES})')
+    parser.add_argument('--max-total-bytes', type=int, default=DEFAULT_MAX_TOTAL_BYTES,
+                        help=f'Budget for all memory bank files together (default: {DEFAULT_MAX_TOTAL_BYTES})')
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP,
+                        help=f'Newest dated entries never archived from a file (default: {DEFAULT_KEEP})')
+    parser.add_argument('--compression', choices=sorted(COMPRESSORS), default='gzip', help='Archive format (default: gzip)')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would be archived without changing any file')
+    parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format='%(levelname)s: %(message)s')
+    
+    memory_bank = Path(args.memory_bank) if args.memory_bank else get_script_dir().parent / DEFAULT_MEMORY_BANK_DIR
+    if not memory_bank.is_dir():
+        logging.error(f"Memory bank directory {memory_bank} not found")
+        sys.exit(1)
+    
+    paths = sorted(path for path in memory_bank.glob("*.md") if path.is_file())
+    plans, total = plan_compaction(paths, args.max_file_bytes, args.max_total_bytes, args.keep, args.compression)
+    if not plans:
+        over_file_budget = [path.name for path in paths if path.stat().st_size > args.max_file_bytes]
+        if total > args.max_total_bytes:
+            logging.info("No entries can be archived: the memory bank has no dated entries beyond "
+                         f"the {args.keep} newest of each file")
+        elif over_file_budget:
+            logging.info(f"The per-file budget of {args.max_file_bytes:,} bytes could not be met for "
+                         f"{', '.join(over_file_budget)}: no entries can be archived")
+        else:
+            logging.info(f"Memory bank is within budget ({total:,} bytes), nothing to archive")
+        return
+    
+    for plan in plans:
+        size = plan.path.stat().st_size
+        if args.dry_run:
+            logging.info(f"{plan.path.name}: would archive {len(plan.removed)} entries, "
+                         f"{size:,} -> about {plan.size:,} bytes")
+            continue
+        try:
+            apply_plan(plan, memory_bank, args.compression)
+        except OSError as e:
+            logging.error(f"Could not compact {plan.path.name}: {e}")
+            continue
+        logging.info(f"{plan.path.name}: archived {len(plan.removed)} entries to {plan.archive}, "
+                     f"{size:,} -> {plan.path.stat().st_size:,} bytes")
+    logging.info(f"Memory bank {'would be' if args.dry_run else 'is now'} about {total:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Memory Bank Search Index
+
+This script keeps a local SQLite FTS5 index of the memory-bank directory and
+returns the chunks most relevant to a query, so a mode can read the few
+sections it needs instead of every memory bank file. Files are split into
+chunks at Markdown headings; each result names its file, its line range and
+its heading path, ready for a read_file call with start_line and end_line.
+The index is updated before every query, re-indexing only the files whose
+size or mtime changed. Only the standard library is needed, with an sqlite3
+module built with FTS5 (the default in current Python releases).
+
+Usage:
+    python memory_index.py [QUERY ...] [--memory-bank DIR] [--index FILE] [--top K]
+                           [--format {text,json}] [--rebuild] [--verbose]
+
+Arguments:
+    QUERY           Words to search for; without a query the index is only updated
+    --memory-bank   Memory bank directory (default: the project's memory-bank)
+    --index         SQLite index file (default: the project's .roo/memory-index.sqlite3)
+    --top           Number of chunks to return (default: 5)
+    --format        Output format: text or json (default: text)
+    --rebuild       Drop the index and index every file again
+    --verbose       Enable verbose output
+
+Examples:
+    # Update the index
+    python memory_index.py
+    
+    # The five chunks most relevant to a question
+    python memory_index.py how are database migrations run
+    
+    # Top three chunks as JSON
+    python memory_index.py authentication tokens --top 3 --format json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import logging
+from pathlib import Path
+
+
+# Default locations, relative to the project root
+DEFAULT_MEMORY_BANK_DIR = "memory-bank"
+DEFAULT_INDEX_PATH = os.path.join(".roo", "memory-index.sqlite3")
+
+# Bump when the schema or the chunking changes; older indexes are rebuilt
+INDEX_VERSION = 1
+
+# Files indexed in the memory bank
+MEMORY_BANK_SUFFIXES = (".md", ".markdown", ".txt")
+
+# Sections longer than this are split at blank lines into several chunks
+MAX_CHUNK_CHARS = 4000
+
+# Relative weight of a match in the heading path and in the chunk body
+HEADING_WEIGHT = 4.0
+BODY_WEIGHT = 1.0
+
+# ATX headings ("## Title"); fenced code blocks are skipped
+_HEADING_PATTERN = re.compile(r'^ {0,3}(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+_FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+    path UNINDEXED,
+    heading,
+    body,
+    start_line UNINDEXED,
+    end_line UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+
+
+def get_script_dir():
+    """Get the directory where this script is located."""
+    return Path(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fts5_available():
+    """Check whether the sqlite3 module was built with FTS5."""
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+
+
+def _split_long(lines, start_line):
+    """
+    Split the lines of one section into pieces of at most MAX_CHUNK_CHARS.
+    
+    Pieces end at blank lines where possible, so paragraphs and list items stay
+    together; a single paragraph longer than the limit is kept whole. Blank
+    lines are never the start of a piece, so every piece has some text.
+    
+    Yields:
+        tuple: (first line number, lines of the piece)
+    """
+    piece = []
+    piece_start = start_line
+    size = 0
+    for offset, line in enumerate(lines):
+        if not piece and not line.strip():
+            piece_start = start_line + offset + 1
+            continue
+        if size + len(line) > MAX_CHUNK_CHARS and piece and not line.strip():
+            yield piece_start, piece
+            piece = []
+            piece_start = start_line + offset + 1
+            size = 0
+            continue
+        piece.append(line)
+        size += len(line)
+    if piece:
+        yield piece_start, piece
+
+
+def split_chunks(text):
+    """
+    Split Markdown text into chunks at its headings.
+    
+    Each heading starts a chunk that runs to the next heading of any level.
+    Text before the first heading is a chunk without a heading. Chunks with no
+    text besides their heading are dropped, and sections longer than
+    MAX_CHUNK_CHARS are split further.
+    
+    Returns:
+        list: (heading path, start line, end line, text) tuples, where the
+        heading path joins the enclosing headings with " > " and lines are
+        numbered from 1
+    """
+    lines = text.splitlines()
+    sections = []
+    headings = []
+    current = (0, "", [])
+    in_fence = False
+    for number, line in enumerate(lines, start=1):
+        if _FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING_PATTERN.match(line)
+        if match:
+            sections.append(current)
+            level = len(match.group(1))
+            headings = [heading for heading in headings if heading[0] < level] + [(level, match.group(2))]
+            current = (number, " > ".join(title for _, title in headings), [])
+        current[2].append(line)
+    sections.append(current)
+    
+    chunks = []
+    for start, heading, section_lines in sections:
+        body_lines = section_lines[1:] if heading else section_lines
+        if not "".join(body_lines).strip():
+            continue
+        for piece_start, piece in _split_long(section_lines, max(start, 1)):
+            while not piece[-1].strip():
+                piece.pop()
+            chunks.append((heading, piece_start, piece_start + len(piece) - 1, "\n".join(piece)))
+    return chunks
+
+
+def build_match_query(query):
+    """
+    Turn free text into an FTS5 query matching any of its words.
+    
+    Every word is quoted, so punctuation and FTS5 operators in the text cannot
+    cause syntax errors. Chunks matching more of the words rank higher.
+    
+    Returns:
+        str: The MATCH expression, or an empty string if the text has no words
+    """
+    words = re.findall(r'\w+', query.lower())
+    return " OR ".join(f'"{word}"' for word in dict.fromkeys(words))
+
+
+class MemoryIndex:
+    """
+    An SQLite FTS5 index of the chunks of every memory bank file.
+    
+    The ``files`` table records the size and mtime of each indexed file, so
+    ``update`` only re-reads files that changed and drops files that were
+    removed. Chunks are ranked with BM25, with matches in the heading path
+    weighted HEADING_WEIGHT times a match in the body.
+    
+    Attributes:
+        memory_bank (Path): The memory bank directory
+        path (Path): Path to the SQLite index file
+    """
+    
+    def __init__(self, memory_bank, path):
+        """
+        Open the index, creating it if needed.
+        
+        An index written by another INDEX_VERSION is dropped and rebuilt.
+        
+        Args:
+            memory_bank (Path): The memory bank directory
+            path (Path): Path to the SQLite index file
+        """
+        self.memory_bank = Path(memory_bank)
+        self.path = Path(path)
+        os.makedirs(self.path.parent, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path))
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != INDEX_VERSION:
+            if version:
+                logging.info(f"Memory index {self.path} has version {version}, rebuilding it")
+            self.clear()
+            self.connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+    
+    def clear(self):
+        """Drop every table; ``update`` then indexes every file again."""
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS files")
+            self.connection.execute("DROP TABLE IF EXISTS chunks")
+        self.connection.executescript(SCHEMA)
+    
+    def _scan(self):
+        """Return {relative path: (size, mtime_ns)} of the memory bank files."""
+        files = {}
+        for path in self.memory_bank.rglob("*"):
+            if path.suffix.lower() not in MEMORY_BANK_SUFFIXES or not path.is_file():
+                continue
+            stat = path.stat()
+            files[path.relative_to(self.memory_bank).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+        return files
+    
+    def update(self):
+        """
+        Bring the index up to date with the memory bank.
+        
+        Returns:
+            dict: Number of files ``indexed``, ``removed`` and ``unchanged``, and
+            the number of ``chunks`` written
+        """
+        stats = {"indexed": 0, "removed": 0, "unchanged": 0, "chunks": 0}
+        current = self._scan() if self.memory_bank.is_dir() else {}
+        recorded = {path: (size, mtime) for path, size, mtime in
+                    self.connection.execute("SELECT path, size, mtime_ns FROM files")}
+        with self.connection:
+            for path in recorded.keys() - current.keys():
+                self.connection.execute("DELETE FROM chunks WHERE path = ?", (path,))
+                self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                stats["removed"] += 1
+                logging.debug(f"Removed {path} from the memory index")
+            for path, (size, mtime) in sorted(current.items()):
+                if recorded.get(path) == (size, mtime):
+                    stats["unchanged"] += 1
+                    continue
+                try:
+                    with open(self.memory_bank / path, 'r', encoding='utf-8', errors='replace') as f:
+                        chunks = split_chunks(f.read())
+                except OSError as e:
+                    logging.warning(f"Could not read {path}: {e}")
+                    continue
+                self.connection.execute("DELETE FROM chunks WHERE path = ?", (path,))
+                self.connection.executemany(
+                    "INSERT INTO chunks (path, heading, body, start_line, end_line) VALUES (?, ?, ?, ?, ?)",
+                    [(path, heading, body, start, end) for heading, start, end, body in chunks]
+                )
+                self.connection.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns) VALUES (?, ?, ?)",
+                                        (path, size, mtime))
+                stats["indexed"] += 1
+                stats["chunks"] += len(chunks)
+                logging.debug(f"Indexed {path}: {len(chunks)} chunks")
+        return stats
+    
+    def search(self, query, top=5):
+        """
+        Return the ``top`` chunks most relevant to ``query``.
+        
+        Returns:
+            list: Dicts with the chunk's ``path``, ``heading``, ``start_line``,
+            ``end_line``, ``text`` and BM25 ``score`` (lower is better)
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        rows = self.connection.execute(
+            "SELECT path, heading, start_line, end_line, body, bm25(chunks, 0.0, ?, ?, 0.0, 0.0) AS score "
+            "FROM chunks WHERE chunks MATCH ? ORDER BY score LIMIT ?",
+            (HEADING_WEIGHT, BODY_WEIGHT, match, top)
+        )
+        return [
+            {"path": path, "heading": heading, "start_line": start, "end_line": end, "text": body, "score": score}
+            for path, heading, start, end, body, score in rows
+        ]
+
+
+def format_results(results, memory_bank_name):
+    """Format search results as plain text, each chunk under a line naming its location."""
+    blocks = []
+    for result in results:
+        location = f"{memory_bank_name}/{result['path']}:{result['start_line']}-{result['end_line']}"
+        title = f"{location}  {result['heading']}" if result["heading"] else location
+        blocks.append(f"--- {title}\n{result['text']}")
+    return "\n\n".join(blocks)
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description='Index the memory bank and search it by heading-sized chunks.')
+    parser.add_argument('query', nargs='*', help='Words to search for; without a query the index is only updated')
+    parser.add_argument('--memory-bank', help="Memory bank directory (default: the project's memory-bank)")
+    parser.add_argument('--index', help="SQLite index file (default: the project's .roo/memory-index.sqlite3)")
+    parser.add_argument('--top', type=int, default=5, help='Number of chunks to return (default: 5)')
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help='Output format (default: text)')
+    parser.add_argument('--rebuild', action='store_true', help='Drop the index and index every file again')
+    parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format='%(levelname)s: %(message)s')
+    
+    if not fts5_available():
+        logging.error(f"The sqlite3 module of this Python ({sys.version.split()[0]}) was built without FTS5. "
+                      "Run the script with another Python, for example: uv run memory_index.py")
+        sys.exit(1)
+    
+    project_root = get_script_dir().parent
+    memory_bank = Path(args.memory_bank) if args.memory_bank else project_root / DEFAULT_MEMORY_BANK_DIR
+    if not memory_bank.is_dir():
+        logging.error(f"Memory bank directory {memory_bank} not found")
+        sys.exit(1)
+    
+    index = MemoryIndex(memory_bank, Path(args.index) if args.index else project_root / DEFAULT_INDEX_PATH)
+    try:
+        if args.rebuild:
+            index.clear()
+        started = time.perf_counter()
+        stats = index.update()
+        logging.debug(f"Memory index updated in {time.perf_counter() - started:.3f}s: {stats['indexed']} files indexed "
+                      f"({stats['chunks']} chunks), {stats['removed']} removed, {stats['unchanged']} unchanged")
+        if not args.query:
+            if args.format == 'json':
+                print(json.dumps(dict(stats, index=str(index.path)), indent=2))
+            else:
+                print(f"Memory index {index.path}: {stats['indexed']} files indexed, "
+                      f"{stats['removed']} removed, {stats['unchanged']} unchanged")
+            return
+        
+        results = index.search(" ".join(args.query), args.top)
+    finally:
+        index.close()
+    
+    if args.format == 'json':
+        print(json.dumps(results, indent=2))
+    elif results:
+        print(format_results(results, memory_bank.name))
+    else:
+        print("No matching chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+System Prompt Size Report
+
+This script reports the size of every rendered .roo/system-prompt-* file in bytes
+and estimated tokens, broken down by top-level YAML section (tools, modes,
+mode_collaboration, memory_bank_strategy, mcp, ...). Tokens are estimated offline
+with the same heuristic mcp_checker.py uses for --max-tokens, so no tokenizer
+download is needed. When a token budget is configured, the script exits with
+status 1 if any mode exceeds it, so it can guard prompt size in CI or a git hook.
+
+Usage:
+    python prompt_report.py [--roo-dir DIR] [--format {text,json}] [--budget TOKENS]
+                            [--mode-budget MODE=TOKENS] [--verbose]
+
+Arguments:
+    --roo-dir       Directory holding the rendered prompts (default: the project's .roo)
+    --format        Output format: text or json (default: text)
+    --budget        Maximum estimated tokens allowed for every mode
+    --mode-budget   Maximum estimated tokens for one mode, overriding --budget (repeatable)
+    --verbose       Enable verbose output
+
+Examples:
+    # Show the size of every mode and of each section
+    python prompt_report.py
+    
+    # Fail if any prompt grows beyond 12000 tokens, or the architect prompt beyond 14000
+    python prompt_report.py --budget 12000 --mode-budget architect=14000
+    
+    # Machine-readable report
+    python prompt_report.py --format json > prompt_sizes.json
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import importlib.util
+import logging
+from pathlib import Path
+
+
+# Rendered prompt files and the prefix stripped to get the mode name
+PROMPT_PREFIX = "system-prompt-"
+
+# Name used for any text before the first top-level key
+PREAMBLE_SECTION = "(preamble)"
+
+# A top-level YAML key at the start of a line
+_SECTION_PATTERN = re.compile(r'^([A-Za-z_][\w-]*):', re.MULTILINE)
+
+
+def get_script_dir():
+    """Get the directory where this script is located."""
+    return Path(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_token_estimator(script_dir):
+    """Return ``estimate_tokens`` from the mcp_checker.py next to this script.
+    
+    mcp_checker.py only imports the mcp package inside the functions that talk
+    to servers, so this works without mcp installed.
+    """
+    spec = importlib.util.spec_from_file_location("mcp_checker", str(script_dir / "mcp_checker.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.estimate_tokens
+
+
+def split_sections(content):
+    """Split a prompt into its top-level YAML sections.
+    
+    Sections are found by their key at the start of a line, without parsing
+    the YAML, so the report also works on prompts that are not valid YAML.
+    A key that occurs more than once (such as an ``mcp`` section appended by
+    insert_variables.py) is reported as one section.
+    
+    Returns:
+        A dict mapping each section name to its text, in order of appearance.
+    """
+    sections = {}
+    matches = list(_SECTION_PATTERN.finditer(content))
+    if not matches or matches[0].start() > 0:
+        end = matches[0].start() if matches else len(content)
+        if content[:end].strip():
+            sections[PREAMBLE_SECTION] = content[:end]
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(content)
+        name = match.group(1)
+        sections[name] = sections.get(name, "") + content[match.start():end]
+    return sections
+
+
+def measure_prompt(path, estimate_tokens):
+    """Measure one prompt file and each of its sections.
+    
+    Returns:
+        A dict with the ``mode``, the file's ``bytes`` and ``tokens``, and
+        ``sections`` mapping each section name to its ``bytes`` and ``tokens``.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return {
+        "mode": path.name[len(PROMPT_PREFIX):],
+        "bytes": len(content.encode('utf-8')),
+        "tokens": estimate_tokens(content),
+        "sections": {
+            name: {"bytes": len(text.encode('utf-8')), "tokens": estimate_tokens(text)}
+            for name, text in split_sections(content).items()
+        }
+    }
+
+
+def parse_mode_budgets(values):
+    """Parse ``MODE=TOKENS`` arguments into a dict.
+    
+    Raises:
+        ValueError: If a value is not of the form MODE=TOKENS.
+    """
+    budgets = {}
+    for value in values:
+        mode, separator, tokens = value.partition("=")
+        if not separator or not mode or not tokens.isdigit():
+            raise ValueError(f"Invalid mode budget '{value}', expected MODE=TOKENS")
+        budgets[mode] = int(tokens)
+    return budgets
+
+
+def format_table(rows):
+    """Format rows of cells as a plain-text table: first column left-aligned, the rest right-aligned."""
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) if i == 0 else cell.rjust(width)
+                  for i, (cell, width) in enumerate(zip(row, widths))).rstrip()
+        for row in rows
+    )
+
+
+def format_report(report):
+    """Format the report as two plain-text tables: totals per mode and tokens per section."""
+    prompts = report["prompts"]
+    rows = [["mode", "bytes", "tokens", "budget", "status"]]
+    for prompt in prompts:
+        budget = prompt.get("budget")
+        rows.append([
+            prompt["mode"],
+            f"{prompt['bytes']:,}",
+            f"{prompt['tokens']:,}",
+            f"{budget:,}" if budget is not None else "-",
+            "OVER" if prompt.get("over_budget") else "ok"
+        ])
+    rows.append(["total", f"{report['bytes']:,}", f"{report['tokens']:,}", "", ""])
+    lines = [format_table(rows), "", "Estimated tokens by section:"]
+    
+    # Largest sections first, by their total over all modes
+    totals = {}
+    for prompt in prompts:
+        for name, section in prompt["sections"].items():
+            totals[name] = totals.get(name, 0) + section["tokens"]
+    rows = [["section"] + [prompt["mode"] for prompt in prompts] + ["total"]]
+    for name in sorted(totals, key=lambda name: (-totals[name], name)):
+        rows.append([name] + [
+            f"{prompt['sections'][name]['tokens']:,}" if name in prompt["sections"] else "-"
+            for prompt in prompts
+        ] + [f"{totals[name]:,}"])
+    lines.append(format_table(rows))
+    return "\n".join(lines)
+
+
+def build_report(roo_dir, estimate_tokens, budget=None, mode_budgets=None):
+    """Measure every prompt in ``roo_dir`` and check it against its budget.
+    
+    Returns:
+        A dict with the per-mode ``prompts``, the total ``bytes`` and ``tokens``
+        and the list of modes ``over_budget``.
+    """
+    mode_budgets = mode_budgets or {}
+    prompts = []
+    for path in sorted(Path(roo_dir).glob(f"{PROMPT_PREFIX}*")):
+        if not path.is_file():
+            continue
+        prompt = measure_prompt(path, estimate_tokens)
+        prompt_budget = mode_budgets.get(prompt["mode"], budget)
+        prompt["budget"] = prompt_budget
+        prompt["over_budget"] = prompt_budget is not None and prompt["tokens"] > prompt_budget
+        logging.debug(f"{path.name}: {prompt['bytes']:,} bytes, about {prompt['tokens']:,} tokens, "
+                      f"budget {prompt_budget if prompt_budget is not None else 'none'}")
+        prompts.append(prompt)
+    return {
+        "roo_dir": str(roo_dir),
+        "prompts": prompts,
+        "bytes": sum(prompt["bytes"] for prompt in prompts),
+        "tokens": sum(prompt["tokens"] for prompt in prompts),
+        "over_budget": [prompt["mode"] for prompt in prompts if prompt["over_budget"]]
+    }
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description='Report the size of the rendered system prompts.')
+    parser.add_argument('--roo-dir', help="Directory holding the rendered prompts (default: the project's .roo)")
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help='Output format (default: text)')
+    parser.add_argument('--budget', type=int, help='Maximum estimated tokens allowed for every mode')
+    parser.add_argument('--mode-budget', action='append', default=[], metavar='MODE=TOKENS',
+                        help='Maximum estimated tokens for one mode, overriding --budget (may be given multiple times)')
+    parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format='%(levelname)s: %(message)s')
+    
+    try:
+        mode_budgets = parse_mode_budgets(args.mode_budget)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    script_dir = get_script_dir()
+    roo_dir = Path(args.roo_dir) if args.roo_dir else script_dir.parent / ".roo"
+    report = build_report(roo_dir, load_token_estimator(script_dir), args.budget, mode_budgets)
+    if not report["prompts"]:
+        logging.error(f"No {PROMPT_PREFIX}* files found in {roo_dir}. Run insert_variables.py first.")
+        sys.exit(1)
+    
+    if args.format == 'json':
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+    
+    if report["over_budget"]:
+        for prompt in report["prompts"]:
+            if prompt["over_budget"]:
+                logging.error(f"Mode '{prompt['mode']}' uses about {prompt['tokens']:,} tokens, "
+                              f"over its budget of {prompt['budget']:,}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()